@@ -3,71 +3,62 @@
 Script to add a new table to the table_allowlist.json file.
 This script helps ensure all required information is provided
 and validates the table against the schema repository.
+
+With --manifest, every table in a CSV/JSONL manifest is added at once: the
+entries are validated against the repository in one pass, columns are fetched
+in one batched metadata query, and the allowlist is written once
+(see allowlist_manifest.py for the manifest format).
 """
 
-import json
 import argparse
-from datetime import datetime
-import sys
+from table_store import (AllowlistStore, SchemaRepositoryStore, open_allowlist, open_schema_repository,
+                         empty_allowlist, empty_schema_repository)
+from allowlist_manifest import load_manifest, parse_column_definitions, fetch_columns_for_entries
 try:
-    import snowflake.connector
     from snowflake_credentials import get_snowflake_credentials
+    from snowflake_pool import get_connection
     SNOWFLAKE_AVAILABLE = True
 except ImportError:
     SNOWFLAKE_AVAILABLE = False
 
 def load_allowlist(file_path="table_allowlist.json"):
-    """Load the table allowlist from a JSON file"""
+    """Load the table allowlist store (iterates like the list of entries)"""
     try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
+        return open_allowlist(file_path, missing_ok=False)
     except Exception as e:
         print(f"Error loading allowlist: {e}")
-        return []
+        return empty_allowlist(file_path)
         
 def load_schema_repository(file_path="schema_repository.json"):
-    """Load the schema repository from a JSON file"""
+    """Load the schema repository store"""
     try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
+        return open_schema_repository(file_path, missing_ok=False)
     except Exception as e:
         print(f"Error loading schema repository: {e}")
-        return {"verified_tables": []}
+        return empty_schema_repository(file_path)
 
 def table_in_repository(table_info, repository):
     """Check if a table exists in the schema repository"""
-    for repo_table in repository["verified_tables"]:
-        if (repo_table["database"].lower() == table_info["database"].lower() and
-            repo_table["schema"].lower() == table_info["schema"].lower() and
-            repo_table["table"].lower() == table_info["table"].lower()):
-            return True
-    return False
+    if isinstance(repository, dict):
+        repository = SchemaRepositoryStore(repository)
+    return repository.contains_entry(table_info)
 
 def table_in_allowlist(table_info, allowlist):
     """Check if a table already exists in the allowlist"""
-    for allowed_table in allowlist:
-        database_name = allowed_table.get("database", "EDW")
-        if (database_name.lower() == table_info["database"].lower() and
-            allowed_table["schema"].lower() == table_info["schema"].lower() and
-            allowed_table["table"].lower() == table_info["table"].lower()):
-            return True
-    return False
+    if isinstance(allowlist, list):
+        allowlist = AllowlistStore(allowlist)
+    return allowlist.contains_entry(table_info)
 
 def add_table_to_allowlist(table_info, file_path="table_allowlist.json"):
     """Add a table to the allowlist"""
     allowlist = load_allowlist(file_path)
     
-    # Check if table already exists in the allowlist
-    if table_in_allowlist(table_info, allowlist):
+    # Add the table unless it already exists in the allowlist
+    if not allowlist.add(table_info):
         print(f"Table {table_info['database']}.{table_info['schema']}.{table_info['table']} already exists in the allowlist.")
         return False
     
-    # Add the table to the allowlist
-    allowlist.append(table_info)
-    
-    # Write back to the file
-    with open(file_path, 'w') as f:
-        json.dump(allowlist, f, indent=2)
+    allowlist.save()
     
     print(f"Added {table_info['database']}.{table_info['schema']}.{table_info['table']} to the allowlist.")
     return True
@@ -76,24 +67,15 @@ def add_table_to_repository(table_info, file_path="schema_repository.json"):
     """Add a table to the schema repository if it doesn't already exist"""
     repository = load_schema_repository(file_path)
     
-    # Check if table already exists in the repository
-    if table_in_repository(table_info, repository):
-        return False
-    
-    # Add the table to the repository
     repo_entry = {
         "database": table_info["database"],
         "schema": table_info["schema"],
         "table": table_info["table"]
     }
-    repository["verified_tables"].append(repo_entry)
-    
-    # Update the last_updated field
-    repository["last_updated"] = datetime.now().strftime("%Y-%m-%d")
+    if not repository.add(repo_entry):
+        return False
     
-    # Write back to the file
-    with open(file_path, 'w') as f:
-        json.dump(repository, f, indent=2)
+    repository.save()
     
     print(f"Added {table_info['database']}.{table_info['schema']}.{table_info['table']} to the schema repository.")
     return True
@@ -106,7 +88,7 @@ def fetch_columns_from_snowflake(database, schema, table):
     
     try:
         params = get_snowflake_credentials()
-        with snowflake.connector.connect(**params) as conn:
+        with get_connection(params) as conn:
             query = f"""
             SELECT 
                 COLUMN_NAME, 
@@ -131,23 +113,119 @@ def fetch_columns_from_snowflake(database, schema, table):
         print(f"Error fetching columns from Snowflake: {e}")
         return None
 
+def add_tables_from_manifest(manifest_file, fetch_columns=False, add_to_repository=False,
+                             file_path="table_allowlist.json", repository_file="schema_repository.json"):
+    """
+    Add every table in a manifest to the allowlist with one load and one save.
+
+    Entries need schema, table and description; database defaults to EDW and tier to 2.
+    Tables missing from the schema repository are added to it with add_to_repository,
+    otherwise they are added after a single confirmation.
+
+    Returns:
+        int: Number of tables added
+    """
+    try:
+        entries, errors = load_manifest(manifest_file, required=("schema", "table", "description"))
+    except (OSError, ValueError) as e:
+        print(f"Error reading manifest: {e}")
+        return 0
+    for error in errors:
+        print(f"Skipping manifest entry, {error}")
+    
+    allowlist = load_allowlist(file_path)
+    repository = load_schema_repository(repository_file)
+    
+    # Validate every entry against the allowlist and repository in one pass
+    new_entries = []
+    new_keys = set()
+    missing_from_repo = []
+    for entry in entries:
+        # Same field order as entries added one at a time
+        entry = {"table": entry["table"], "schema": entry["schema"], "database": entry["database"],
+                 "tier": entry.get("tier", 2), **entry}
+        key = allowlist.entry_key(entry)
+        if allowlist.contains_entry(entry) or key in new_keys:
+            print(f"Table {entry['database']}.{entry['schema']}.{entry['table']} already exists in the allowlist.")
+            continue
+        new_keys.add(key)
+        if not repository.contains_entry(entry):
+            missing_from_repo.append(entry)
+        new_entries.append(entry)
+    
+    if missing_from_repo:
+        print(f"Warning: {len(missing_from_repo)} tables do not exist in the schema repository:")
+        for entry in missing_from_repo:
+            print(f"  {entry['database']}.{entry['schema']}.{entry['table']}")
+        if add_to_repository:
+            print("Adding them to the repository since --add-to-repository flag is set.")
+            with repository.transaction():
+                for entry in missing_from_repo:
+                    repository.add({"database": entry["database"], "schema": entry["schema"], "table": entry["table"]})
+                repository.save()
+        else:
+            confirmation = input("Do you want to continue anyway? (y/n): ")
+            if confirmation.lower() != 'y':
+                print("Aborted.")
+                return 0
+    
+    if not new_entries:
+        print("No new tables to add.")
+        return 0
+    
+    # Fetch columns for all tables over one connection
+    if fetch_columns:
+        if not SNOWFLAKE_AVAILABLE:
+            print("Warning: Cannot fetch columns. snowflake.connector package is not available.")
+        else:
+            print(f"Fetching columns for {len(new_entries)} tables...")
+            try:
+                with get_connection(get_snowflake_credentials()) as conn:
+                    columns = fetch_columns_for_entries(conn, new_entries)
+            except Exception as e:
+                print(f"Error fetching columns from Snowflake: {e}")
+                columns = {}
+            for entry in new_entries:
+                key = (entry["database"].upper(), entry["schema"].upper(), entry["table"].upper())
+                if columns.get(key):
+                    entry["columns"] = columns[key]
+                elif "columns" not in entry:
+                    print(f"  No columns found for {entry['database']}.{entry['schema']}.{entry['table']}")
+    
+    with allowlist.transaction():
+        for entry in new_entries:
+            allowlist.add(entry)
+        allowlist.save()
+    
+    print(f"Added {len(new_entries)} tables to the allowlist.")
+    return len(new_entries)
+
 def main():
     """Main function to add a table to the allowlist"""
     parser = argparse.ArgumentParser(description='Add a table to the table_allowlist.json file.')
     parser.add_argument('--database', default="EDW", help='Database name (default: EDW)')
-    parser.add_argument('--schema', required=True, help='Schema name')
-    parser.add_argument('--table', required=True, help='Table name')
+    parser.add_argument('--schema', help='Schema name (required without --manifest)')
+    parser.add_argument('--table', help='Table name (required without --manifest)')
     parser.add_argument('--tier', type=int, choices=[1, 2, 3, 4], default=2, help='Table tier (1-4) indicating reliability and usage priority (default: 2)')
-    parser.add_argument('--description', required=True, help='Description of the table')
+    parser.add_argument('--description', help='Description of the table (required without --manifest)')
     parser.add_argument('--notes', help='Additional notes about the table')
     parser.add_argument('--common-joins', nargs='+', help='List of common tables to join with')
     parser.add_argument('--key-columns', nargs='+', help='List of key columns in the table')
     parser.add_argument('--columns', nargs='+', help='List of column:datatype pairs (e.g., "order_id:VARCHAR" "created_at:TIMESTAMP_NTZ")')
     parser.add_argument('--add-to-repository', action='store_true', help='Also add to schema repository if not already there')
     parser.add_argument('--fetch-columns', action='store_true', help='Fetch column information from Snowflake')
+    parser.add_argument('--manifest', help='CSV/JSONL manifest of tables to add in one batch')
     
     args = parser.parse_args()
     
+    if args.manifest:
+        add_tables_from_manifest(args.manifest, args.fetch_columns, args.add_to_repository)
+        return
+    
+    missing = [f"--{name}" for name in ("schema", "table", "description") if not getattr(args, name)]
+    if missing:
+        parser.error(f"the following arguments are required: {', '.join(missing)}")
+    
     # Check if the table exists in the schema repository
     repository = load_schema_repository()
     exists_in_repo = table_in_repository({
@@ -203,13 +281,9 @@ def main():
     
     # Process manually specified columns if provided
     if args.columns and "columns" not in table_entry:
-        columns_dict = {}
-        for col_def in args.columns:
-            if ":" in col_def:
-                col_name, col_type = col_def.split(":", 1)
-                columns_dict[col_name] = col_type
-            else:
-                print(f"Warning: Skipping invalid column definition '{col_def}'. Format should be 'column:datatype'")
+        columns_dict, invalid = parse_column_definitions(args.columns)
+        for col_def in invalid:
+            print(f"Warning: Skipping invalid column definition '{col_def}'. Format should be 'column:datatype'")
         
         if columns_dict:
             table_entry["columns"] = columns_dict
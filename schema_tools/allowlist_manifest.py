@@ -0,0 +1,150 @@
+"""
+Allowlist Manifest
+
+This module reads manifests of table entries for the bulk modes of
+add_to_allowlist.py and update_allowlist_entry.py, and fetches column
+information for many tables with one batched metadata query per database.
+
+A manifest is a CSV file with a header row, a JSONL file with one entry per
+line, or a JSON list of entries. Recognized fields:
+
+    database, schema, table, tier, description, notes,
+    common_joins, key_columns, columns
+
+In CSV files the list fields are separated by semicolons and columns are
+column:datatype pairs, e.g. "order_id:VARCHAR;created_at:TIMESTAMP_NTZ".
+Empty CSV cells are treated as not provided.
+
+Usage:
+    python add_to_allowlist.py --manifest new_tables.csv --fetch-columns
+    python update_allowlist_entry.py --manifest updates.jsonl
+"""
+
+import csv
+import json
+
+MANIFEST_FIELDS = ("database", "schema", "table", "tier", "description", "notes",
+                   "common_joins", "key_columns", "columns")
+LIST_FIELDS = ("common_joins", "key_columns")
+LIST_SEPARATOR = ";"
+
+def parse_column_definitions(column_defs):
+    """
+    Parse column:datatype pairs into a {column: datatype} dict.
+
+    Returns:
+        tuple: (columns dict, list of definitions that could not be parsed)
+    """
+    columns = {}
+    invalid = []
+    for col_def in column_defs:
+        if ":" in col_def:
+            col_name, col_type = col_def.split(":", 1)
+            columns[col_name.strip()] = col_type.strip()
+        else:
+            invalid.append(col_def)
+    return columns, invalid
+
+def split_list(value):
+    """Split a semicolon separated CSV cell into a list"""
+    return [item.strip() for item in value.split(LIST_SEPARATOR) if item.strip()]
+
+def normalize_entry(row, line_number):
+    """
+    Convert a manifest row into an allowlist entry with only the provided fields.
+
+    Raises:
+        ValueError: If a field has an invalid value
+    """
+    entry = {}
+    for field in MANIFEST_FIELDS:
+        value = row.get(field)
+        if value is None or value == "" or value == []:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if field in LIST_FIELDS:
+                value = split_list(value)
+            elif field == "columns":
+                value, invalid = parse_column_definitions(split_list(value))
+                if invalid:
+                    raise ValueError(f"line {line_number}: invalid column definitions {invalid}, "
+                                     f"expected column:datatype")
+        if field == "tier":
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"line {line_number}: tier must be a number, got '{value}'")
+            if value not in (1, 2, 3, 4):
+                raise ValueError(f"line {line_number}: tier must be 1-4, got {value}")
+        entry[field] = value
+
+    unknown = set(row) - set(MANIFEST_FIELDS)
+    if unknown:
+        print(f"Warning: line {line_number}: ignoring unknown fields {', '.join(sorted(unknown))}")
+    return entry
+
+def read_manifest_rows(file_path):
+    """Read raw rows from a CSV, JSONL or JSON manifest as (line number, dict) pairs"""
+    lower_path = file_path.lower()
+    with open(file_path, 'r', newline='') as f:
+        if lower_path.endswith('.csv'):
+            # Line 1 is the header
+            return [(number, row) for number, row in enumerate(csv.DictReader(f), start=2)]
+        if lower_path.endswith('.json'):
+            data = json.load(f)
+            if not isinstance(data, list):
+                raise ValueError("A JSON manifest must be a list of table entries")
+            return list(enumerate(data, start=1))
+        rows = []
+        for number, line in enumerate(f, start=1):
+            if line.strip():
+                rows.append((number, json.loads(line)))
+        return rows
+
+def load_manifest(file_path, default_database="EDW", required=("schema", "table")):
+    """
+    Load and validate a manifest of table entries.
+
+    Args:
+        file_path (str): CSV (.csv), JSON (.json) or JSONL (any other extension) manifest
+        default_database (str): Database for entries that do not name one
+        required (tuple): Fields every entry must provide
+
+    Returns:
+        tuple: (list of valid entries, list of error messages for rows that were skipped)
+    """
+    entries = []
+    errors = []
+    for line_number, row in read_manifest_rows(file_path):
+        if not isinstance(row, dict):
+            errors.append(f"line {line_number}: expected an object with table fields")
+            continue
+        try:
+            entry = normalize_entry(row, line_number)
+        except ValueError as e:
+            errors.append(str(e))
+            continue
+        missing = [field for field in required if field not in entry]
+        if missing:
+            errors.append(f"line {line_number}: missing {', '.join(missing)}")
+            continue
+        entry.setdefault("database", default_database)
+        entries.append(entry)
+    return entries, errors
+
+def fetch_columns_for_entries(conn, entries):
+    """
+    Fetch {column: datatype} for every entry with one metadata query per database.
+
+    Returns:
+        dict: (DATABASE, SCHEMA, TABLE) -> {column: datatype}, empty for tables that do not exist
+    """
+    # Imported here so the manifest can be read without the Snowflake utilities on the path
+    from snowflake_metadata import fetch_columns_bulk, table_key
+    tables = [table_key(entry["database"], entry["schema"], entry["table"]) for entry in entries]
+    rows = fetch_columns_bulk(conn, tables, fields=("COLUMN_NAME", "DATA_TYPE"))
+    return {
+        key: {row["COLUMN_NAME"]: row["DATA_TYPE"] for row in columns}
+        for key, columns in rows.items()
+    }
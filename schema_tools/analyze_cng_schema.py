@@ -3,14 +3,25 @@
 Script to analyze the tables in the EDW.CNG schema and generate insights.
 This helps understand patterns in table naming, identify table categories, 
 and generate statistics about table structure.
+
+By default the 100 largest tables are analyzed. With --full, every table and
+column in the schema is fetched in two bulk queries, and prefix/category
+stats, column-count distributions and size histograms are computed in pandas:
+
+    python analyze_cng_schema.py --full
+    python analyze_cng_schema.py --full --database PRODDB --schema PUBLIC
 """
 
 import os
 import json
-import re
+import argparse
 from collections import Counter, defaultdict
-import snowflake.connector
+import numpy as np
+import pandas as pd
 from snowflake_credentials import get_snowflake_credentials
+from snowflake_pool import get_connection
+from catalog_snapshot import fetch_dataframe
+from table_classifier import TableNameClassifier
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.table import Table
@@ -19,10 +30,69 @@ from datetime import datetime
 load_dotenv()
 console = Console()
 
+# Common prefixes to look for
+PREFIX_PATTERNS = [
+    ("dimension_", "dimension tables"),
+    ("dim_", "dimension tables"),
+    ("fact_", "fact tables"),
+    ("agg_", "aggregated tables"),
+    ("vw_", "views"),
+    ("stg_", "staging tables"),
+    ("tmp_", "temporary tables"),
+    ("lkp_", "lookup tables"),
+    ("non_rx_", "non-restaurant"),
+    ("temp_", "temporary tables"),
+    ("snapshot_", "snapshot tables")
+]
+
+# Category patterns to look for (first match wins)
+CATEGORY_PATTERNS = [
+    (r"convenience|conv\b", "Convenience"),
+    (r"grocery", "Grocery"),
+    (r"alcohol|liquor|beer|wine", "Alcohol"),
+    (r"retail", "Retail"),
+    (r"pharmacy|rx\b", "Pharmacy/Rx"),
+    (r"dashmart", "DashMart"),
+    (r"pet|petco", "Pet"),
+    (r"flower", "Flowers"),
+    (r"store_tag", "Store Tagging"),
+    (r"order_item", "Order Items"),
+    (r"delivery", "Deliveries")
+]
+
+CLASSIFIER = TableNameClassifier(PREFIX_PATTERNS, CATEGORY_PATTERNS, default_category="Other")
+
+# Histogram buckets for the full analysis
+COLUMN_COUNT_BINS = [0, 10, 25, 50, 100, 200, np.inf]
+COLUMN_COUNT_LABELS = ["1-10", "11-25", "26-50", "51-100", "101-200", "200+"]
+SIZE_MB_BINS = [-np.inf, 1, 10, 100, 1024, 10 * 1024, 100 * 1024, np.inf]
+SIZE_MB_LABELS = ["<1 MB", "1-10 MB", "10-100 MB", "100 MB-1 GB", "1-10 GB", "10-100 GB", "100 GB+"]
+
+SCHEMA_TABLES_QUERY = """
+SELECT
+    TABLE_NAME,
+    TABLE_TYPE,
+    ROW_COUNT,
+    BYTES,
+    LAST_ALTERED
+FROM {database}.INFORMATION_SCHEMA.TABLES
+WHERE TABLE_SCHEMA = %s
+"""
+
+SCHEMA_COLUMNS_QUERY = """
+SELECT
+    TABLE_NAME,
+    COLUMN_NAME,
+    DATA_TYPE,
+    IS_NULLABLE
+FROM {database}.INFORMATION_SCHEMA.COLUMNS
+WHERE TABLE_SCHEMA = %s
+"""
+
 def connect_to_snowflake():
     """Connect to Snowflake using credentials from snowflake_credentials module"""
     params = get_snowflake_credentials()
-    conn = snowflake.connector.connect(**params)
+    conn = get_connection(params)
     return conn
 
 def get_cng_tables_with_metadata(conn, database="EDW", schema="CNG", limit=100):
@@ -100,28 +170,11 @@ def analyze_table_prefixes(tables):
     """Analyze common prefixes in table names"""
     prefixes = Counter()
     
-    # Common prefixes to look for
-    prefix_patterns = [
-        ("dimension_", "dimension tables"),
-        ("dim_", "dimension tables"),
-        ("fact_", "fact tables"),
-        ("agg_", "aggregated tables"),
-        ("vw_", "views"),
-        ("stg_", "staging tables"),
-        ("tmp_", "temporary tables"),
-        ("lkp_", "lookup tables"),
-        ("non_rx_", "non-restaurant"),
-        ("temp_", "temporary tables"),
-        ("snapshot_", "snapshot tables")
-    ]
-    
     # Count the occurrences of each prefix
     for table in tables:
-        table_name = table["table_name"].lower()
-        for prefix, desc in prefix_patterns:
-            if table_name.startswith(prefix):
-                prefixes[prefix] += 1
-                break
+        prefix = CLASSIFIER.prefix(table["table_name"])
+        if prefix:
+            prefixes[prefix] += 1
     
     return prefixes
 
@@ -129,37 +182,105 @@ def analyze_table_categories(tables):
     """Analyze tables by business category based on name patterns"""
     categories = defaultdict(list)
     
-    # Define category patterns to look for
-    category_patterns = [
-        (r"convenience|conv\b", "Convenience"),
-        (r"grocery", "Grocery"),
-        (r"alcohol|liquor|beer|wine", "Alcohol"),
-        (r"retail", "Retail"),
-        (r"pharmacy|rx\b", "Pharmacy/Rx"),
-        (r"dashmart", "DashMart"),
-        (r"pet|petco", "Pet"),
-        (r"flower", "Flowers"),
-        (r"store_tag", "Store Tagging"),
-        (r"order_item", "Order Items"),
-        (r"delivery", "Deliveries")
-    ]
-    
     # Categorize each table
     for table in tables:
-        table_name = table["table_name"].lower()
-        categorized = False
-        
-        for pattern, category in category_patterns:
-            if re.search(pattern, table_name):
-                categories[category].append(table["table_name"])
-                categorized = True
-                break
-        
-        if not categorized:
-            categories["Other"].append(table["table_name"])
+        categories[CLASSIFIER.category(table["table_name"])].append(table["table_name"])
     
     return categories
 
+def get_schema_frames(conn, database="EDW", schema="CNG"):
+    """
+    Fetch every table and every column in a schema with two bulk queries.
+
+    Returns:
+        tuple: (tables DataFrame, columns DataFrame) with uppercase column names
+    """
+    quoted_database = '"' + database.upper().replace('"', '""') + '"'
+    tables = fetch_dataframe(conn, SCHEMA_TABLES_QUERY.format(database=quoted_database), (schema.upper(),))
+    columns = fetch_dataframe(conn, SCHEMA_COLUMNS_QUERY.format(database=quoted_database), (schema.upper(),))
+    return tables, columns
+
+def classify_prefixes(names):
+    """Vectorized analyze_table_prefixes: the first matching prefix for each name, or "" """
+    return CLASSIFIER.prefix_series(names, default="")
+
+def classify_categories(names):
+    """Vectorized analyze_table_categories: the first matching category for each name, or "Other" """
+    return CLASSIFIER.category_series(names)
+
+def analyze_schema_frames(tables, columns):
+    """
+    Compute whole-schema statistics from the bulk table and column frames.
+
+    Returns:
+        tuple: (tables DataFrame with SIZE_MB, COLUMN_COUNT, PREFIX and CATEGORY added,
+        dict of summary tables keyed by name)
+    """
+    tables = tables.sort_values("BYTES", ascending=False, na_position="last").reset_index(drop=True)
+    tables["ROW_COUNT"] = tables["ROW_COUNT"].fillna(0).astype("int64")
+    tables["SIZE_MB"] = (tables["BYTES"].fillna(0) / (1024 * 1024)).round(2)
+    tables["COLUMN_COUNT"] = tables["TABLE_NAME"].map(columns.groupby("TABLE_NAME").size()).fillna(0).astype("int64")
+    tables["PREFIX"] = classify_prefixes(tables["TABLE_NAME"])
+    tables["CATEGORY"] = classify_categories(tables["TABLE_NAME"])
+    
+    def distribution(values, bins, labels):
+        counts = pd.cut(values, bins=bins, labels=labels).value_counts(sort=False)
+        return counts.rename_axis("BUCKET").reset_index(name="TABLES")
+    
+    summary = {
+        "categories": tables.groupby("CATEGORY").agg(
+            TABLES=("TABLE_NAME", "size"),
+            SIZE_MB=("SIZE_MB", "sum"),
+            ROW_COUNT=("ROW_COUNT", "sum"),
+            AVG_COLUMNS=("COLUMN_COUNT", "mean")
+        ).sort_values("TABLES", ascending=False).reset_index(),
+        "prefixes": tables[tables["PREFIX"] != ""].groupby("PREFIX").agg(
+            TABLES=("TABLE_NAME", "size"),
+            SIZE_MB=("SIZE_MB", "sum")
+        ).sort_values("TABLES", ascending=False).reset_index(),
+        "table_types": tables["TABLE_TYPE"].value_counts().rename_axis("TABLE_TYPE").reset_index(name="TABLES"),
+        "column_counts": distribution(tables.loc[tables["COLUMN_COUNT"] > 0, "COLUMN_COUNT"],
+                                      COLUMN_COUNT_BINS, COLUMN_COUNT_LABELS),
+        "sizes": distribution(tables["SIZE_MB"], SIZE_MB_BINS, SIZE_MB_LABELS),
+        "data_types": columns["DATA_TYPE"].value_counts().head(15).rename_axis("DATA_TYPE").reset_index(name="COLUMNS")
+    }
+    summary["categories"]["AVG_COLUMNS"] = summary["categories"]["AVG_COLUMNS"].round(1)
+    return tables, summary
+
+def frame_prefixes_and_categories(tables):
+    """The analyze_table_prefixes / analyze_table_categories results, from the classified frame"""
+    prefixes = Counter(tables.loc[tables["PREFIX"] != "", "PREFIX"].value_counts().to_dict())
+    categories = tables.groupby("CATEGORY", sort=False)["TABLE_NAME"].agg(list).to_dict()
+    return prefixes, categories
+
+def frame_to_table_list(tables):
+    """Convert the tables frame to the list of dicts used by the display and save functions"""
+    return [
+        {
+            "table_name": row.TABLE_NAME,
+            "table_type": row.TABLE_TYPE,
+            "row_count": int(row.ROW_COUNT),
+            "size_mb": float(row.SIZE_MB),
+            "last_altered": row.LAST_ALTERED,
+            "column_count": int(row.COLUMN_COUNT)
+        }
+        for row in tables.itertuples()
+    ]
+
+def display_summary_frame(title, frame):
+    """Display a summary DataFrame as a rich table"""
+    console.print(f"\n[bold cyan]{title}[/bold cyan]")
+    
+    table = Table(show_header=True, header_style="bold")
+    for i, column in enumerate(frame.columns):
+        table.add_column(column.replace("_", " ").title(), justify="left" if i == 0 else "right")
+    for row in frame.itertuples(index=False):
+        table.add_row(*[f"{value:,.2f}" if isinstance(value, float) else
+                        f"{value:,}" if isinstance(value, (int, np.integer)) else str(value)
+                        for value in row])
+    
+    console.print(table)
+
 def display_largest_tables(tables, limit=20):
     """Display the largest tables by size"""
     console.print("\n[bold cyan]Largest Tables by Size[/bold cyan]")
@@ -237,8 +358,8 @@ def display_category_analysis(categories):
     
     console.print(table)
 
-def save_analysis_to_file(tables, prefixes, categories, filename="cng_schema_analysis.json"):
-    """Save the analysis results to a JSON file"""
+def save_analysis_to_file(tables, prefixes, categories, filename="cng_schema_analysis.json", summary=None):
+    """Save the analysis results to a JSON file (with the full-mode summary tables if given)"""
     # Convert datetime objects to strings and handle other non-serializable types
     def prepare_for_json(obj):
         if isinstance(obj, datetime):
@@ -258,6 +379,11 @@ def save_analysis_to_file(tables, prefixes, categories, filename="cng_schema_ana
         "prefixes": {prefix: count for prefix, count in prefixes.most_common()},
         "categories": {category: tables for category, tables in categories.items()}
     }
+    if summary:
+        analysis["summary"] = {
+            name: json.loads(frame.to_json(orient="records"))
+            for name, frame in summary.items()
+        }
     
     with open(filename, 'w') as f:
         json.dump(analysis, f, indent=2)
@@ -266,35 +392,70 @@ def save_analysis_to_file(tables, prefixes, categories, filename="cng_schema_ana
 
 def main():
     """Main function to analyze the CNG schema"""
-    console.print("[bold]Analyzing EDW.CNG Schema...[/bold]")
-    
-    conn = connect_to_snowflake()
-    
-    console.print("Fetching table metadata...")
-    tables = get_cng_tables_with_metadata(conn)
-    
-    if not tables:
-        console.print("[red]No tables found or error occurred.[/red]")
-        return
+    parser = argparse.ArgumentParser(description="Analyze the tables in a Snowflake schema")
+    parser.add_argument("--database", default="EDW", help="Database name (default: EDW)")
+    parser.add_argument("--schema", default="CNG", help="Schema name (default: CNG)")
+    parser.add_argument("--full", action="store_true",
+                        help="Analyze every table and column in the schema (two bulk queries)")
+    parser.add_argument("--limit", type=int, default=100,
+                        help="Number of largest tables to analyze without --full (default: 100)")
+    parser.add_argument("--output", default="cng_schema_analysis.json", help="Analysis output file")
+    args = parser.parse_args()
+    schema_name = f"{args.database.upper()}.{args.schema.upper()}"
     
-    console.print(f"[green]Found {len(tables)} tables in EDW.CNG schema[/green]")
+    console.print(f"[bold]Analyzing {schema_name} Schema...[/bold]")
     
-    # Analyze table prefixes
-    prefixes = analyze_table_prefixes(tables)
+    conn = connect_to_snowflake()
     
-    # Analyze table categories
-    categories = analyze_table_categories(tables)
+    summary = None
+    if args.full:
+        console.print("Fetching metadata for all tables and columns...")
+        try:
+            tables_frame, columns_frame = get_schema_frames(conn, args.database, args.schema)
+        except Exception as e:
+            console.print(f"[red]Error querying Snowflake: {e}[/red]")
+            conn.close()
+            return
+        if tables_frame.empty:
+            console.print("[red]No tables found or error occurred.[/red]")
+            conn.close()
+            return
+        tables_frame, summary = analyze_schema_frames(tables_frame, columns_frame)
+        tables = frame_to_table_list(tables_frame)
+        prefixes, categories = frame_prefixes_and_categories(tables_frame)
+        console.print(f"[green]Found {len(tables):,} tables and {len(columns_frame):,} columns in {schema_name}[/green]")
+    else:
+        console.print("Fetching table metadata...")
+        tables = get_cng_tables_with_metadata(conn, args.database, args.schema, args.limit)
+        
+        if not tables:
+            console.print("[red]No tables found or error occurred.[/red]")
+            return
+        
+        console.print(f"[green]Found {len(tables)} tables in {schema_name} schema[/green]")
+        
+        # Analyze table prefixes
+        prefixes = analyze_table_prefixes(tables)
+        
+        # Analyze table categories
+        categories = analyze_table_categories(tables)
     
     # Display analysis
     display_largest_tables(tables)
     display_prefix_analysis(prefixes)
     display_category_analysis(categories)
+    if summary:
+        display_summary_frame("Category Statistics", summary["categories"])
+        display_summary_frame("Table Types", summary["table_types"])
+        display_summary_frame("Column Count Distribution", summary["column_counts"])
+        display_summary_frame("Table Size Distribution", summary["sizes"])
+        display_summary_frame("Most Common Column Data Types", summary["data_types"])
     
     # Save analysis to file
-    save_analysis_to_file(tables, prefixes, categories)
+    save_analysis_to_file(tables, prefixes, categories, args.output, summary)
     
     conn.close()
     console.print("[bold green]Analysis complete![/bold green]")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+"""
+Catalog Snapshot Tool
+
+This script exports Snowflake catalog metadata (schemas, tables and columns,
+with types, comments, row counts, sizes and last altered times) into local
+compressed Parquet files, and provides a query layer over the snapshot so
+schema searches can run offline in milliseconds instead of scanning
+INFORMATION_SCHEMA with LIKE queries.
+
+Usage:
+    python catalog_snapshot.py export --database EDW --database PRODDB
+    python catalog_snapshot.py info
+    python catalog_snapshot.py find-columns delivery_id
+    python catalog_snapshot.py find-tables notif
+
+    # Existing commands can use the snapshot with --offline
+    python discover_schema.py find delivery_id --offline
+    python discover_schema.py describe DIMENSION_DELIVERIES --offline
+    python discover_tables.py search NOTIF --offline
+
+The snapshot location defaults to ~/.cache/nv_analytics/catalog and can be
+changed with SNOWFLAKE_CATALOG_SNAPSHOT_DIR or --snapshot-dir.
+"""
+
+import os
+import re
+import json
+import argparse
+from datetime import datetime, timezone
+import pandas as pd
+from snowflake_credentials import get_snowflake_credentials
+from snowflake_pool import get_connection
+
+DEFAULT_SNAPSHOT_DIR = os.path.expanduser(
+    os.getenv('SNOWFLAKE_CATALOG_SNAPSHOT_DIR', '~/.cache/nv_analytics/catalog')
+)
+
+TABLES_FILE = 'tables.parquet'
+COLUMNS_FILE = 'columns.parquet'
+META_FILE = 'meta.json'
+
+TABLES_QUERY = """
+SELECT
+    TABLE_CATALOG AS DATABASE_NAME,
+    TABLE_SCHEMA AS SCHEMA_NAME,
+    TABLE_NAME,
+    TABLE_TYPE,
+    ROW_COUNT,
+    BYTES,
+    CREATED,
+    LAST_ALTERED,
+    COMMENT
+FROM {database}.INFORMATION_SCHEMA.TABLES
+WHERE TABLE_SCHEMA != 'INFORMATION_SCHEMA'
+"""
+
+COLUMNS_QUERY = """
+SELECT
+    TABLE_CATALOG AS DATABASE_NAME,
+    TABLE_SCHEMA AS SCHEMA_NAME,
+    TABLE_NAME,
+    COLUMN_NAME,
+    ORDINAL_POSITION,
+    DATA_TYPE,
+    IS_NULLABLE,
+    COMMENT
+FROM {database}.INFORMATION_SCHEMA.COLUMNS
+WHERE TABLE_SCHEMA != 'INFORMATION_SCHEMA'
+"""
+
+def like_to_regex(pattern):
+    """Convert a SQL LIKE pattern (% and _ wildcards) to a case-insensitive substring regex"""
+    regex = ''.join(
+        '.*' if char == '%' else '.' if char == '_' else re.escape(char)
+        for char in pattern
+    )
+    return re.compile(regex, re.IGNORECASE)
+
+def fetch_dataframe(conn, query, params=None):
+    """Run a query and return the result as a DataFrame with uppercase column names"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        data = cursor.fetch_pandas_all()
+        data.columns = [desc[0].upper() for desc in cursor.description]
+        return data
+    finally:
+        cursor.close()
+
+def export_snapshot(conn, databases, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """
+    Export catalog metadata for the given databases into the snapshot directory.
+    Databases already in the snapshot but not exported again are kept.
+
+    Returns:
+        dict: The snapshot metadata written to meta.json
+    """
+    databases = [database.upper() for database in databases]
+    tables = []
+    columns = []
+    for database in databases:
+        quoted = '"' + database.replace('"', '""') + '"'
+        print(f"Exporting catalog for {database}...")
+        tables.append(fetch_dataframe(conn, TABLES_QUERY.format(database=quoted)))
+        columns.append(fetch_dataframe(conn, COLUMNS_QUERY.format(database=quoted)))
+        print(f"  {len(tables[-1]):,} tables, {len(columns[-1]):,} columns")
+
+    tables = pd.concat(tables, ignore_index=True)
+    columns = pd.concat(columns, ignore_index=True)
+
+    # Merge with an existing snapshot so databases can be refreshed one at a time
+    meta = {'databases': {}}
+    if os.path.exists(os.path.join(snapshot_dir, META_FILE)):
+        existing = CatalogSnapshot(snapshot_dir)
+        meta = existing.meta
+        keep_tables = existing.tables[~existing.tables['DATABASE_NAME'].isin(databases)]
+        keep_columns = existing.columns[~existing.columns['DATABASE_NAME'].isin(databases)]
+        tables = pd.concat([keep_tables, tables], ignore_index=True)
+        columns = pd.concat([keep_columns, columns], ignore_index=True)
+
+    exported_at = datetime.now(timezone.utc).isoformat()
+    for database in databases:
+        meta['databases'][database] = exported_at
+    meta['exported_at'] = exported_at
+    meta['table_count'] = len(tables)
+    meta['column_count'] = len(columns)
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    write_parquet(tables, os.path.join(snapshot_dir, TABLES_FILE))
+    write_parquet(columns, os.path.join(snapshot_dir, COLUMNS_FILE))
+    write_json(meta, os.path.join(snapshot_dir, META_FILE))
+    return meta
+
+def write_parquet(data, path):
+    """Write a DataFrame as zstd-compressed Parquet, replacing the file atomically"""
+    temp_path = f"{path}.tmp"
+    data.to_parquet(temp_path, compression='zstd', index=False)
+    os.replace(temp_path, path)
+
+def write_json(data, path):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_path, path)
+
+class CatalogSnapshot:
+    """Read-only query layer over an exported catalog snapshot"""
+
+    def __init__(self, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+        meta_path = os.path.join(snapshot_dir, META_FILE)
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(
+                f"No catalog snapshot in {snapshot_dir}. Run 'python catalog_snapshot.py export' first."
+            )
+        self.snapshot_dir = snapshot_dir
+        with open(meta_path, 'r') as f:
+            self.meta = json.load(f)
+        self.tables = pd.read_parquet(os.path.join(snapshot_dir, TABLES_FILE))
+        self.columns = pd.read_parquet(os.path.join(snapshot_dir, COLUMNS_FILE))
+
+    def age_description(self):
+        """Describe when the snapshot was exported, e.g. for staleness warnings"""
+        exported_at = datetime.fromisoformat(self.meta['exported_at'])
+        hours = (datetime.now(timezone.utc) - exported_at).total_seconds() / 3600
+        if hours < 48:
+            return f"{hours:.1f} hours ago"
+        return f"{hours / 24:.0f} days ago"
+
+    @staticmethod
+    def _filter(data, database=None, schema=None):
+        if database:
+            data = data[data['DATABASE_NAME'] == database.upper()]
+        if schema:
+            data = data[data['SCHEMA_NAME'] == schema.upper()]
+        return data
+
+    def find_columns(self, pattern, database=None, schema=None):
+        """Find columns whose name matches a LIKE-style pattern"""
+        columns = self._filter(self.columns, database, schema)
+        matches = columns[columns['COLUMN_NAME'].str.contains(like_to_regex(pattern), na=False)]
+        return matches.sort_values(['DATABASE_NAME', 'SCHEMA_NAME', 'TABLE_NAME', 'COLUMN_NAME'])
+
+    def find_tables(self, pattern, database=None, schema=None):
+        """Find tables whose name matches a LIKE-style pattern"""
+        tables = self._filter(self.tables, database, schema)
+        matches = tables[tables['TABLE_NAME'].str.contains(like_to_regex(pattern), na=False)]
+        return matches.sort_values(['DATABASE_NAME', 'SCHEMA_NAME', 'TABLE_NAME'])
+
+    def get_table(self, table_name, database=None, schema=None):
+        """Return the snapshot rows for a table name (several if it exists in multiple schemas)"""
+        tables = self._filter(self.tables, database, schema)
+        return tables[tables['TABLE_NAME'] == table_name.upper()]
+
+    def get_columns(self, table_name, database=None, schema=None):
+        """Return the columns of a table in ordinal order"""
+        columns = self._filter(self.columns, database, schema)
+        columns = columns[columns['TABLE_NAME'] == table_name.upper()]
+        return columns.sort_values(['DATABASE_NAME', 'SCHEMA_NAME', 'ORDINAL_POSITION'])
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and query a local Snowflake catalog snapshot")
+    parser.add_argument("--snapshot-dir", default=DEFAULT_SNAPSHOT_DIR, help="Snapshot directory")
+    subparsers = parser.add_subparsers(dest="command", help="Command to run")
+
+    export_parser = subparsers.add_parser("export", help="Export catalog metadata from Snowflake")
+    export_parser.add_argument("--database", "-d", action="append",
+                               help="Database to export (repeatable, default: SNOWFLAKE_DATABASE)")
+
+    subparsers.add_parser("info", help="Show what the snapshot contains")
+
+    find_columns_parser = subparsers.add_parser("find-columns", help="Find columns matching a pattern")
+    find_columns_parser.add_argument("pattern", help="Column name pattern")
+    find_columns_parser.add_argument("--database", "-d", help="Database name")
+
+    find_tables_parser = subparsers.add_parser("find-tables", help="Find tables matching a pattern")
+    find_tables_parser.add_argument("pattern", help="Table name pattern")
+    find_tables_parser.add_argument("--database", "-d", help="Database name")
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        credentials = get_snowflake_credentials()
+        databases = args.database or [credentials['database']]
+        with get_connection(credentials) as conn:
+            meta = export_snapshot(conn, databases, args.snapshot_dir)
+        print(f"✅ Snapshot saved to {args.snapshot_dir}: "
+              f"{meta['table_count']:,} tables, {meta['column_count']:,} columns")
+    elif args.command == "info":
+        snapshot = CatalogSnapshot(args.snapshot_dir)
+        print(f"Catalog snapshot: {args.snapshot_dir} (exported {snapshot.age_description()})")
+        for database, exported_at in sorted(snapshot.meta['databases'].items()):
+            count = (snapshot.tables['DATABASE_NAME'] == database).sum()
+            print(f"  {database}: {count:,} tables (exported {exported_at})")
+    elif args.command == "find-columns":
+        matches = CatalogSnapshot(args.snapshot_dir).find_columns(args.pattern, args.database)
+        for row in matches.itertuples():
+            print(f"{row.DATABASE_NAME}.{row.SCHEMA_NAME}.{row.TABLE_NAME}.{row.COLUMN_NAME} ({row.DATA_TYPE})")
+        print(f"\nFound {len(matches)} matching columns")
+    elif args.command == "find-tables":
+        matches = CatalogSnapshot(args.snapshot_dir).find_tables(args.pattern, args.database)
+        for row in matches.itertuples():
+            print(f"{row.DATABASE_NAME}.{row.SCHEMA_NAME}.{row.TABLE_NAME} ({row.TABLE_TYPE})")
+        print(f"\nFound {len(matches)} matching tables")
+    else:
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
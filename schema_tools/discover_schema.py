@@ -6,15 +6,15 @@ This script provides utilities to explore Snowflake schema information,
 find tables with specific columns, and analyze table relationships.
 """
 
-import os
-import json
 import argparse
 from rich.console import Console
 from rich.table import Table
-from rich.progress import Progress
 import pandas as pd
 from snowflake_credentials import get_snowflake_credentials
-import snowflake.connector
+from snowflake_pool import get_connection
+from snowflake_metadata import type_family_sql
+from catalog_snapshot import CatalogSnapshot
+from table_store import open_allowlist, empty_allowlist
 
 console = Console()
 
@@ -22,14 +22,14 @@ def connect_to_snowflake():
     """Connect to Snowflake using environment variables."""
     credentials = get_snowflake_credentials()
     
-    conn = snowflake.connector.connect(
-        user=credentials['user'],
-        password=credentials['password'],
-        account=credentials['account'],
-        warehouse=credentials['warehouse'],
-        database=credentials['database'],
-        schema=credentials['schema'],
-    )
+    conn = get_connection({
+        'user': credentials['user'],
+        'password': credentials['password'],
+        'account': credentials['account'],
+        'warehouse': credentials['warehouse'],
+        'database': credentials['database'],
+        'schema': credentials['schema'],
+    })
     return conn
 
 def list_databases(conn):
@@ -195,6 +195,38 @@ def describe_table(conn, table_name, database=None, schema=None):
     except Exception as e:
         console.print(f"[bold red]Error[/bold red]: {e}")
 
+def describe_table_offline(table_name, database=None, schema=None):
+    """Show table information from the local catalog snapshot (see catalog_snapshot.py)."""
+    snapshot = CatalogSnapshot()
+    console.print(f"[dim]Using catalog snapshot exported {snapshot.age_description()}[/dim]")
+    
+    matches = snapshot.get_table(table_name, database, schema)
+    if matches.empty:
+        console.print(f"[yellow]Table {table_name} not found in the catalog snapshot.[/yellow]")
+        return
+    
+    for info in matches.itertuples():
+        columns = snapshot.get_columns(info.TABLE_NAME, info.DATABASE_NAME, info.SCHEMA_NAME)
+        
+        table = Table(title=f"Columns in {info.DATABASE_NAME}.{info.SCHEMA_NAME}.{info.TABLE_NAME}")
+        table.add_column("Column Name", style="cyan")
+        table.add_column("Data Type", style="green")
+        table.add_column("Nullable", style="yellow")
+        table.add_column("Comment", style="white")
+        
+        for row in columns.itertuples():
+            table.add_row(row.COLUMN_NAME, row.DATA_TYPE, row.IS_NULLABLE, row.COMMENT or "")
+        
+        console.print(table)
+        
+        console.print("\n[bold]Table Statistics:[/bold]")
+        if pd.notna(info.ROW_COUNT):
+            console.print(f"Row Count: {int(info.ROW_COUNT):,}")
+        if pd.notna(info.BYTES):
+            console.print(f"Size: {info.BYTES / 1024 / 1024:.2f} MB")
+        console.print(f"Created: {info.CREATED}")
+        console.print(f"Last Modified: {info.LAST_ALTERED}")
+
 def find_columns(conn, pattern, database=None):
     """Find columns matching a pattern across tables."""
     if database:
@@ -231,75 +263,99 @@ def find_columns(conn, pattern, database=None):
     console.print(f"\nFound {count} matching columns")
     cursor.close()
 
-def analyze_relationships(conn, table_name, database=None, schema=None):
-    """Analyze potential relationships between tables based on column names."""
+def find_columns_offline(pattern, database=None):
+    """Find columns matching a pattern in the local catalog snapshot."""
+    snapshot = CatalogSnapshot()
+    console.print(f"[dim]Using catalog snapshot exported {snapshot.age_description()}[/dim]")
+    
+    matches = snapshot.find_columns(pattern, database)
+    
+    table = Table(title=f"Columns matching '{pattern}' in {database.upper() if database else 'catalog snapshot'}")
+    table.add_column("Schema", style="blue")
+    table.add_column("Table", style="cyan")
+    table.add_column("Column", style="green")
+    table.add_column("Data Type", style="yellow")
+    
+    for row in matches.itertuples():
+        schema_name = row.SCHEMA_NAME if database else f"{row.DATABASE_NAME}.{row.SCHEMA_NAME}"
+        table.add_row(schema_name, row.TABLE_NAME, row.COLUMN_NAME, row.DATA_TYPE)
+    
+    console.print(table)
+    console.print(f"\nFound {len(matches)} matching columns")
+
+# Columns that appear in most tables and say nothing about how tables join
+NON_JOIN_COLUMNS = ('created_at', 'updated_at', 'id', 'created_by', 'updated_by')
+
+def analyze_relationships(conn, table_name, database=None, schema=None, match_types=False):
+    """
+    Analyze potential relationships between tables based on column names.
+    All candidate join partners are found with one self-join on INFORMATION_SCHEMA.COLUMNS.
+    With match_types, only columns with compatible data types are reported.
+    """
     if database:
         conn.cursor().execute(f"USE DATABASE {database}")
     if schema:
         conn.cursor().execute(f"USE SCHEMA {schema}")
     
-    # Get columns for the target table
+    schema_filter = f"AND src.TABLE_SCHEMA = '{schema}'" if schema else ""
+    type_filter = ""
+    if match_types:
+        type_filter = f"AND {type_family_sql('src.DATA_TYPE')} = {type_family_sql('tgt.DATA_TYPE')}"
+    excluded = ", ".join(f"'{column}'" for column in NON_JOIN_COLUMNS)
+    
     query = f"""
-    SELECT COLUMN_NAME
-    FROM INFORMATION_SCHEMA.COLUMNS
-    WHERE TABLE_NAME = '{table_name}'
+    SELECT 
+        src.TABLE_SCHEMA,
+        src.COLUMN_NAME,
+        src.DATA_TYPE,
+        tgt.TABLE_SCHEMA,
+        tgt.TABLE_NAME,
+        tgt.COLUMN_NAME,
+        tgt.DATA_TYPE
+    FROM INFORMATION_SCHEMA.COLUMNS src
+    JOIN INFORMATION_SCHEMA.COLUMNS tgt
+        ON tgt.COLUMN_NAME = src.COLUMN_NAME
+        AND (tgt.TABLE_NAME != src.TABLE_NAME OR tgt.TABLE_SCHEMA != src.TABLE_SCHEMA)
+    WHERE src.TABLE_NAME = '{table_name}'
+        {schema_filter}
+        AND LOWER(src.COLUMN_NAME) NOT IN ({excluded})
+        {type_filter}
+    ORDER BY src.TABLE_SCHEMA, src.ORDINAL_POSITION, tgt.TABLE_SCHEMA, tgt.TABLE_NAME
     """
     
-    cursor = conn.cursor()
-    cursor.execute(query)
-    
-    columns = [row[0] for row in cursor]
-    cursor.close()
-    
-    potential_relationships = []
-    
-    with Progress() as progress:
-        task = progress.add_task("[cyan]Analyzing relationships...", total=len(columns))
+    with console.status("[cyan]Analyzing relationships..."):
+        cursor = conn.cursor()
+        cursor.execute(query)
+        
+        potential_relationships = []
+        for row in cursor:
+            potential_relationships.append({
+                'source_table': table_name,
+                'source_schema': row[0],
+                'source_column': row[1],
+                'source_type': row[2],
+                'target_schema': row[3],
+                'target_table': row[4],
+                'target_column': row[5],
+                'target_type': row[6]
+            })
         
-        for column in columns:
-            # Skip some common non-join columns
-            if column.lower() in ('created_at', 'updated_at', 'id', 'created_by', 'updated_by'):
-                progress.update(task, advance=1)
-                continue
-                
-            # Look for potential foreign key relationships
-            query = f"""
-            SELECT 
-                TABLE_SCHEMA,
-                TABLE_NAME,
-                COLUMN_NAME
-            FROM INFORMATION_SCHEMA.COLUMNS
-            WHERE COLUMN_NAME = '{column}'
-                AND (TABLE_NAME != '{table_name}' OR TABLE_SCHEMA != '{schema}')
-            """
-            
-            cursor = conn.cursor()
-            cursor.execute(query)
-            
-            for row in cursor:
-                potential_relationships.append({
-                    'source_table': table_name,
-                    'source_schema': schema,
-                    'source_column': column,
-                    'target_schema': row[0],
-                    'target_table': row[1],
-                    'target_column': row[2]
-                })
-            
-            cursor.close()
-            progress.update(task, advance=1)
+        cursor.close()
     
     if potential_relationships:
-        table = Table(title=f"Potential Relationships for {schema}.{table_name}")
+        source_schema = schema or potential_relationships[0]['source_schema']
+        table = Table(title=f"Potential Relationships for {source_schema}.{table_name}")
         table.add_column("Source Column", style="cyan")
         table.add_column("Target Table", style="green")
         table.add_column("Target Column", style="yellow")
+        table.add_column("Types", style="white")
         
         for rel in potential_relationships:
             table.add_row(
                 rel['source_column'],
                 f"{rel['target_schema']}.{rel['target_table']}",
-                rel['target_column']
+                rel['target_column'],
+                f"{rel['source_type']} → {rel['target_type']}"
             )
         
         console.print(table)
@@ -308,25 +364,15 @@ def analyze_relationships(conn, table_name, database=None, schema=None):
 
 def save_to_allowlist(database, schema, table):
     """Add a table to the allowlist."""
-    allowlist_file = "table_allowlist.json"
-    
-    if os.path.exists(allowlist_file):
-        with open(allowlist_file, 'r') as f:
-            try:
-                allowlist = json.load(f)
-            except json.JSONDecodeError:
-                allowlist = []
-    else:
-        allowlist = []
+    try:
+        allowlist = open_allowlist()
+    except ValueError:
+        allowlist = empty_allowlist()
     
     # Check if table already exists
-    for entry in allowlist:
-        if (isinstance(entry, dict) and 
-            entry.get('database') == database and 
-            entry.get('schema') == schema and 
-            entry.get('table') == table):
-            console.print("[yellow]Table already in allowlist.[/yellow]")
-            return
+    if allowlist.contains(database, schema, table):
+        console.print("[yellow]Table already in allowlist.[/yellow]")
+        return
     
     # Add new entry
     new_entry = {
@@ -339,10 +385,8 @@ def save_to_allowlist(database, schema, table):
         "key_columns": []
     }
     
-    allowlist.append(new_entry)
-    
-    with open(allowlist_file, 'w') as f:
-        json.dump(allowlist, f, indent=2)
+    allowlist.add(new_entry)
+    allowlist.save()
     
     console.print(f"[green]Added {database}.{schema}.{table} to allowlist.[/green]")
 
@@ -369,17 +413,23 @@ def main():
     describe_parser.add_argument("table", help="Table name")
     describe_parser.add_argument("--database", "-d", help="Database name")
     describe_parser.add_argument("--schema", "-s", help="Schema name")
+    describe_parser.add_argument("--offline", action="store_true",
+                                 help="Use the local catalog snapshot instead of Snowflake")
     
     # Find columns command
     find_parser = subparsers.add_parser("find", help="Find columns matching a pattern")
     find_parser.add_argument("pattern", help="Column name pattern")
     find_parser.add_argument("--database", "-d", help="Database name")
+    find_parser.add_argument("--offline", action="store_true",
+                             help="Use the local catalog snapshot instead of Snowflake")
     
     # Analyze relationships command
     analyze_parser = subparsers.add_parser("analyze", help="Analyze table relationships")
     analyze_parser.add_argument("table", help="Table name")
     analyze_parser.add_argument("--database", "-d", help="Database name")
     analyze_parser.add_argument("--schema", "-s", help="Schema name")
+    analyze_parser.add_argument("--match-types", action="store_true",
+                                help="Only report columns with compatible data types")
     
     # Add to allowlist command
     allowlist_parser = subparsers.add_parser("add-to-allowlist", help="Add table to allowlist")
@@ -389,6 +439,17 @@ def main():
     
     args = parser.parse_args()
     
+    # Offline commands read the catalog snapshot and never connect
+    if getattr(args, "offline", False):
+        try:
+            if args.command == "describe":
+                describe_table_offline(args.table, args.database, args.schema)
+            else:
+                find_columns_offline(args.pattern, args.database)
+        except Exception as e:
+            console.print(f"[bold red]Error[/bold red]: {e}")
+        return
+    
     # Connect to Snowflake
     try:
         conn = connect_to_snowflake()
@@ -404,7 +465,7 @@ def main():
         elif args.command == "find":
             find_columns(conn, args.pattern, args.database)
         elif args.command == "analyze":
-            analyze_relationships(conn, args.table, args.database, args.schema)
+            analyze_relationships(conn, args.table, args.database, args.schema, args.match_types)
         elif args.command == "add-to-allowlist":
             save_to_allowlist(args.database, args.schema, args.table)
         else:
@@ -6,18 +6,18 @@ This script helps discover tables available in Snowflake databases and schemas
 to assist in building your table allowlist for documentation.
 """
 
-import snowflake.connector
 import sys
-import json
-import os
 from snowflake_credentials import get_snowflake_credentials
+from snowflake_pool import get_connection
+from catalog_snapshot import CatalogSnapshot
+from table_store import open_allowlist, empty_allowlist
 
 def connect_to_snowflake():
     """Connect to Snowflake using credentials from environment variables"""
     try:
         # Get credentials from environment
         params = get_snowflake_credentials()
-        conn = snowflake.connector.connect(**params)
+        conn = get_connection(params)
         return conn
     except Exception as e:
         print(f"Error connecting to Snowflake: {e}")
@@ -116,38 +116,50 @@ def search_tables(cursor, search_term):
         print(f"Error searching for tables: {e}")
         return []
 
+def search_tables_offline(search_term):
+    """Search for tables matching a search term in the local catalog snapshot"""
+    try:
+        snapshot = CatalogSnapshot()
+    except FileNotFoundError as e:
+        print(f"Error searching for tables: {e}")
+        return []
+    
+    print(f"Using catalog snapshot exported {snapshot.age_description()}")
+    matches = snapshot.find_tables(search_term)
+    results = [(row.DATABASE_NAME, row.SCHEMA_NAME, row.TABLE_NAME) for row in matches.itertuples()]
+    
+    if not results:
+        print(f"No tables found matching '{search_term}'")
+        return []
+    
+    print(f"\n=== Tables matching '{search_term}' ===")
+    for database, schema, table in results:
+        print(f"- {database}.{schema}.{table}")
+    
+    return results
+
 def add_to_allowlist(tables, allowlist_file="table_allowlist.json"):
     """Add discovered tables to the allowlist file"""
     # Load existing allowlist
     try:
-        with open(allowlist_file, 'r') as f:
-            allowlist = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        allowlist = []
+        allowlist = open_allowlist(allowlist_file)
+    except ValueError:
+        allowlist = empty_allowlist(allowlist_file)
     
-    # Add new tables
+    # Add new tables that are not in the allowlist yet
     added = 0
     for table_info in tables:
         database, schema, table = table_info
-        
-        # Check if table already exists in allowlist
-        exists = False
-        for entry in allowlist:
-            if isinstance(entry, dict) and entry.get('table') == table and entry.get('schema') == schema:
-                exists = True
-                break
-        
-        if not exists:
-            allowlist.append({
-                "table": table,
-                "schema": schema,
-                "description": f"Table from {database}.{schema}"
-            })
+        if allowlist.add({
+            "table": table,
+            "schema": schema,
+            "database": database,
+            "description": f"Table from {database}.{schema}"
+        }):
             added += 1
     
     # Write updated allowlist
-    with open(allowlist_file, 'w') as f:
-        json.dump(allowlist, f, indent=2)
+    allowlist.save()
     
     print(f"\nAdded {added} new tables to {allowlist_file}")
     print(f"Total tables in allowlist: {len(allowlist)}")
@@ -206,20 +218,24 @@ def main():
     if len(sys.argv) > 1:
         if sys.argv[1] == "search" and len(sys.argv) > 2:
             # Search mode
-            conn = connect_to_snowflake()
-            cursor = conn.cursor()
-            search_results = search_tables(cursor, sys.argv[2])
+            options = sys.argv[3:]
+            if "--offline" in options:
+                search_results = search_tables_offline(sys.argv[2])
+            else:
+                conn = connect_to_snowflake()
+                cursor = conn.cursor()
+                search_results = search_tables(cursor, sys.argv[2])
+                cursor.close()
+                conn.close()
             
-            if len(sys.argv) > 3 and sys.argv[3] == "--add":
+            if "--add" in options:
                 add_to_allowlist(search_results)
-            
-            cursor.close()
-            conn.close()
         elif sys.argv[1] == "help":
             print("Usage:")
             print("  python discover_tables.py               # Interactive mode")
             print("  python discover_tables.py search TERM   # Search for tables")
             print("  python discover_tables.py search TERM --add  # Search and add to allowlist")
+            print("  python discover_tables.py search TERM --offline  # Search the local catalog snapshot")
             print("  python discover_tables.py help          # Show this help message")
         else:
             print(f"Unknown command: {sys.argv[1]}")
@@ -4,112 +4,524 @@ Schema Documentation Generator
 
 This script generates comprehensive documentation for specified Snowflake tables.
 It creates a markdown file with table structures, column details, and sample data.
+
+Table comments, row counts and column structures are fetched in bulk (one
+catalog query per database), and the sample queries run in parallel on a
+bounded pool of sessions.
+
+Rendered table sections are cached on disk, keyed by a fingerprint of the
+allowlist entry, the table's LAST_ALTERED and its columns. Only tables whose
+fingerprint changed are sampled and rendered again; the document is stitched
+together from the cached sections. The cache lives in
+~/.cache/nv_analytics/schema_docs (SCHEMA_DOCS_CACHE_DIR) and is skipped with
+--no-cache.
+
+Sample data can be made cheaper on very large tables:
+    --sample-method system   Block sampling (TABLESAMPLE SYSTEM) on large tables instead of a plain LIMIT
+    --sample-columns keys    Only select the allowlist key columns
+Samples are cached too and reused until the table's LAST_ALTERED moves.
 """
 
-import snowflake.connector
 import os
 import sys
 import json
+import hashlib
+import argparse
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from snowflake_credentials import get_snowflake_credentials
+from snowflake_pool import get_connection, get_pool, configure_pool
+from snowflake_metadata import fetch_tables_bulk, fetch_columns_bulk, table_key
+from table_store import open_allowlist, empty_allowlist, resolve_store_path
+
+# Sample queries run at once
+DEFAULT_CONCURRENCY = 8
+
+DEFAULT_FRAGMENT_CACHE_DIR = os.path.expanduser(
+    os.getenv('SCHEMA_DOCS_CACHE_DIR', '~/.cache/nv_analytics/schema_docs')
+)
+# A view's LAST_ALTERED only changes with its definition, not with the data under it,
+# so sections and samples of views are never cached
+UNCACHED_TABLE_TYPES = ("VIEW", "MATERIALIZED VIEW")
+
+# Sampling strategies
+SAMPLE_LIMIT = 5
+SAMPLE_METHODS = ("limit", "system")
+SAMPLE_COLUMN_MODES = ("all", "keys")
+# Tables below this size are sampled with a plain LIMIT
+SYSTEM_SAMPLE_MIN_ROWS = 1000000
+# Block sampling probability is chosen to read about this many rows
+SYSTEM_SAMPLE_TARGET_ROWS = 100000
+# Fixed seed so the same blocks are sampled on every run
+SYSTEM_SAMPLE_SEED = 42
+
+STRUCTURE_FIELDS = ("COLUMN_NAME", "DATA_TYPE", "CHARACTER_MAXIMUM_LENGTH", "NUMERIC_PRECISION",
+                    "NUMERIC_SCALE", "IS_NULLABLE", "COLUMN_DEFAULT", "COMMENT")
 
 def connect_to_snowflake():
     """Connect to Snowflake using credentials from environment variables"""
     try:
         # Get credentials from environment
         params = get_snowflake_credentials()
-        conn = snowflake.connector.connect(**params)
+        conn = get_connection(params)
         return conn
     except Exception as e:
         print(f"Error connecting to Snowflake: {e}")
         sys.exit(1)
 
-def get_table_structure(cursor, database, schema, table):
-    """Get the structure of a specific table"""
-    query = f"""
-    SELECT 
-        column_name, 
-        data_type, 
-        character_maximum_length,
-        numeric_precision,
-        numeric_scale,
-        is_nullable,
-        column_default,
-        comment
-    FROM 
-        {database}.information_schema.columns
-    WHERE 
-        table_schema = '{schema}'
-        AND table_name = '{table}'
-    ORDER BY 
-        ordinal_position
+def fetch_table_metadata(conn, tables):
     """
-    
-    try:
-        cursor.execute(query)
-        return cursor.fetchall()
-    except Exception as e:
-        print(f"Error getting structure for {schema}.{table}: {e}")
-        return []
+    Fetch comments, row counts and column structures for many tables in bulk
+    (one INFORMATION_SCHEMA.TABLES and one COLUMNS query per database).
 
-def get_table_comment(cursor, database, schema, table):
-    """Get the comment for a specific table"""
-    query = f"""
-    SELECT 
-        comment
-    FROM 
-        {database}.information_schema.tables
-    WHERE 
-        table_schema = '{schema}'
-        AND table_name = '{table}'
+    Row counts come from INFORMATION_SCHEMA.TABLES.ROW_COUNT instead of a
+    COUNT(*) scan, so they are free even on very large tables (views have none).
+
+    Args:
+        conn: Snowflake connection
+        tables (list): (database, schema, table) tuples
+
+    Returns:
+        dict: (DATABASE, SCHEMA, TABLE) -> {"table_type", "comment", "row_count", "last_altered",
+        "columns"}, where columns are tuples in STRUCTURE_FIELDS order
     """
+    table_rows = fetch_tables_bulk(conn, tables, fields=("TABLE_TYPE", "COMMENT", "ROW_COUNT", "LAST_ALTERED"))
+    column_rows = fetch_columns_bulk(conn, tables, fields=STRUCTURE_FIELDS)
     
-    try:
-        cursor.execute(query)
-        result = cursor.fetchone()
-        return result[0] if result and result[0] else "No description available"
-    except Exception as e:
-        print(f"Error getting comment for {schema}.{table}: {e}")
-        return "No description available"
-
-def get_sample_data(cursor, database, schema, table, limit=5):
-    """Get sample data from a table"""
-    query = f"""
-    SELECT * FROM {database}.{schema}.{table}
-    LIMIT {limit}
+    metadata = {}
+    for table in tables:
+        key = table_key(*table)
+        row = table_rows.get(key) or {}
+        metadata[key] = {
+            "table_type": row.get("TABLE_TYPE"),
+            "comment": row.get("COMMENT"),
+            "row_count": row.get("ROW_COUNT"),
+            "last_altered": row.get("LAST_ALTERED"),
+            "columns": [tuple(column[field] for field in STRUCTURE_FIELDS) for column in column_rows.get(key, [])]
+        }
+    return metadata
+
+def sample_percent(row_count, target_rows=SYSTEM_SAMPLE_TARGET_ROWS):
+    """
+    Block sampling probability (in percent) expected to read about target_rows rows,
+    or None for tables that are small or have no row count (a plain LIMIT is cheap there).
+    """
+    if not row_count or row_count < SYSTEM_SAMPLE_MIN_ROWS:
+        return None
+    return round(max(min(100.0 * target_rows / row_count, 100.0), 0.000001), 6)
+
+def plan_sample(entry, metadata, method="limit", column_mode="all"):
+    """
+    Choose how to sample a table.
+
+    Returns:
+        dict: "columns" (column names to select, or None for all) and
+        "percent" (TABLESAMPLE SYSTEM probability, or None for a plain LIMIT)
     """
+    if method not in SAMPLE_METHODS:
+        raise ValueError(f"Sample method must be one of {', '.join(SAMPLE_METHODS)}, got '{method}'")
+    if column_mode not in SAMPLE_COLUMN_MODES:
+        raise ValueError(f"Sample columns must be one of {', '.join(SAMPLE_COLUMN_MODES)}, got '{column_mode}'")
+    
+    columns = None
+    if column_mode == "keys" and entry["key_columns"]:
+        # Use the names as stored in Snowflake; key columns that do not exist are skipped
+        actual = {column[0].upper(): column[0] for column in metadata["columns"]}
+        columns = [actual[name.upper()] for name in entry["key_columns"] if name.upper() in actual] or None
     
+    percent = sample_percent(metadata["row_count"]) if method == "system" else None
+    return {"columns": columns, "percent": percent}
+
+def build_sample_query(database, schema, table, limit=SAMPLE_LIMIT, columns=None, percent=None):
+    """Build the sample query for a table (see plan_sample)"""
+    select_list = ", ".join('"' + column.replace('"', '""') + '"' for column in columns) if columns else "*"
+    sample_clause = f"TABLESAMPLE SYSTEM ({percent:f}) SEED ({SYSTEM_SAMPLE_SEED})" if percent else ""
+    return f"""
+    SELECT {select_list} FROM {database}.{schema}.{table} {sample_clause}
+    LIMIT {int(limit)}
+    """
+
+def get_sample_data(cursor, database, schema, table, limit=SAMPLE_LIMIT, columns=None, percent=None):
+    """
+    Get sample data from a table.
+
+    Args:
+        columns (list, optional): Columns to select instead of *
+        percent (float, optional): Read a TABLESAMPLE SYSTEM block sample instead of the
+            first blocks; falls back to a plain LIMIT if the sample comes back empty
+    """
     try:
-        cursor.execute(query)
+        cursor.execute(build_sample_query(database, schema, table, limit, columns, percent))
         data = cursor.fetchall()
+        if not data and percent:
+            cursor.execute(build_sample_query(database, schema, table, limit, columns))
+            data = cursor.fetchall()
         columns = [desc[0] for desc in cursor.description]
         return columns, data
     except Exception as e:
         print(f"Error getting sample data for {schema}.{table}: {e}")
         return [], []
 
-def get_table_row_count(cursor, database, schema, table):
-    """Get the row count of a table"""
-    query = f"""
-    SELECT COUNT(*) FROM {database}.{schema}.{table}
+def fetch_sample(params, database, schema, table, plan=None):
+    """Get sample data for one table on a pooled session"""
+    plan = plan or {}
+    with get_connection(params) as conn:
+        cursor = conn.cursor()
+        try:
+            return get_sample_data(cursor, database, schema, table,
+                                   columns=plan.get("columns"), percent=plan.get("percent"))
+        finally:
+            cursor.close()
+
+def fetch_samples(params, tables, concurrency=DEFAULT_CONCURRENCY, plans=None):
     """
+    Get sample data for many tables, running the sample queries concurrently
+    on a bounded pool of sessions.
+
+    Args:
+        plans (dict, optional): (DATABASE, SCHEMA, TABLE) -> sample plan (see plan_sample)
+
+    Returns:
+        dict: (DATABASE, SCHEMA, TABLE) -> (columns, rows)
+    """
+    configure_pool(max_size=max(concurrency, get_pool().max_size))
+    plans = plans or {}
     
-    try:
-        cursor.execute(query)
-        result = cursor.fetchone()
-        return result[0] if result else 0
-    except Exception as e:
-        print(f"Error getting row count for {schema}.{table}: {e}")
-        return "Unknown"
+    samples = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            executor.submit(fetch_sample, params, *table, plans.get(table_key(*table))): table_key(*table)
+            for table in tables
+        }
+        for future in as_completed(futures):
+            try:
+                samples[futures[future]] = future.result()
+            except Exception as e:
+                print(f"Error getting sample data: {e}")
+                samples[futures[future]] = ([], [])
+    return samples
+
+def resolve_table_entry(table_info, current_db, current_schema):
+    """Fill in the database/schema defaults for an allowlist entry (string or dict)"""
+    # Handle both string and dict formats
+    if isinstance(table_info, str):
+        return {
+            "database": current_db, "schema": current_schema, "table": table_info,
+            "description": "", "notes": "", "common_joins": [], "key_columns": []
+        }
+    return {
+        "database": table_info.get('database', current_db),
+        "schema": table_info.get('schema', current_schema),
+        "table": table_info['table'],
+        "description": table_info.get('description', ""),
+        "notes": table_info.get('notes', ""),
+        "common_joins": table_info.get('common_joins', []),
+        "key_columns": table_info.get('key_columns', [])
+    }
+
+def table_anchor(database, schema, table):
+    """Markdown anchor for a table section"""
+    return f"{database.lower()}_{schema.lower()}_{table.lower()}".replace('.', '_')
+
+def render_table_section(entry, metadata, sample):
+    """
+    Render the documentation section for one table.
+
+    Args:
+        entry (dict): Resolved allowlist entry (see resolve_table_entry)
+        metadata (dict): Table metadata (see fetch_table_metadata)
+        sample (tuple): (columns, rows) of sample data
+
+    Returns:
+        str: Markdown for the table
+    """
+    database, schema, table = entry["database"], entry["schema"], entry["table"]
+    key_columns = entry["key_columns"]
+    columns = metadata["columns"]
+    sample_columns, sample_data = sample
+    row_count = metadata["row_count"] if metadata["row_count"] is not None else "Unknown"
+    lines = []
+    
+    # Write table header with full qualification
+    lines.append(f"## <a id='{table_anchor(database, schema, table)}'></a>{database}.{schema}.{table}\n\n")
+    
+    # Description from allowlist or database comment
+    if entry["description"]:
+        lines.append(f"**Description**: {entry['description']}\n\n")
+    if metadata["comment"]:
+        lines.append(f"**Database Comment**: {metadata['comment']}\n\n")
+    
+    # Table notes (from the allowlist)
+    if entry["notes"]:
+        lines.append(f"**Notes**:\n{entry['notes']}\n\n")
+    
+    # Row count
+    lines.append(f"**Row Count**: {row_count}\n\n")
+    
+    # Common joins
+    if entry["common_joins"]:
+        lines.append("**Common Joins**:\n")
+        for join in entry["common_joins"]:
+            # Create a link to the joined table if it's in our allowlist
+            join_parts = join.split('.')
+            if len(join_parts) == 3:  # fully qualified
+                lines.append(f"- [{join}](#{table_anchor(*join_parts)})\n")
+            else:
+                lines.append(f"- {join}\n")
+        lines.append("\n")
+    
+    # Important columns
+    if key_columns:
+        lines.append("**Key Columns**:\n")
+        for col in key_columns:
+            # Try to find the column in the columns list for extra details
+            col_details = next((c for c in columns if c[0].upper() == col.upper()), None)
+            if col_details and col_details[7]:
+                lines.append(f"- `{col}`: {col_details[7]}\n")
+            else:
+                lines.append(f"- `{col}`\n")
+        lines.append("\n")
+    
+    # Write column details
+    lines.append("### Columns\n\n")
+    lines.append("| Column Name | Data Type | Nullable | Default | Description |\n")
+    lines.append("|------------|-----------|----------|---------|-------------|\n")
+    
+    key_column_names = {k.upper() for k in key_columns}
+    for col in columns:
+        col_name = col[0]
+        
+        # Format data type with length/precision/scale if applicable
+        data_type = col[1]
+        if col[2]:  # character_maximum_length
+            data_type += f"({col[2]})"
+        elif col[3] and col[4] is not None:  # numeric_precision and numeric_scale
+            data_type += f"({col[3]},{col[4]})"
+        elif col[3]:  # just numeric_precision
+            data_type += f"({col[3]})"
+        
+        nullable = "YES" if col[5] == "YES" else "NO"
+        default = col[6] if col[6] else ""
+        comment = col[7] if col[7] else ""
+        
+        # Highlight key columns
+        if col_name.upper() in key_column_names:
+            col_name = f"**{col_name}**"
+        
+        lines.append(f"| {col_name} | {data_type} | {nullable} | {default} | {comment} |\n")
+    
+    lines.append("\n")
+    
+    # Write sample data if available
+    lines.append("### Sample Data\n\n")
+    if sample_columns and sample_data:
+        # Write header
+        lines.append("| " + " | ".join(sample_columns) + " |\n")
+        lines.append("|" + "---|" * len(sample_columns) + "\n")
+        
+        # Write data rows
+        for row in sample_data:
+            formatted_row = []
+            for val in row:
+                if val is None:
+                    formatted_row.append("NULL")
+                elif isinstance(val, str):
+                    # Escape pipe characters and format multiline strings
+                    formatted_val = str(val).replace("|", "\\|").replace("\n", "<br>")
+                    # Truncate long strings
+                    if len(formatted_val) > 100:
+                        formatted_val = formatted_val[:100] + "..."
+                    formatted_row.append(formatted_val)
+                else:
+                    formatted_row.append(str(val))
+            lines.append("| " + " | ".join(formatted_row) + " |\n")
+    else:
+        lines.append("*No sample data available*\n")
+    
+    lines.append("\n---\n\n")
+    return "".join(lines)
+
+def cache_dir_for(allowlist_file, output_file, base_dir=DEFAULT_FRAGMENT_CACHE_DIR):
+    """
+    Cache directory for one allowlist and output file, so runs for other allowlists
+    or outputs never prune each other's cached sections and samples.
+    """
+    paths = f"{os.path.abspath(resolve_store_path(allowlist_file))}\n{os.path.abspath(output_file)}"
+    return os.path.join(base_dir, hashlib.sha256(paths.encode('utf-8')).hexdigest()[:16])
+
+class FragmentCache:
+    """Rendered table sections stored on disk as <anchor>.<fingerprint>.md files"""
+
+    def __init__(self, cache_dir=DEFAULT_FRAGMENT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def fingerprint(entry, metadata, sample_plan=None):
+        """Hash of everything a table section depends on except the sample rows"""
+        payload = json.dumps({
+            "entry": entry,
+            "sample_plan": sample_plan,
+            "last_altered": str(metadata["last_altered"]),
+            "comment": metadata["comment"],
+            "columns": hashlib.sha256(json.dumps(metadata["columns"], default=str).encode('utf-8')).hexdigest()
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, anchor, fingerprint):
+        return os.path.join(self.cache_dir, f"{anchor}.{fingerprint}.md")
+
+    def get(self, anchor, fingerprint):
+        """Return the cached section, or None"""
+        try:
+            with open(self._path(anchor, fingerprint), 'r') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, anchor, fingerprint, section):
+        path = self._path(anchor, fingerprint)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(section)
+        os.replace(temp_path, path)
+
+    def prune(self, keep):
+        """Remove every cached section except the fingerprints in keep ({anchor: fingerprint})"""
+        keep_names = {f"{anchor}.{fingerprint}.md" for anchor, fingerprint in keep.items()}
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.md') and name not in keep_names:
+                os.remove(os.path.join(self.cache_dir, name))
+
+class SampleCache:
+    """Sample rows stored on disk as JSON, reused until the table's LAST_ALTERED moves"""
+
+    def __init__(self, cache_dir=os.path.join(DEFAULT_FRAGMENT_CACHE_DIR, 'samples')):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, anchor):
+        return os.path.join(self.cache_dir, f"{anchor}.json")
+
+    def get(self, anchor, plan, last_altered):
+        """Return the cached (columns, rows) if they were taken with the same plan at the same LAST_ALTERED"""
+        if last_altered is None:
+            return None
+        try:
+            with open(self._path(anchor), 'r') as f:
+                cached = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if cached["plan"] != plan or cached["last_altered"] != str(last_altered):
+            return None
+        return cached["columns"], cached["rows"]
+
+    def put(self, anchor, plan, last_altered, sample):
+        """Store a sample (values that are not JSON types are stored as their string form)"""
+        if last_altered is None or not sample[0]:
+            return
+        path = self._path(anchor)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({
+                "plan": plan,
+                "last_altered": str(last_altered),
+                "columns": sample[0],
+                "rows": [list(row) for row in sample[1]]
+            }, f, default=str)
+        os.replace(temp_path, path)
+
+    def prune(self, keep):
+        """Remove cached samples of tables whose anchors are not in keep"""
+        keep_names = {f"{anchor}.json" for anchor in keep}
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json') and name not in keep_names:
+                os.remove(os.path.join(self.cache_dir, name))
 
-def write_markdown_doc(allowlist, output_file="schema_documentation.md"):
-    """Write the schema documentation to a markdown file"""
+def write_markdown_doc(allowlist, output_file="schema_documentation.md", concurrency=DEFAULT_CONCURRENCY,
+                       cache=None, sample_cache=None, sample_method="limit", sample_columns="all"):
+    """
+    Write the schema documentation to a markdown file.
+
+    Args:
+        cache (FragmentCache, optional): Reuse table sections whose fingerprint is unchanged
+        sample_cache (SampleCache, optional): Reuse samples of tables that have not changed
+        sample_method (str): "limit" or "system" (block sampling on large tables)
+        sample_columns (str): "all" or "keys" (only the allowlist key columns)
+    """
     conn = connect_to_snowflake()
     cursor = conn.cursor()
     
     # Get current database and schema
     cursor.execute("SELECT current_database(), current_schema()")
     current_db, current_schema = cursor.fetchone()
+    cursor.close()
+    
+    entries = [resolve_table_entry(table_info, current_db, current_schema) for table_info in allowlist]
+    tables = [(entry["database"], entry["schema"], entry["table"]) for entry in entries]
+    
+    # Fetch metadata for every table in bulk
+    print(f"Fetching metadata for {len(tables)} tables...")
+    metadata = fetch_table_metadata(conn, tables)
+    conn.close()
+    
+    # Views are sampled and rendered on every run (see UNCACHED_TABLE_TYPES)
+    uncached = {key for key, table_metadata in metadata.items()
+                if table_metadata["table_type"] in UNCACHED_TABLE_TYPES}
+    
+    # Reuse the sections of unchanged tables
+    sections = {}
+    fingerprints = {}
+    plans = {}
+    for entry, table in zip(entries, tables):
+        key = table_key(*table)
+        anchor = table_anchor(*table)
+        plans[key] = plan_sample(entry, metadata[key], sample_method, sample_columns)
+        fingerprints[anchor] = FragmentCache.fingerprint(entry, metadata[key], plans[key])
+        if cache and key not in uncached:
+            section = cache.get(anchor, fingerprints[anchor])
+            if section is not None:
+                sections[key] = section
+    
+    # Sample and render the tables that changed, sampling in parallel
+    changed = [(entry, table) for entry, table in zip(entries, tables) if table_key(*table) not in sections]
+    if cache:
+        print(f"{len(entries) - len(changed)} tables unchanged, {len(changed)} to refresh")
+    if changed:
+        # Reuse cached samples of tables that have not been altered
+        samples = {}
+        if sample_cache:
+            for _, table in changed:
+                key = table_key(*table)
+                if key in uncached:
+                    continue
+                sample = sample_cache.get(table_anchor(*table), plans[key], metadata[key]["last_altered"])
+                if sample is not None:
+                    samples[key] = sample
+        
+        to_sample = [table for _, table in changed if table_key(*table) not in samples]
+        if to_sample:
+            print(f"Fetching sample data for {len(to_sample)} tables ({concurrency} at a time)...")
+            fetched = fetch_samples(get_snowflake_credentials(), to_sample, concurrency, plans)
+            for table in to_sample:
+                key = table_key(*table)
+                samples[key] = fetched[key]
+                # A failed sample query returns no columns (an empty table still has them).
+                # Its section is not cached either, so the sample is retried next run.
+                if not fetched[key][0]:
+                    uncached.add(key)
+                elif sample_cache and key not in uncached:
+                    sample_cache.put(table_anchor(*table), plans[key], metadata[key]["last_altered"], fetched[key])
+        
+        for entry, table in changed:
+            key = table_key(*table)
+            sections[key] = render_table_section(entry, metadata[key], samples[key])
+            if cache and key not in uncached:
+                cache.put(table_anchor(*table), fingerprints[table_anchor(*table)], sections[key])
+    if cache:
+        cache.prune(fingerprints)
+    if sample_cache:
+        sample_cache.prune(fingerprints)
     
     with open(output_file, 'w') as f:
         # Write header
@@ -120,176 +532,22 @@ def write_markdown_doc(allowlist, output_file="schema_documentation.md"):
         
         # Table of contents
         f.write("### Table of Contents\n\n")
-        for table_info in allowlist:
-            # Handle both string and dict formats
-            if isinstance(table_info, str):
-                schema = current_schema
-                table = table_info
-                database = current_db
-                description = ""
-            else:
-                schema = table_info.get('schema', current_schema)
-                table = table_info['table']
-                database = table_info.get('database', current_db)
-                description = table_info.get('description', "")
-            
-            anchor = f"{database.lower()}_{schema.lower()}_{table.lower()}".replace('.', '_')
-            f.write(f"- [{database}.{schema}.{table}](#{anchor}) {description}\n")
+        for entry in entries:
+            anchor = table_anchor(entry["database"], entry["schema"], entry["table"])
+            f.write(f"- [{entry['database']}.{entry['schema']}.{entry['table']}](#{anchor}) {entry['description']}\n")
         
         f.write("\n---\n\n")
         
-        # Process each table
-        for table_info in allowlist:
-            # Handle both string and dict formats
-            if isinstance(table_info, str):
-                schema = current_schema
-                table = table_info
-                database = current_db
-                notes = ""
-                common_joins = []
-                key_columns = []
-            else:
-                schema = table_info.get('schema', current_schema)
-                table = table_info['table']
-                database = table_info.get('database', current_db)
-                notes = table_info.get('notes', "")
-                common_joins = table_info.get('common_joins', [])
-                key_columns = table_info.get('key_columns', [])
-            
-            # Print processing status
-            full_table_name = f"{database}.{schema}.{table}"
-            print(f"Processing {full_table_name}...")
-            
-            # Get table comment and other metadata from Snowflake
-            table_comment = get_table_comment(cursor, database, schema, table)
-            columns = get_table_structure(cursor, database, schema, table)
-            row_count = get_table_row_count(cursor, database, schema, table)
-            
-            # Get sample data if available
-            try:
-                sample_columns, sample_data = get_sample_data(cursor, database, schema, table)
-            except Exception as e:
-                print(f"Error getting sample data: {e}")
-                sample_columns, sample_data = [], []
-            
-            # Create anchor for linking
-            anchor = f"{database.lower()}_{schema.lower()}_{table.lower()}".replace('.', '_')
-            
-            # Write table header with full qualification
-            f.write(f"## <a id='{anchor}'></a>{database}.{schema}.{table}\n\n")
-            
-            # Description from allowlist or database comment
-            description = table_info.get('description', "") if isinstance(table_info, dict) else ""
-            if description:
-                f.write(f"**Description**: {description}\n\n")
-            if table_comment and table_comment != "No description available":
-                f.write(f"**Database Comment**: {table_comment}\n\n")
-            
-            # Table notes (from the allowlist)
-            if notes:
-                f.write(f"**Notes**:\n{notes}\n\n")
-            
-            # Row count
-            f.write(f"**Row Count**: {row_count}\n\n")
-            
-            # Common joins
-            if common_joins:
-                f.write("**Common Joins**:\n")
-                for join in common_joins:
-                    # Create a link to the joined table if it's in our allowlist
-                    join_parts = join.split('.')
-                    if len(join_parts) == 3:  # fully qualified
-                        join_db, join_schema, join_table = join_parts
-                        join_anchor = f"{join_db.lower()}_{join_schema.lower()}_{join_table.lower()}".replace('.', '_')
-                        f.write(f"- [{join}](#{join_anchor})\n")
-                    else:
-                        f.write(f"- {join}\n")
-                f.write("\n")
-            
-            # Important columns
-            if key_columns:
-                f.write("**Key Columns**:\n")
-                for col in key_columns:
-                    # Try to find the column in the columns list for extra details
-                    col_details = next((c for c in columns if c[0].upper() == col.upper()), None)
-                    if col_details:
-                        col_comment = col_details[7] if col_details[7] else ""
-                        if col_comment:
-                            f.write(f"- `{col}`: {col_comment}\n")
-                        else:
-                            f.write(f"- `{col}`\n")
-                    else:
-                        f.write(f"- `{col}`\n")
-                f.write("\n")
-            
-            # Write column details
-            f.write("### Columns\n\n")
-            f.write("| Column Name | Data Type | Nullable | Default | Description |\n")
-            f.write("|------------|-----------|----------|---------|-------------|\n")
-            
-            for col in columns:
-                col_name = col[0]
-                
-                # Format data type with length/precision/scale if applicable
-                data_type = col[1]
-                if col[2]:  # character_maximum_length
-                    data_type += f"({col[2]})"
-                elif col[3] and col[4] is not None:  # numeric_precision and numeric_scale
-                    data_type += f"({col[3]},{col[4]})"
-                elif col[3]:  # just numeric_precision
-                    data_type += f"({col[3]})"
-                
-                nullable = "YES" if col[5] == "YES" else "NO"
-                default = col[6] if col[6] else ""
-                comment = col[7] if col[7] else ""
-                
-                # Highlight key columns
-                if key_columns and col_name.upper() in [k.upper() for k in key_columns]:
-                    col_name = f"**{col_name}**"
-                
-                f.write(f"| {col_name} | {data_type} | {nullable} | {default} | {comment} |\n")
-            
-            f.write("\n")
-            
-            # Write sample data if available
-            if sample_columns and sample_data:
-                f.write("### Sample Data\n\n")
-                # Write header
-                f.write("| " + " | ".join(sample_columns) + " |\n")
-                f.write("|" + "---|" * len(sample_columns) + "\n")
-                
-                # Write data rows
-                for row in sample_data:
-                    formatted_row = []
-                    for val in row:
-                        if val is None:
-                            formatted_row.append("NULL")
-                        elif isinstance(val, str):
-                            # Escape pipe characters and format multiline strings
-                            formatted_val = str(val).replace("|", "\\|").replace("\n", "<br>")
-                            # Truncate long strings
-                            if len(formatted_val) > 100:
-                                formatted_val = formatted_val[:100] + "..."
-                            formatted_row.append(formatted_val)
-                        else:
-                            formatted_row.append(str(val))
-                    f.write("| " + " | ".join(formatted_row) + " |\n")
-            else:
-                f.write("### Sample Data\n\n")
-                f.write("*No sample data available*\n")
-            
-            f.write("\n---\n\n")
-    
-    cursor.close()
-    conn.close()
+        # Write each table's section in allowlist order
+        for table in tables:
+            f.write(sections[table_key(*table)])
     
     print(f"Documentation written to {output_file}")
 
 def load_allowlist(allowlist_file):
     """Load the table allowlist from a JSON file"""
     try:
-        with open(allowlist_file, 'r') as f:
-            return json.load(f)
+        return open_allowlist(allowlist_file, missing_ok=False)
     except FileNotFoundError:
         print(f"Allowlist file '{allowlist_file}' not found.")
         return []
@@ -299,7 +557,7 @@ def load_allowlist(allowlist_file):
 
 def create_default_allowlist(output_file="table_allowlist.json"):
     """Create a default allowlist file if none exists"""
-    if os.path.exists(output_file):
+    if os.path.exists(resolve_store_path(output_file)):
         print(f"Allowlist file '{output_file}' already exists. Not overwriting.")
         return
     
@@ -316,44 +574,60 @@ def create_default_allowlist(output_file="table_allowlist.json"):
         }
     ]
     
-    with open(output_file, 'w') as f:
-        json.dump(default_allowlist, f, indent=2)
+    allowlist = empty_allowlist(output_file)
+    for entry in default_allowlist:
+        allowlist.add(entry)
+    allowlist.save()
     
     print(f"Created default allowlist file: {output_file}")
     print("Please edit this file to include the tables you want to document.")
 
 def main():
     """Main function"""
-    allowlist_file = "table_allowlist.json"
-    output_file = "schema_documentation.md"
+    parser = argparse.ArgumentParser(description="Generate markdown documentation for the tables in the allowlist")
+    parser.add_argument("command", nargs="?", choices=["create-allowlist", "help"],
+                        help="create-allowlist: create a default allowlist template")
+    parser.add_argument("--allowlist", default="table_allowlist.json", help="Allowlist file")
+    parser.add_argument("--output", default="schema_documentation.md", help="Documentation file")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Regenerate every table section and re-sample every table")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Sample queries run at once (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--sample-method", choices=SAMPLE_METHODS, default="limit",
+                        help="limit: first rows; system: TABLESAMPLE SYSTEM block sample on large tables")
+    parser.add_argument("--sample-columns", choices=SAMPLE_COLUMN_MODES, default="all",
+                        help="all: every column; keys: only the allowlist key columns")
+    args = parser.parse_args()
     
-    # Check command line arguments
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "create-allowlist":
-            create_default_allowlist(allowlist_file)
-            return
-        elif sys.argv[1] == "help":
-            print("Usage:")
-            print("  python generate_schema_docs.py                  # Generate documentation using allowlist")
-            print("  python generate_schema_docs.py create-allowlist # Create a default allowlist template")
-            print("  python generate_schema_docs.py help             # Show this help message")
-            return
+    if args.command == "create-allowlist":
+        create_default_allowlist(args.allowlist)
+        return
+    if args.command == "help":
+        parser.print_help()
+        return
     
     # Check if allowlist file exists
-    if not os.path.exists(allowlist_file):
-        print(f"Allowlist file '{allowlist_file}' not found.")
+    if not os.path.exists(resolve_store_path(args.allowlist)):
+        print(f"Allowlist file '{args.allowlist}' not found.")
         print("Run 'python generate_schema_docs.py create-allowlist' to create a template.")
         return
     
     # Load allowlist
-    allowlist = load_allowlist(allowlist_file)
+    allowlist = load_allowlist(args.allowlist)
     
     if not allowlist:
         print("Allowlist is empty. Please add tables to document.")
         return
     
     # Generate documentation
-    write_markdown_doc(allowlist, output_file)
+    cache_dir = cache_dir_for(args.allowlist, args.output)
+    write_markdown_doc(
+        allowlist, args.output, args.concurrency,
+        cache=None if args.no_cache else FragmentCache(cache_dir),
+        sample_cache=None if args.no_cache else SampleCache(os.path.join(cache_dir, 'samples')),
+        sample_method=args.sample_method,
+        sample_columns=args.sample_columns
+    )
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,105 @@
+"""
+Table Name Classifier
+
+This module classifies table names by naming prefix and business category in
+a single pass per name. Prefixes are looked up in a character trie, so a name
+is walked once regardless of how many prefixes there are. Category patterns
+are compiled into one regex of prioritized lookahead alternatives, so the
+first pattern in list order wins, the same as trying each pattern in turn
+with re.search.
+
+The classifier can also run over a pandas Series of names. Each distinct name
+is classified once and the results are mapped back, so whole-account catalogs
+with hundreds of thousands of objects (and many repeated names across
+databases) classify quickly.
+
+Usage:
+    from table_classifier import TableNameClassifier
+
+    classifier = TableNameClassifier(
+        prefixes=[("dimension_", "dimension tables"), ("fact_", "fact tables")],
+        categories=[(r"grocery", "Grocery"), (r"alcohol|beer|wine", "Alcohol")]
+    )
+    classifier.prefix("FACT_GROCERY_ORDERS")       # "fact_"
+    classifier.category("FACT_GROCERY_ORDERS")     # "Grocery"
+    frame["CATEGORY"] = classifier.category_series(frame["TABLE_NAME"])
+"""
+
+import re
+
+# Key marking a trie node where a prefix ends; its value is the prefix's position in the list
+_END = None
+
+class TableNameClassifier:
+    """Classifies table names by prefix (trie) and category (combined regex), case-insensitively"""
+
+    def __init__(self, prefixes=(), categories=(), default_category="Other"):
+        """
+        Args:
+            prefixes (list): (prefix, description) pairs, or bare prefix strings, in priority order
+            categories (list): (regex pattern, category) pairs in priority order
+            default_category (str): Category for names that match no pattern
+        """
+        self.prefixes = [prefix if isinstance(prefix, str) else prefix[0] for prefix in prefixes]
+        self.categories = [category for _, category in categories]
+        self.default_category = default_category
+
+        self._trie = {}
+        for position, prefix in enumerate(self.prefixes):
+            node = self._trie
+            for char in prefix.lower():
+                node = node.setdefault(char, {})
+            node.setdefault(_END, position)
+
+        # ^(?:(?=.*?(?P<g0>p0))|(?=.*?(?P<g1>p1))|...) tries the alternatives in order, and each
+        # lookahead searches the whole name, so the first pattern that matches anywhere wins
+        alternatives = "|".join(
+            f"(?=.*?(?P<g{position}>{pattern}))" for position, (pattern, _) in enumerate(categories)
+        )
+        self._category_regex = re.compile(f"^(?:{alternatives})", re.DOTALL) if categories else None
+
+    def prefix(self, name):
+        """Return the highest-priority prefix the name starts with, or None"""
+        node = self._trie
+        best = None
+        for char in name.lower():
+            node = node.get(char)
+            if node is None:
+                break
+            position = node.get(_END)
+            if position is not None and (best is None or position < best):
+                best = position
+        return self.prefixes[best] if best is not None else None
+
+    def category(self, name):
+        """Return the category of the first pattern found in the name, or the default category"""
+        if self._category_regex is None:
+            return self.default_category
+        match = self._category_regex.match(name.lower())
+        if match is None:
+            return self.default_category
+        return self.categories[int(match.lastgroup[1:])]
+
+    def classify(self, name):
+        """Return (prefix, category) for a name"""
+        return self.prefix(name), self.category(name)
+
+    def _map_series(self, names, classify, default):
+        import numpy as np
+        import pandas as pd
+
+        codes, uniques = pd.factorize(names.str.lower())
+        results = np.array([classify(name) for name in uniques] + [default], dtype=object)
+        # Missing names have code -1, which picks the trailing default
+        return pd.Series(results[codes], index=names.index, dtype=object)
+
+    def prefix_series(self, names, default=None):
+        """Vectorized prefix(): the prefix of every name in a Series (default where none matches)"""
+        def classify(name):
+            prefix = self.prefix(name)
+            return default if prefix is None else prefix
+        return self._map_series(names, classify, default)
+
+    def category_series(self, names):
+        """Vectorized category(): the category of every name in a Series"""
+        return self._map_series(names, self.category, self.default_category)
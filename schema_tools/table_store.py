@@ -0,0 +1,599 @@
+#!/usr/bin/env python
+"""
+Table Store
+
+This module provides in-memory stores for table_allowlist.json and
+schema_repository.json. Each store loads its file once and keeps a hash index
+on the normalized (database, schema, table) name, so lookups and upserts are
+O(1) instead of a scan of every entry. Saves replace the file atomically.
+
+Names are compared case-insensitively. Allowlist entries without a database
+belong to EDW.
+
+Both stores also have a SQLite backend with the same interface, for
+repositories too large to rewrite as JSON on every edit. Each write is a
+transaction on an indexed table, so edits are O(log n) and concurrent runs do
+not overwrite each other's changes. The backend is chosen from the file
+extension (.sqlite, .sqlite3 or .db), or by setting SCHEMA_STORE_BACKEND=sqlite,
+which maps the default .json file names to .sqlite files next to them.
+Existing JSON files can be converted with:
+
+    python table_store.py import table_allowlist.json table_allowlist.sqlite
+    python table_store.py export table_allowlist.sqlite table_allowlist.json
+
+Usage:
+    from table_store import open_schema_repository
+
+    repository = open_schema_repository()
+    if not repository.contains("EDW", "CNG", "DIMENSION_NEW_VERTICAL_STORE_TAGS"):
+        repository.add({"database": "EDW", "schema": "CNG", "table": "DIMENSION_NEW_VERTICAL_STORE_TAGS"})
+        repository.save()
+"""
+
+import os
+import sys
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+ALLOWLIST_FILE = "table_allowlist.json"
+REPOSITORY_FILE = "schema_repository.json"
+ALLOWLIST_DEFAULT_DATABASE = "EDW"
+SQLITE_EXTENSIONS = ('.sqlite', '.sqlite3', '.db')
+STORE_BACKEND = os.getenv('SCHEMA_STORE_BACKEND', 'json').lower()
+REPOSITORY_FIELD_ORDER = ("verified_tables", "last_updated")
+REPOSITORY_NOTE = ("This is a lightweight repository of table names that exist in the database. "
+                   "It contains no description or metadata, only verified table names.")
+
+def normalize_key(database, schema, table):
+    """Build the case-insensitive index key for a table"""
+    return (database.lower(), schema.lower(), table.lower())
+
+def entry_key(entry, default_database=None):
+    """
+    Index key for an entry dict with database/schema/table fields. Legacy bare
+    table name strings have no schema, so they are indexed by name with an empty schema.
+    """
+    if isinstance(entry, str):
+        return normalize_key(default_database or "", "", entry)
+    database = entry.get("database") or default_database or ""
+    return normalize_key(database, entry.get("schema", ""), entry.get("table", ""))
+
+def write_json_atomic(data, file_path):
+    """Write JSON to a temporary file and move it into place, so readers never see a partial file"""
+    temp_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+class TableStore:
+    """Ordered list of table entries with a hash index on (database, schema, table)"""
+
+    default_database = None
+
+    def __init__(self, entries=None, file_path=None):
+        self.file_path = file_path
+        self._entries = list(entries or [])
+        self._rebuild_index()
+
+    def _rebuild_index(self):
+        self._index = {}
+        for position, entry in enumerate(self._entries):
+            self._index.setdefault(self.entry_key(entry), position)
+
+    def entry_key(self, entry):
+        """Index key for an entry (see entry_key)"""
+        return entry_key(entry, self.default_database)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    @property
+    def entries(self):
+        """The entries in file order"""
+        return self._entries
+
+    def contains(self, database, schema, table):
+        """Check if a table is in the store"""
+        return normalize_key(database or self.default_database or "", schema, table) in self._index
+
+    def contains_entry(self, entry):
+        """Check if the table described by an entry dict is in the store"""
+        return self.entry_key(entry) in self._index
+
+    def get(self, database, schema, table):
+        """Return the stored entry for a table, or None"""
+        position = self.index_of(database, schema, table)
+        return self._entries[position] if position >= 0 else None
+
+    def index_of(self, database, schema, table):
+        """Return the position of a table's entry, or -1"""
+        return self._index.get(normalize_key(database or self.default_database or "", schema, table), -1)
+
+    def add(self, entry):
+        """Add an entry if its table is not already stored. Returns True if it was added."""
+        key = self.entry_key(entry)
+        if key in self._index:
+            return False
+        self._index[key] = len(self._entries)
+        self._entries.append(entry)
+        return True
+
+    def upsert(self, entry):
+        """
+        Add an entry, or update the stored entry's fields for the same table.
+
+        Returns:
+            bool: True if the entry was added, False if an existing entry was updated
+        """
+        key = self.entry_key(entry)
+        position = self._index.get(key)
+        if position is None:
+            self._index[key] = len(self._entries)
+            self._entries.append(entry)
+            return True
+        # A legacy bare name has no fields to update
+        if isinstance(entry, dict):
+            self._entries[position].update(entry)
+        return False
+
+    def remove(self, database, schema, table):
+        """Remove a table's entry and return it, or None if it was not stored"""
+        position = self.index_of(database, schema, table)
+        if position < 0:
+            return None
+        entry = self._entries.pop(position)
+        self._rebuild_index()
+        return entry
+
+    def remove_where(self, predicate):
+        """Remove every entry for which predicate(entry) is true and return the removed entries"""
+        removed = [entry for entry in self._entries if predicate(entry)]
+        if removed:
+            self._entries[:] = [entry for entry in self._entries if not predicate(entry)]
+            self._rebuild_index()
+        return removed
+
+    def clear(self):
+        """Remove every entry"""
+        self._entries[:] = []
+        self._index = {}
+
+    @contextmanager
+    def transaction(self):
+        """
+        Group several changes (for the SQLite backend). JSON stores only write
+        on save(), so the block is a no-op here.
+        """
+        yield self
+
+    @staticmethod
+    def _read_json(file_path, missing_ok):
+        if missing_ok and not os.path.exists(file_path):
+            return None
+        with open(file_path, 'r') as f:
+            return json.load(f)
+
+class AllowlistStore(TableStore):
+    """Store for table_allowlist.json (a JSON list of table entries)"""
+
+    default_database = ALLOWLIST_DEFAULT_DATABASE
+
+    @classmethod
+    def load(cls, file_path=ALLOWLIST_FILE, missing_ok=True):
+        """
+        Load the allowlist. A missing file gives an empty store unless missing_ok is False.
+
+        Raises:
+            FileNotFoundError: If the file is missing and missing_ok is False
+            json.JSONDecodeError: If the file is not valid JSON
+        """
+        data = cls._read_json(file_path, missing_ok)
+        return cls(data or [], file_path)
+
+    def save(self, file_path=None):
+        """Write the allowlist back to its file (or to file_path)"""
+        file_path = file_path or self.file_path or ALLOWLIST_FILE
+        write_json_atomic(self._entries, file_path)
+
+class SchemaRepositoryStore(TableStore):
+    """
+    Store for schema_repository.json. Entries are the verified_tables; the other
+    top-level fields (last_updated, note, watermarks, ...) are kept in `data`.
+    """
+
+    def __init__(self, data=None, file_path=None):
+        # Saves keep the field order of the loaded file
+        self.field_order = list(data) if data else None
+        data = dict(data or {"note": REPOSITORY_NOTE})
+        super().__init__(data.pop("verified_tables", []), file_path)
+        self.data = data
+
+    @classmethod
+    def load(cls, file_path=REPOSITORY_FILE, missing_ok=True):
+        """
+        Load the schema repository. A missing file gives an empty store unless missing_ok is False.
+
+        Raises:
+            FileNotFoundError: If the file is missing and missing_ok is False
+            json.JSONDecodeError: If the file is not valid JSON
+        """
+        data = cls._read_json(file_path, missing_ok)
+        return cls(data, file_path)
+
+    def save(self, file_path=None, touch=True):
+        """Write the repository back to its file, updating last_updated unless touch is False"""
+        if touch:
+            self.data["last_updated"] = datetime.now().strftime("%Y-%m-%d")
+        file_path = file_path or self.file_path or REPOSITORY_FILE
+        write_json_atomic(repository_document(self.data, self._entries, self.field_order), file_path)
+
+def repository_document(data, entries, field_order=None):
+    """
+    Assemble the schema_repository.json document. Fields are written in field_order
+    (the order of the loaded file), by default verified_tables and last_updated first,
+    followed by any other fields.
+    """
+    fields = {"verified_tables": list(entries), **data}
+    document = {}
+    for name in field_order or REPOSITORY_FIELD_ORDER:
+        if name in fields:
+            document[name] = fields[name]
+    document.update((name, value) for name, value in fields.items() if name not in document)
+    return document
+
+def merge_field(base, ours, theirs):
+    """
+    Three-way merge of a repository metadata field: apply this run's changes (base -> ours)
+    to the value currently stored (theirs), key by key for dicts and item by item for lists,
+    so concurrent runs that change different watermarks or dropped tables keep both changes.
+    """
+    if isinstance(base, dict) and isinstance(ours, dict) and isinstance(theirs, dict):
+        merged = dict(theirs)
+        for name in set(base) | set(ours):
+            if name not in ours:
+                merged.pop(name, None)
+            elif name not in base or base[name] != ours[name]:
+                merged[name] = ours[name]
+        return merged
+    if isinstance(base, list) and isinstance(ours, list) and isinstance(theirs, list):
+        def item_key(item):
+            return json.dumps(item, sort_keys=True)
+        base_keys = {item_key(item) for item in base}
+        our_keys = {item_key(item) for item in ours}
+        removed = base_keys - our_keys
+        merged = [item for item in theirs if item_key(item) not in removed]
+        merged_keys = {item_key(item) for item in merged}
+        merged.extend(item for item in ours if item_key(item) not in base_keys | merged_keys)
+        return merged
+    return ours
+
+class SqliteTableStore:
+    """
+    SQLite-backed table store with the same interface as TableStore.
+
+    Entries are stored as JSON with a unique index on the normalized name.
+    Every change runs in its own transaction unless it is inside transaction().
+    Entries returned by get() and iteration are copies: use upsert() to change them.
+    """
+
+    default_database = None
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        database_key TEXT,
+        schema_key TEXT,
+        table_key TEXT,
+        entry TEXT NOT NULL
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS entries_name ON entries (database_key, schema_key, table_key);
+    CREATE TABLE IF NOT EXISTS metadata (
+        name TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        # Autocommit mode; writes open explicit transactions so concurrent runs wait on the lock
+        self._conn = sqlite3.connect(file_path, timeout=30, isolation_level=None)
+        self._conn.executescript(self.SCHEMA)
+        self._in_transaction = False
+
+    @classmethod
+    def load(cls, file_path, missing_ok=True):
+        """
+        Open a SQLite store, creating it unless missing_ok is False.
+
+        Raises:
+            FileNotFoundError: If the file is missing and missing_ok is False
+        """
+        if not missing_ok and not os.path.exists(file_path):
+            raise FileNotFoundError(f"No such file: '{file_path}'")
+        return cls(file_path)
+
+    def entry_key(self, entry):
+        """Index key for an entry (see entry_key)"""
+        return entry_key(entry, self.default_database)
+
+    def _key(self, database, schema, table):
+        return normalize_key(database or self.default_database or "", schema, table)
+
+    @contextmanager
+    def transaction(self):
+        """Group several changes into one transaction (committed when the block succeeds)"""
+        if self._in_transaction:
+            yield self
+            return
+        self._conn.execute("BEGIN IMMEDIATE")
+        self._in_transaction = True
+        try:
+            yield self
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        finally:
+            self._in_transaction = False
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def __iter__(self):
+        # Fetched up front so callers can upsert while iterating
+        return iter(self.entries)
+
+    @property
+    def entries(self):
+        """The entries in insertion order (copies)"""
+        rows = self._conn.execute("SELECT entry FROM entries ORDER BY id").fetchall()
+        return [json.loads(entry) for (entry,) in rows]
+
+    def _find(self, key):
+        return self._conn.execute(
+            "SELECT id, entry FROM entries WHERE database_key = ? AND schema_key = ? AND table_key = ?",
+            key
+        ).fetchone()
+
+    def contains(self, database, schema, table):
+        """Check if a table is in the store"""
+        return self._find(self._key(database, schema, table)) is not None
+
+    def contains_entry(self, entry):
+        """Check if the table described by an entry dict is in the store"""
+        return self._find(self.entry_key(entry)) is not None
+
+    def get(self, database, schema, table):
+        """Return a copy of the stored entry for a table, or None"""
+        row = self._find(self._key(database, schema, table))
+        return json.loads(row[1]) if row else None
+
+    def index_of(self, database, schema, table):
+        """Return the position of a table's entry, or -1"""
+        row = self._find(self._key(database, schema, table))
+        if row is None:
+            return -1
+        return self._conn.execute("SELECT COUNT(*) FROM entries WHERE id < ?", (row[0],)).fetchone()[0]
+
+    def add(self, entry):
+        """Add an entry if its table is not already stored. Returns True if it was added."""
+        key = self.entry_key(entry)
+        with self.transaction():
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO entries (database_key, schema_key, table_key, entry) VALUES (?, ?, ?, ?)",
+                (*key, json.dumps(entry))
+            )
+            return cursor.rowcount == 1
+
+    def upsert(self, entry):
+        """
+        Add an entry, or update the stored entry's fields for the same table.
+
+        Returns:
+            bool: True if the entry was added, False if an existing entry was updated
+        """
+        key = self.entry_key(entry)
+        with self.transaction():
+            row = self._find(key)
+            if row is None:
+                self._conn.execute(
+                    "INSERT INTO entries (database_key, schema_key, table_key, entry) VALUES (?, ?, ?, ?)",
+                    (*key, json.dumps(entry))
+                )
+                return True
+            if isinstance(entry, dict):
+                merged = {**json.loads(row[1]), **entry}
+                self._conn.execute("UPDATE entries SET entry = ? WHERE id = ?", (json.dumps(merged), row[0]))
+            return False
+
+    def remove(self, database, schema, table):
+        """Remove a table's entry and return it, or None if it was not stored"""
+        with self.transaction():
+            row = self._find(self._key(database, schema, table))
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM entries WHERE id = ?", (row[0],))
+            return json.loads(row[1])
+
+    def remove_where(self, predicate):
+        """Remove every entry for which predicate(entry) is true and return the removed entries"""
+        removed = []
+        with self.transaction():
+            for row_id, entry in self._conn.execute("SELECT id, entry FROM entries ORDER BY id").fetchall():
+                entry = json.loads(entry)
+                if predicate(entry):
+                    self._conn.execute("DELETE FROM entries WHERE id = ?", (row_id,))
+                    removed.append(entry)
+        return removed
+
+    def clear(self):
+        """Remove every entry"""
+        with self.transaction():
+            self._conn.execute("DELETE FROM entries")
+
+    def save(self, file_path=None):
+        """Changes are committed as they are made; saving to another path exports JSON"""
+        if file_path and file_path != self.file_path:
+            write_json_atomic(self.entries, file_path)
+
+    def close(self):
+        self._conn.close()
+
+class SqliteAllowlistStore(SqliteTableStore):
+    """SQLite-backed allowlist store"""
+
+    default_database = ALLOWLIST_DEFAULT_DATABASE
+
+class SqliteSchemaRepositoryStore(SqliteTableStore):
+    """SQLite-backed schema repository; `data` holds the repository metadata fields"""
+
+    field_order = None
+
+    def __init__(self, file_path):
+        super().__init__(file_path)
+        self.data = self._read_metadata()
+        # Snapshot of the stored fields, so save() only writes what this run changed
+        self._saved = json.loads(json.dumps(self.data))
+        if not self.data and not len(self):
+            self.data["note"] = REPOSITORY_NOTE
+
+    def _read_metadata(self):
+        rows = self._conn.execute("SELECT name, value FROM metadata ORDER BY rowid")
+        return {name: json.loads(value) for name, value in rows}
+
+    def save(self, file_path=None, touch=True):
+        """
+        Write the metadata fields this run changed, updating last_updated unless touch is False.
+        Changes are merged into the currently stored fields (see merge_field), and `data`
+        is refreshed with the result.
+        """
+        if touch:
+            self.data["last_updated"] = datetime.now().strftime("%Y-%m-%d")
+        if file_path and file_path != self.file_path:
+            write_json_atomic(repository_document(self.data, self.entries), file_path)
+            return
+        with self.transaction():
+            stored = self._read_metadata()
+            for name in list(self._saved) + [name for name in self.data if name not in self._saved]:
+                if name not in self.data:
+                    self._conn.execute("DELETE FROM metadata WHERE name = ?", (name,))
+                    stored.pop(name, None)
+                    continue
+                if name in self._saved and self._saved[name] == self.data[name]:
+                    continue
+                value = self.data[name]
+                if name in stored:
+                    # A field another run added since this store was opened merges from empty
+                    base = self._saved.get(name, type(value)() if isinstance(value, (dict, list)) else None)
+                    value = merge_field(base, value, stored[name])
+                self._conn.execute(
+                    "INSERT INTO metadata (name, value) VALUES (?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+                    (name, json.dumps(value))
+                )
+                stored[name] = value
+        self.data.clear()
+        self.data.update(stored)
+        self._saved = json.loads(json.dumps(stored))
+
+def is_sqlite_path(file_path):
+    """Check if a store path uses the SQLite backend"""
+    return file_path.lower().endswith(SQLITE_EXTENSIONS)
+
+def resolve_store_path(file_path):
+    """Apply SCHEMA_STORE_BACKEND=sqlite: a .json path maps to the .sqlite file next to it"""
+    if STORE_BACKEND == 'sqlite' and file_path.lower().endswith('.json'):
+        return file_path[:-len('.json')] + '.sqlite'
+    return file_path
+
+def open_allowlist(file_path=ALLOWLIST_FILE, missing_ok=True):
+    """Open the allowlist with the backend matching its path (see module docstring)"""
+    file_path = resolve_store_path(file_path)
+    if is_sqlite_path(file_path):
+        return SqliteAllowlistStore.load(file_path, missing_ok)
+    return AllowlistStore.load(file_path, missing_ok)
+
+def open_schema_repository(file_path=REPOSITORY_FILE, missing_ok=True):
+    """Open the schema repository with the backend matching its path (see module docstring)"""
+    file_path = resolve_store_path(file_path)
+    if is_sqlite_path(file_path):
+        return SqliteSchemaRepositoryStore.load(file_path, missing_ok)
+    return SchemaRepositoryStore.load(file_path, missing_ok)
+
+def empty_allowlist(file_path=ALLOWLIST_FILE):
+    """
+    A new allowlist store that saves to file_path, used when the existing file cannot be read.
+    A SQLite store is opened as is (it is only empty if the file is new).
+    """
+    file_path = resolve_store_path(file_path)
+    if is_sqlite_path(file_path):
+        return SqliteAllowlistStore(file_path)
+    return AllowlistStore(file_path=file_path)
+
+def empty_schema_repository(file_path=REPOSITORY_FILE):
+    """A new schema repository store that saves to file_path (see empty_allowlist)"""
+    file_path = resolve_store_path(file_path)
+    if is_sqlite_path(file_path):
+        return SqliteSchemaRepositoryStore(file_path)
+    return SchemaRepositoryStore(file_path=file_path)
+
+def import_json(json_path, sqlite_path):
+    """Copy a JSON allowlist or schema repository into a SQLite store"""
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        store = SqliteAllowlistStore(sqlite_path)
+        entries = data
+    else:
+        store = SqliteSchemaRepositoryStore(sqlite_path)
+        entries = data.get("verified_tables", [])
+        store.data = {name: value for name, value in data.items() if name != "verified_tables"}
+    with store.transaction():
+        store.clear()
+        for entry in entries:
+            store.add(entry)
+        if isinstance(store, SqliteSchemaRepositoryStore):
+            store.save(touch=False)
+    return store
+
+def export_json(sqlite_path, json_path):
+    """Write a SQLite store back out as a JSON allowlist or schema repository"""
+    conn = sqlite3.connect(sqlite_path)
+    try:
+        has_metadata = conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0] > 0
+    finally:
+        conn.close()
+    if has_metadata:
+        store = SqliteSchemaRepositoryStore(sqlite_path)
+        write_json_atomic(repository_document(store.data, store.entries), json_path)
+    else:
+        store = SqliteAllowlistStore(sqlite_path)
+        write_json_atomic(store.entries, json_path)
+    return store
+
+def main():
+    if len(sys.argv) != 4 or sys.argv[1] not in ("import", "export"):
+        print("Usage:")
+        print("  python table_store.py import <file.json> <file.sqlite>   # Convert JSON to SQLite")
+        print("  python table_store.py export <file.sqlite> <file.json>   # Convert SQLite to JSON")
+        return 1
+
+    command, source, target = sys.argv[1:]
+    if command == "import":
+        store = import_json(source, target)
+    else:
+        store = export_json(source, target)
+    print(f"{'Imported' if command == 'import' else 'Exported'} {len(store)} tables from {source} to {target}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,81 +1,147 @@
 #!/usr/bin/env python
 """
 Script to update an existing table entry in the table_allowlist.json file.
+
+With --manifest, every entry in a CSV/JSONL manifest is applied with one load
+and one save of the allowlist (see allowlist_manifest.py for the format).
 """
 
-import json
 import argparse
-from datetime import datetime
+from table_store import AllowlistStore, open_allowlist, empty_allowlist
+from allowlist_manifest import load_manifest, fetch_columns_for_entries
+try:
+    from snowflake_credentials import get_snowflake_credentials
+    from snowflake_pool import get_connection
+    SNOWFLAKE_AVAILABLE = True
+except ImportError:
+    SNOWFLAKE_AVAILABLE = False
+
+UPDATE_FIELDS = ("tier", "description", "notes", "key_columns", "common_joins", "columns")
 
 def load_allowlist(file_path="table_allowlist.json"):
-    """Load the table allowlist from a JSON file"""
+    """Load the table allowlist store (iterates like the list of entries)"""
     try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
+        return open_allowlist(file_path, missing_ok=False)
     except Exception as e:
         print(f"Error loading allowlist: {e}")
-        return []
+        return empty_allowlist(file_path)
 
 def find_table_in_allowlist(table_info, allowlist):
     """Find a table in the allowlist and return its index"""
-    for i, table in enumerate(allowlist):
-        database_name = table.get("database", "EDW")
-        if (database_name.lower() == table_info["database"].lower() and
-            table["schema"].lower() == table_info["schema"].lower() and
-            table["table"].lower() == table_info["table"].lower()):
-            return i
-    return -1
+    if isinstance(allowlist, list):
+        allowlist = AllowlistStore(allowlist)
+    return allowlist.index_of(table_info["database"], table_info["schema"], table_info["table"])
 
 def update_table_in_allowlist(table_info, file_path="table_allowlist.json"):
     """Update an existing table entry in the allowlist"""
     allowlist = load_allowlist(file_path)
     
     # Find the table in the allowlist
-    idx = find_table_in_allowlist(table_info, allowlist)
+    current_entry = allowlist.get(table_info["database"], table_info["schema"], table_info["table"])
     
-    if idx == -1:
+    if current_entry is None:
         print(f"Table {table_info['database']}.{table_info['schema']}.{table_info['table']} not found in the allowlist.")
         return False
     
     # Update the table entry
-    current_entry = allowlist[idx]
-    
-    # Only update fields that are provided
-    if "tier" in table_info:
-        current_entry["tier"] = table_info["tier"]
-    if "description" in table_info:
-        current_entry["description"] = table_info["description"]
-    if "notes" in table_info:
-        current_entry["notes"] = table_info["notes"]
-    if "key_columns" in table_info:
-        current_entry["key_columns"] = table_info["key_columns"]
-    if "common_joins" in table_info:
-        current_entry["common_joins"] = table_info["common_joins"]
-    if "columns" in table_info:
-        current_entry["columns"] = table_info["columns"]
+    apply_updates(current_entry, table_info)
     
     # Write back to the file
-    with open(file_path, 'w') as f:
-        json.dump(allowlist, f, indent=2)
+    allowlist.upsert(current_entry)
+    allowlist.save()
     
     print(f"Updated {table_info['database']}.{table_info['schema']}.{table_info['table']} in the allowlist.")
     return True
 
+def apply_updates(current_entry, table_info):
+    """Copy the fields provided in table_info onto an allowlist entry"""
+    # Only update fields that are provided
+    for field in UPDATE_FIELDS:
+        if field in table_info:
+            current_entry[field] = table_info[field]
+
+def update_tables_from_manifest(manifest_file, fetch_columns=False, file_path="table_allowlist.json"):
+    """
+    Apply every entry in a manifest to the allowlist with one load and one save.
+    Tables that are not in the allowlist are reported and skipped.
+
+    Returns:
+        int: Number of tables updated
+    """
+    try:
+        entries, errors = load_manifest(manifest_file)
+    except (OSError, ValueError) as e:
+        print(f"Error reading manifest: {e}")
+        return 0
+    for error in errors:
+        print(f"Skipping manifest entry, {error}")
+    
+    allowlist = load_allowlist(file_path)
+    
+    updates = []
+    for table_info in entries:
+        current_entry = allowlist.get(table_info["database"], table_info["schema"], table_info["table"])
+        if current_entry is None:
+            print(f"Table {table_info['database']}.{table_info['schema']}.{table_info['table']} not found in the allowlist.")
+            continue
+        updates.append((current_entry, table_info))
+    
+    if not updates:
+        print("No tables to update.")
+        return 0
+    
+    # Fetch columns for all tables over one connection (manifest columns take precedence)
+    if fetch_columns:
+        if not SNOWFLAKE_AVAILABLE:
+            print("Warning: Cannot fetch columns. snowflake.connector package is not available.")
+        else:
+            print(f"Fetching columns for {len(updates)} tables...")
+            try:
+                with get_connection(get_snowflake_credentials()) as conn:
+                    columns = fetch_columns_for_entries(conn, [table_info for _, table_info in updates])
+            except Exception as e:
+                print(f"Error fetching columns from Snowflake: {e}")
+                columns = {}
+            for _, table_info in updates:
+                key = (table_info["database"].upper(), table_info["schema"].upper(), table_info["table"].upper())
+                if columns.get(key) and "columns" not in table_info:
+                    table_info["columns"] = columns[key]
+    
+    with allowlist.transaction():
+        for current_entry, table_info in updates:
+            apply_updates(current_entry, table_info)
+            allowlist.upsert(current_entry)
+        allowlist.save()
+    
+    print(f"Updated {len(updates)} tables in the allowlist.")
+    return len(updates)
+
 def main():
     """Main function to update a table in the allowlist"""
     parser = argparse.ArgumentParser(description='Update a table entry in the table_allowlist.json file.')
     parser.add_argument('--database', default="EDW", help='Database name (default: EDW)')
-    parser.add_argument('--schema', required=True, help='Schema name')
-    parser.add_argument('--table', required=True, help='Table name')
+    parser.add_argument('--schema', help='Schema name (required without --manifest)')
+    parser.add_argument('--table', help='Table name (required without --manifest)')
     parser.add_argument('--tier', type=int, choices=[1, 2, 3, 4], help='Table tier (1-4) indicating reliability and usage priority')
     parser.add_argument('--description', help='Description of the table')
     parser.add_argument('--notes', help='Additional notes about the table')
     parser.add_argument('--common-joins', nargs='+', help='List of common tables to join with')
     parser.add_argument('--key-columns', nargs='+', help='List of key columns in the table')
     parser.add_argument('--columns', nargs='+', help='List of column:datatype pairs (e.g., "order_id:VARCHAR" "created_at:TIMESTAMP_NTZ")')
+    parser.add_argument('--manifest', help='CSV/JSONL manifest of table updates to apply in one batch')
+    parser.add_argument('--fetch-columns', action='store_true',
+                        help='With --manifest, fetch column information from Snowflake for every table')
     
     args = parser.parse_args()
     
+    if args.manifest:
+        update_tables_from_manifest(args.manifest, args.fetch_columns)
+        return
+    
+    missing = [f"--{name}" for name in ("schema", "table") if not getattr(args, name)]
+    if missing:
+        parser.error(f"the following arguments are required: {', '.join(missing)}")
+    
     # Create the table entry for the allowlist
     table_entry = {
         "table": args.table,
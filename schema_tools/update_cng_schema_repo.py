@@ -5,19 +5,17 @@ This focused approach allows us to build a comprehensive list of available CNG t
 without overwhelming the repository with every table in Snowflake.
 """
 
-import os
-import json
-from datetime import datetime
-import snowflake.connector
 from dotenv import load_dotenv
 from snowflake_credentials import get_snowflake_credentials
+from snowflake_pool import get_connection
+from table_store import open_schema_repository, empty_schema_repository
 
 load_dotenv()
 
 def connect_to_snowflake():
     """Connect to Snowflake using credentials from snowflake_credentials module"""
     params = get_snowflake_credentials()
-    conn = snowflake.connector.connect(**params)
+    conn = get_connection(params)
     return conn
 
 def get_cng_tables(conn, database="EDW", schema="CNG"):
@@ -56,43 +54,19 @@ def update_schema_repository(tables, output_file="schema_repository.json"):
     """Update the schema_repository.json file with the tables from Snowflake"""
     try:
         # Load existing repository if it exists
-        with open(output_file, 'r') as f:
-            repository = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Create a new repository if it doesn't exist or is invalid
-        repository = {
-            "last_updated": datetime.now().strftime("%Y-%m-%d"),
-            "verified_tables": [],
-            "note": "This is a lightweight repository of table names that exist in the database. It contains no description or metadata, only verified table names."
-        }
-    
-    # Track the new tables added
-    new_tables = 0
+        repository = open_schema_repository(output_file)
+    except ValueError:
+        # Create a new repository if it is invalid
+        repository = empty_schema_repository(output_file)
     
     # Add each table to the repository if it doesn't already exist
-    for table in tables:
-        # Check if the table already exists
-        table_exists = False
-        for repo_table in repository["verified_tables"]:
-            if (repo_table["database"].lower() == table["database"].lower() and
-                repo_table["schema"].lower() == table["schema"].lower() and
-                repo_table["table"].lower() == table["table"].lower()):
-                table_exists = True
-                break
-        
-        if not table_exists:
-            repository["verified_tables"].append(table)
-            new_tables += 1
-    
-    # Update the last updated date
-    repository["last_updated"] = datetime.now().strftime("%Y-%m-%d")
+    new_tables = sum(1 for table in tables if repository.add(table))
     
-    # Write to the output file
-    with open(output_file, 'w') as f:
-        json.dump(repository, f, indent=2)
+    # Write to the output file (also updates the last updated date)
+    repository.save()
     
     print(f"Added {new_tables} new tables to {output_file}")
-    print(f"Total tables in repository: {len(repository['verified_tables'])}")
+    print(f"Total tables in repository: {len(repository)}")
 
 def main():
     """Main function to update the schema repository"""
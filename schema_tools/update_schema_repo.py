@@ -6,87 +6,339 @@ and updates the schema_repository.json file with the results.
 """
 
 import os
-import json
+import time
+import random
+import argparse
 from datetime import datetime
-import snowflake.connector
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from snowflake.connector.errors import (ProgrammingError, OperationalError, InternalServerError,
+                                        ServiceUnavailableError, GatewayTimeoutError, BadGatewayError,
+                                        OtherHTTPRetryableError)
+from snowflake_pool import get_connection, get_pool, configure_pool
+from table_store import open_schema_repository, empty_schema_repository, REPOSITORY_NOTE
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Deltas overlap the previous refresh slightly so commits that finish around
+# the watermark are not missed (re-adding a known table is a no-op)
+DELTA_OVERLAP_MINUTES = 5
+
+# Crawl settings
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+
+# INFORMATION_SCHEMA filter for the objects SHOW TABLES lists (every table type,
+# including dynamic and external tables, but not views), so incremental refreshes
+# see the same objects as a full crawl
+TABLE_TYPE_FILTER = "TABLE_TYPE NOT IN ('VIEW', 'MATERIALIZED VIEW')"
+
+# "Object does not exist or not authorized"
+OBJECT_NOT_FOUND_ERRNO = 2003
+
+# Errors worth retrying: network failures, timeouts and 5xx or throttling responses.
+# Anything else (e.g. a ProgrammingError for missing privileges) fails on the first attempt.
+TRANSIENT_ERRORS = (OperationalError, InternalServerError, ServiceUnavailableError, GatewayTimeoutError,
+                    BadGatewayError, OtherHTTPRetryableError, ConnectionError, TimeoutError)
+
+def get_connection_params():
+    """Connection parameters from the .env file"""
+    return {
+        'user': os.getenv('SNOWFLAKE_USER'),
+        'password': os.getenv('SNOWFLAKE_PASSWORD'),
+        'account': os.getenv('SNOWFLAKE_ACCOUNT', 'DOORDASH'),
+        'database': os.getenv('SNOWFLAKE_DATABASE', 'PRODDB'),
+        'warehouse': os.getenv('SNOWFLAKE_WAREHOUSE', 'TEAM_DATA_ANALYTICS_ETL'),
+        'schema': os.getenv('SNOWFLAKE_SCHEMA', 'public')
+    }
+
 def connect_to_snowflake():
     """Connect to Snowflake using credentials from .env file"""
-    conn = snowflake.connector.connect(
-        user=os.getenv('SNOWFLAKE_USER'),
-        password=os.getenv('SNOWFLAKE_PASSWORD'),
-        account=os.getenv('SNOWFLAKE_ACCOUNT', 'DOORDASH'),
-        database=os.getenv('SNOWFLAKE_DATABASE', 'PRODDB'),
-        warehouse=os.getenv('SNOWFLAKE_WAREHOUSE', 'TEAM_DATA_ANALYTICS_ETL'),
-        schema=os.getenv('SNOWFLAKE_SCHEMA', 'public')
-    )
-    return conn
-
-def get_tables_from_database(conn, database_name="EDW"):
-    """Query Snowflake to get a list of tables in the specified database"""
-    tables = []
+    return get_connection(get_connection_params())
+
+def run_show_with_retry(params, query, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """
+    Run a SHOW command on a pooled session, retrying transient errors with exponential backoff.
+
+    Objects that no longer exist (e.g. a schema dropped during the crawl)
+    return no rows. Other errors are raised without retrying.
+    """
+    for attempt in range(retries + 1):
+        try:
+            with get_connection(params) as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(query)
+                    return cursor.fetchall()
+                finally:
+                    cursor.close()
+        except ProgrammingError as e:
+            if e.errno == OBJECT_NOT_FOUND_ERRNO:
+                return []
+            raise
+        except TRANSIENT_ERRORS:
+            if attempt == retries:
+                raise
+        time.sleep(backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+def crawl_databases(database_names, params=None, concurrency=DEFAULT_CONCURRENCY,
+                    retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """
+    List the tables in several databases, running SHOW TABLES for every schema
+    concurrently on a bounded pool of sessions.
+
+    Args:
+        database_names (list): Databases to crawl
+        params (dict, optional): Connection parameters (default: from .env)
+        concurrency (int): Maximum number of SHOW commands running at once
+        retries (int): Retries per command (with exponential backoff) on transient errors such as throttling
+        backoff (float): Base delay in seconds between retries
+
+    Returns:
+        tuple: (tables, failed) where tables is a list of table entries in
+        database/schema/table order and failed lists the schemas that could not be crawled
+    """
+    params = params or get_connection_params()
+    configure_pool(max_size=max(concurrency, get_pool().max_size))
     
+    failed = []
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # List schemas for every database at once
+        schema_futures = {
+            executor.submit(run_show_with_retry, params, f"SHOW SCHEMAS IN DATABASE {database}", retries, backoff): database
+            for database in database_names
+        }
+        table_futures = {}
+        for future in as_completed(schema_futures):
+            database = schema_futures[future]
+            try:
+                schemas = [row[1] for row in future.result()]
+            except Exception as e:
+                print(f"Error listing schemas in {database}: {e}")
+                failed.append(database)
+                continue
+            print(f"Crawling {len(schemas)} schemas in {database}...")
+            for schema in schemas:
+                if schema.upper() == 'INFORMATION_SCHEMA':
+                    continue
+                query = f'SHOW TABLES IN SCHEMA {database}."{schema}"'
+                table_futures[executor.submit(run_show_with_retry, params, query, retries, backoff)] = (database, schema)
+        
+        results = {}
+        for future in as_completed(table_futures):
+            database, schema = table_futures[future]
+            try:
+                results[(database, schema)] = [row[1] for row in future.result()]
+            except Exception as e:
+                print(f"Error listing tables in {database}.{schema}: {e}")
+                failed.append(f"{database}.{schema}")
+    
+    tables = [
+        {"database": database, "schema": schema, "table": table_name}
+        for (database, schema) in sorted(results)
+        for table_name in results[(database, schema)]
+    ]
+    return tables, failed
+
+def get_server_timestamp(conn):
+    """Get the current Snowflake server time as an ISO string (used as the refresh watermark)"""
     cursor = conn.cursor()
     try:
-        # Get the list of schemas in the database
-        cursor.execute(f"SHOW SCHEMAS IN {database_name}")
-        schemas_result = cursor.fetchall()
-        schemas = [schema[1] for schema in schemas_result]
-        
-        # For each schema, get the list of tables
-        for schema in schemas:
-            cursor.execute(f"SHOW TABLES IN {database_name}.{schema}")
-            tables_result = cursor.fetchall()
-            
-            # Add each table to our list
-            for table in tables_result:
-                table_name = table[1]
-                tables.append({
-                    "database": database_name,
-                    "schema": schema,
-                    "table": table_name
-                })
-                
-    except Exception as e:
-        print(f"Error querying Snowflake: {e}")
+        cursor.execute("""SELECT TO_VARCHAR(CURRENT_TIMESTAMP(), 'YYYY-MM-DD"T"HH24:MI:SS.FF3TZH:TZM')""")
+        return cursor.fetchone()[0]
     finally:
         cursor.close()
-        
-    return tables
-
-def update_schema_repository(tables, output_file="schema_repository.json"):
-    """Update the schema_repository.json file with the tables from Snowflake"""
-    # Create the repository structure
-    repository = {
-        "last_updated": datetime.now().strftime("%Y-%m-%d"),
-        "verified_tables": tables,
-        "note": "This is a lightweight repository of table names that exist in the database. It contains no description or metadata, only verified table names."
+
+def get_changed_tables(conn, database_name, since):
+    """Get tables created or altered since a watermark, from one INFORMATION_SCHEMA query"""
+    query = f"""
+    SELECT TABLE_SCHEMA, TABLE_NAME
+    FROM {database_name}.INFORMATION_SCHEMA.TABLES
+    WHERE {TABLE_TYPE_FILTER}
+        AND TABLE_SCHEMA != 'INFORMATION_SCHEMA'
+        AND (LAST_ALTERED >= DATEADD(minute, -{DELTA_OVERLAP_MINUTES}, TO_TIMESTAMP_LTZ(%s))
+             OR CREATED >= DATEADD(minute, -{DELTA_OVERLAP_MINUTES}, TO_TIMESTAMP_LTZ(%s)))
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, (since, since))
+        return [
+            {"database": database_name, "schema": row[0], "table": row[1]}
+            for row in cursor.fetchall()
+        ]
+    finally:
+        cursor.close()
+
+def get_existing_table_names(conn, database_name, schemas):
+    """List the names of the tables that still exist in the given schemas (names only, no metadata)"""
+    if not schemas:
+        return set()
+    placeholders = ", ".join(["%s"] * len(schemas))
+    query = f"""
+    SELECT TABLE_SCHEMA, TABLE_NAME
+    FROM {database_name}.INFORMATION_SCHEMA.TABLES
+    WHERE {TABLE_TYPE_FILTER}
+        AND TABLE_SCHEMA IN ({placeholders})
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, sorted(schemas))
+        return {(row[0].upper(), row[1].upper()) for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+def refresh_database_incremental(conn, repository, database_name):
+    """
+    Merge changes in a database into the repository since its last watermark.
+
+    New or re-created tables are added from a LAST_ALTERED/CREATED delta query.
+    Tables that no longer exist are moved to "dropped_tables" as tombstones.
+
+    Args:
+        repository: The loaded repository store (see table_store)
+
+    Returns:
+        tuple: (added, dropped) counts, or None if the database has no watermark yet
+    """
+    since = repository.data.get("watermarks", {}).get(database_name.upper())
+    if not since:
+        return None
+    
+    dropped_tables = repository.data.setdefault("dropped_tables", [])
+    
+    # Add tables created or altered since the watermark
+    added = 0
+    changed_keys = set()
+    for entry in get_changed_tables(conn, database_name, since):
+        changed_keys.add(repository.entry_key(entry))
+        if repository.add(entry):
+            added += 1
+    if changed_keys:
+        # A re-created table is no longer dropped
+        dropped_tables[:] = [entry for entry in dropped_tables if repository.entry_key(entry) not in changed_keys]
+    
+    # Tombstone tables in this database that no longer exist. Keys are lowercase, and
+    # legacy bare table names have no database, so they are never tombstoned.
+    database_key = database_name.lower()
+    schemas = {
+        key[1].upper() for key in map(repository.entry_key, repository) if key[0] == database_key
     }
+    existing = get_existing_table_names(conn, database_name, schemas)
+    
+    def is_dropped(entry):
+        database, schema, table = repository.entry_key(entry)
+        return database == database_key and (schema.upper(), table.upper()) not in existing
+    
+    removed = repository.remove_where(is_dropped)
+    today = datetime.now().strftime("%Y-%m-%d")
+    dropped_tables.extend({**entry, "dropped_detected": today} for entry in removed)
     
-    # Write to the output file
-    with open(output_file, 'w') as f:
-        json.dump(repository, f, indent=2)
+    return added, len(removed)
+
+def update_schema_repository(tables, output_file="schema_repository.json", database_names=None,
+                             failed=(), watermarks=None):
+    """
+    Replace the entries of the crawled databases with the tables from Snowflake.
+
+    Entries of other databases, and of databases or schemas that could not be crawled
+    (`failed`, as returned by crawl_databases), are kept, as are the other databases'
+    watermarks and the dropped_tables tombstones.
+    """
+    try:
+        repository = open_schema_repository(output_file)
+    except Exception as e:
+        print(f"Error loading schema repository, starting a new one: {e}")
+        repository = empty_schema_repository(output_file)
+    
+    crawled = {name.lower() for name in (database_names or {table["database"] for table in tables})}
+    failed = {name.lower() for name in failed}
+    
+    def is_replaced(entry):
+        database, schema, _ = repository.entry_key(entry)
+        return database in crawled and database not in failed and f"{database}.{schema}" not in failed
+    
+    with repository.transaction():
+        repository.remove_where(is_replaced)
+        for table in tables:
+            repository.add(table)
+        # Tables that exist again are no longer dropped
+        crawled_keys = {repository.entry_key(table) for table in tables}
+        dropped_tables = repository.data.get("dropped_tables")
+        if dropped_tables:
+            dropped_tables[:] = [entry for entry in dropped_tables if repository.entry_key(entry) not in crawled_keys]
+        repository.data.setdefault("note", REPOSITORY_NOTE)
+        if watermarks:
+            repository.data.setdefault("watermarks", {}).update(watermarks)
+        repository.save()
     
     print(f"Updated {output_file} with {len(tables)} tables from Snowflake")
 
 def main():
     """Main function to update the schema repository"""
+    parser = argparse.ArgumentParser(description="Update schema_repository.json with tables from Snowflake")
+    parser.add_argument("--database", action="append",
+                        help="Database to crawl (repeatable, default: EDW)")
+    parser.add_argument("--output", default="schema_repository.json", help="Repository file")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only merge tables changed since the last refresh and record dropped tables")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Schemas crawled at once in a full refresh (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help=f"Retries per SHOW command on transient errors (default: {DEFAULT_RETRIES})")
+    args = parser.parse_args()
+    database_names = [database.upper() for database in (args.database or ["EDW"])]
+    
     print("Connecting to Snowflake...")
     conn = connect_to_snowflake()
     
-    print("Fetching tables from EDW database...")
-    tables = get_tables_from_database(conn, "EDW")
+    # Taken before crawling so changes made during the crawl are picked up next time
+    watermark = get_server_timestamp(conn)
+    
+    full_refresh = database_names
+    if args.incremental:
+        repository = open_schema_repository(args.output)
+        full_refresh = []
+        for database_name in database_names:
+            print(f"Fetching changes in {database_name} since the last refresh...")
+            result = refresh_database_incremental(conn, repository, database_name)
+            if result is None:
+                print(f"No watermark for {database_name} yet, it will be fully crawled")
+                full_refresh.append(database_name)
+                continue
+            added, dropped = result
+            repository.data.setdefault("watermarks", {})[database_name] = watermark
+            print(f"{database_name}: added {added} tables, recorded {dropped} dropped tables")
+        
+        if full_refresh:
+            tables, failed = crawl_databases(full_refresh, concurrency=args.concurrency, retries=args.retries)
+            for entry in tables:
+                repository.add(entry)
+            failed_databases = {name.split('.')[0] for name in failed}
+            for database_name in full_refresh:
+                if database_name not in failed_databases:
+                    repository.data.setdefault("watermarks", {})[database_name] = watermark
+        
+        repository.save()
+        print(f"{len(repository)} tables in {args.output}")
+        conn.close()
+        print("Done!")
+        return
+    
+    print(f"Fetching tables from {', '.join(full_refresh)} with {args.concurrency} concurrent requests...")
+    tables, failed = crawl_databases(full_refresh, concurrency=args.concurrency, retries=args.retries)
     
-    print(f"Found {len(tables)} tables in EDW database")
+    print(f"Found {len(tables)} tables in {', '.join(full_refresh)}")
+    if failed:
+        print(f"Warning: could not crawl {len(failed)} schemas: {', '.join(failed)}")
     
     print("Updating schema repository...")
-    update_schema_repository(tables)
+    failed_databases = {name.split('.')[0] for name in failed}
+    watermarks = {database_name: watermark for database_name in full_refresh if database_name not in failed_databases}
+    update_schema_repository(tables, args.output, full_refresh, failed, watermarks)
     
     conn.close()
     print("Done!")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -2,32 +2,41 @@
 """
 Script to update existing tables in the allowlist with column information from Snowflake.
 This is useful for enriching the allowlist with schema information without re-adding tables.
+
+Columns for all selected tables are fetched over one Snowflake session with one
+batched catalog query per database, and the databases are queried concurrently.
 """
 
-import json
 import argparse
+import asyncio
 import sys
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, MofNCompleteColumn, TimeElapsedColumn
+from table_store import AllowlistStore, open_allowlist, empty_allowlist
 try:
-    import snowflake.connector
     from snowflake_credentials import get_snowflake_credentials
+    from snowflake_pool import get_connection
+    from snowflake_async import AsyncQueryRunner
+    from snowflake_metadata import fetch_columns_bulk_async
     SNOWFLAKE_AVAILABLE = True
 except ImportError:
     SNOWFLAKE_AVAILABLE = False
 
+DEFAULT_CONCURRENCY = 8
+
 def load_allowlist(file_path="table_allowlist.json"):
-    """Load the table allowlist from a JSON file"""
+    """Load the table allowlist store (iterates like the list of entries)"""
     try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
+        return open_allowlist(file_path, missing_ok=False)
     except Exception as e:
         print(f"Error loading allowlist: {e}")
-        return []
+        return empty_allowlist(file_path)
 
-def save_allowlist(allowlist, file_path="table_allowlist.json"):
-    """Save the table allowlist to a JSON file"""
+def save_allowlist(allowlist, file_path=None):
+    """Save the table allowlist to its file (or to file_path)"""
     try:
-        with open(file_path, 'w') as f:
-            json.dump(allowlist, f, indent=2)
+        if isinstance(allowlist, list):
+            allowlist = AllowlistStore(allowlist)
+        allowlist.save(file_path)
         return True
     except Exception as e:
         print(f"Error saving allowlist: {e}")
@@ -35,50 +44,59 @@ def save_allowlist(allowlist, file_path="table_allowlist.json"):
 
 def fetch_columns_from_snowflake(database, schema, table):
     """Fetch column information from Snowflake"""
+    columns = fetch_columns_for_tables([(database, schema, table)])
+    if columns is None:
+        return None
+    return columns.get((database.upper(), schema.upper(), table.upper()))
+
+def fetch_columns_for_tables(tables, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Fetch {column: datatype} for many tables over one Snowflake session.
+
+    Tables are batched into one INFORMATION_SCHEMA.COLUMNS query per database,
+    and the queries for different databases run concurrently.
+
+    Args:
+        tables (list): (database, schema, table) tuples
+        concurrency (int): Maximum number of catalog queries in flight at once
+
+    Returns:
+        dict: (DATABASE, SCHEMA, TABLE) -> {column: datatype} for the tables that were
+        found, or None if Snowflake could not be reached
+    """
     if not SNOWFLAKE_AVAILABLE:
         print("Error: snowflake.connector package not available. Cannot fetch columns from Snowflake.")
         return None
     
     try:
         params = get_snowflake_credentials()
-        print(f"Connecting to Snowflake with account: {params['account']}, user: {params['user']}, database: {params['database']}")
-        
-        # Convert to uppercase for Snowflake
-        database_upper = database.upper()
-        schema_upper = schema.upper()
-        table_upper = table.upper()
-        
-        with snowflake.connector.connect(**params) as conn:
-            query = f"""
-            SELECT 
-                COLUMN_NAME, 
-                DATA_TYPE
-            FROM 
-                {database_upper}.INFORMATION_SCHEMA.COLUMNS
-            WHERE 
-                TABLE_SCHEMA = '{schema_upper}'
-                AND TABLE_NAME = '{table_upper}'
-            ORDER BY ORDINAL_POSITION
-            """
-            
-            print(f"Executing query: {query}")
-            cursor = conn.cursor()
-            cursor.execute(query)
-            
-            columns = {}
-            result = cursor.fetchall()
-            print(f"Found {len(result)} columns")
-            
-            for col_name, data_type in result:
-                columns[col_name] = data_type
-                
-            return columns
+        print(f"Connecting to Snowflake with account: {params['account']}, user: {params['user']}")
+        with get_connection(params) as conn:
+            runner = AsyncQueryRunner(conn)
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                MofNCompleteColumn(),
+                TimeElapsedColumn()
+            ) as progress:
+                task = progress.add_task("Fetching columns", total=len(set(tables)))
+                rows = asyncio.run(fetch_columns_bulk_async(
+                    runner, tables, fields=("COLUMN_NAME", "DATA_TYPE"), concurrency=concurrency,
+                    on_progress=lambda database, chunk: progress.advance(task, len(chunk))
+                ))
     except Exception as e:
         print(f"Error fetching columns from Snowflake: {e}")
-        print(f"Query attempted: SELECT COLUMN_NAME, DATA_TYPE FROM {database_upper}.INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = '{schema_upper}' AND TABLE_NAME = '{table_upper}'")
         return None
+    
+    return {
+        key: {row["COLUMN_NAME"]: row["DATA_TYPE"] for row in columns}
+        for key, columns in rows.items()
+        if columns
+    }
 
-def update_table_with_columns(table_name=None, schema_name=None, database_name=None, all_tables=False):
+def update_table_with_columns(table_name=None, schema_name=None, database_name=None, all_tables=False,
+                              concurrency=DEFAULT_CONCURRENCY):
     """Update tables in the allowlist with column information"""
     if not SNOWFLAKE_AVAILABLE:
         print("Error: snowflake.connector package not available. Cannot update columns.")
@@ -87,11 +105,9 @@ def update_table_with_columns(table_name=None, schema_name=None, database_name=N
     # Load the allowlist
     allowlist = load_allowlist()
     
-    # Track updates
-    updated_tables = []
-    
-    # Process each table in the allowlist
-    for i, table_info in enumerate(allowlist):
+    # Select the tables to update
+    selected = []
+    for table_info in allowlist:
         table_info_db = table_info.get("database", "EDW")
         table_info_schema = table_info.get("schema", "")
         table_info_name = table_info.get("table", "")
@@ -104,22 +120,44 @@ def update_table_with_columns(table_name=None, schema_name=None, database_name=N
         ):
             continue
         
-        print(f"Fetching columns for {table_info_db}.{table_info_schema}.{table_info_name}...")
-        
-        # Fetch columns from Snowflake
-        columns = fetch_columns_from_snowflake(table_info_db, table_info_schema, table_info_name)
+        selected.append((table_info, (table_info_db, table_info_schema, table_info_name)))
+    
+    if not selected:
+        print("\nNo matching tables in the allowlist.")
+        return False
+    
+    print(f"Fetching columns for {len(selected)} tables...")
+    
+    # Fetch columns for every selected table in one pass
+    columns = fetch_columns_for_tables([name for _, name in selected], concurrency)
+    if columns is None:
+        return False
+    
+    # Track updates
+    updated_tables = []
+    failed_tables = []
+    
+    with allowlist.transaction():
+        for table_info, name in selected:
+            table_columns = columns.get(tuple(part.upper() for part in name))
+            if table_columns:
+                # Update the table entry with columns
+                table_info["columns"] = table_columns
+                allowlist.upsert(table_info)
+                updated_tables.append(".".join(name))
+            else:
+                failed_tables.append(".".join(name))
         
-        if columns:
-            # Update the table entry with columns
-            allowlist[i]["columns"] = columns
-            updated_tables.append(f"{table_info_db}.{table_info_schema}.{table_info_name}")
-            print(f"  Added {len(columns)} columns")
-        else:
-            print(f"  Failed to fetch columns")
+        # Save the updated allowlist
+        saved = bool(updated_tables) and save_allowlist(allowlist)
+    
+    if failed_tables:
+        print(f"\nNo columns found for {len(failed_tables)} tables:")
+        for table in failed_tables:
+            print(f"  {table}")
     
-    # Save the updated allowlist
     if updated_tables:
-        if save_allowlist(allowlist):
+        if saved:
             print(f"\nSuccessfully updated {len(updated_tables)} tables with column information:")
             for table in updated_tables:
                 print(f"  {table}")
@@ -138,6 +176,8 @@ def main():
     parser.add_argument('--schema', help='Schema name to filter tables')
     parser.add_argument('--table', help='Table name to update')
     parser.add_argument('--all', action='store_true', help='Update all tables in the allowlist')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'Catalog queries run at once (default: {DEFAULT_CONCURRENCY})')
     
     args = parser.parse_args()
     
@@ -150,7 +190,8 @@ def main():
         table_name=args.table,
         schema_name=args.schema,
         database_name=args.database,
-        all_tables=args.all
+        all_tables=args.all,
+        concurrency=args.concurrency
     )
     
     return 0 if success else 1
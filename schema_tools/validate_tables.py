@@ -5,74 +5,102 @@ This script checks:
 1. If tables in the allowlist exist in the database
 2. If tables in the allowlist exist in the schema repository
 3. If there are schema mismatches between the allowlist and the database
+
+Existence is checked for the whole allowlist with one INFORMATION_SCHEMA.TABLES
+query per database, and column drift against the stored `columns` maps with
+one INFORMATION_SCHEMA.COLUMNS query per database.
 """
 
 import os
-import json
 import argparse
-import snowflake.connector
+from snowflake_pool import get_connection
+from snowflake_metadata import fetch_tables_bulk, fetch_columns_bulk, table_key, type_family
+from table_store import (SchemaRepositoryStore, open_allowlist, open_schema_repository,
+                         empty_allowlist, empty_schema_repository)
 from dotenv import load_dotenv
 
 load_dotenv()
 
 def connect_to_snowflake():
     """Connect to Snowflake using credentials from .env file"""
-    conn = snowflake.connector.connect(
-        user=os.getenv('SNOWFLAKE_USER'),
-        password=os.getenv('SNOWFLAKE_PASSWORD'),
-        account=os.getenv('SNOWFLAKE_ACCOUNT', 'DOORDASH'),
-        database=os.getenv('SNOWFLAKE_DATABASE', 'PRODDB'),
-        warehouse=os.getenv('SNOWFLAKE_WAREHOUSE', 'TEAM_DATA_ANALYTICS_ETL'),
-        schema=os.getenv('SNOWFLAKE_SCHEMA', 'public')
-    )
+    conn = get_connection({
+        'user': os.getenv('SNOWFLAKE_USER'),
+        'password': os.getenv('SNOWFLAKE_PASSWORD'),
+        'account': os.getenv('SNOWFLAKE_ACCOUNT', 'DOORDASH'),
+        'database': os.getenv('SNOWFLAKE_DATABASE', 'PRODDB'),
+        'warehouse': os.getenv('SNOWFLAKE_WAREHOUSE', 'TEAM_DATA_ANALYTICS_ETL'),
+        'schema': os.getenv('SNOWFLAKE_SCHEMA', 'public')
+    })
     return conn
 
-def check_table_exists(conn, database, schema, table):
-    """Check if a table exists in the database"""
-    cursor = conn.cursor()
-    try:
-        cursor.execute(f"""
-        SELECT COUNT(*) 
-        FROM {database}.INFORMATION_SCHEMA.TABLES 
-        WHERE TABLE_SCHEMA = '{schema}' 
-        AND TABLE_NAME = '{table}'
-        """)
-        result = cursor.fetchone()
-        return result[0] > 0
-    except Exception as e:
-        print(f"Error checking if table exists: {e}")
-        return False
-    finally:
-        cursor.close()
+def check_tables_exist(conn, tables):
+    """
+    Check which tables exist with one query per database.
+
+    Args:
+        tables (iterable): (database, schema, table) tuples
+
+    Returns:
+        set: Upper-cased (DATABASE, SCHEMA, TABLE) keys of the tables that exist
+    """
+    found = fetch_tables_bulk(conn, tables, fields=("TABLE_TYPE",))
+    return {key for key, row in found.items() if row is not None}
+
+def find_column_drift(stored_columns, actual_columns):
+    """
+    Compare an allowlist entry's stored {column: datatype} map with the database columns.
+
+    Args:
+        stored_columns (dict): Columns recorded in the allowlist
+        actual_columns (dict): Columns currently in the database
+
+    Returns:
+        dict: "added" (in the database only), "removed" (in the allowlist only) and
+        "changed" ({column: (stored type, actual type)}); empty if nothing drifted.
+        Types are compared by family (see snowflake_metadata.TYPE_FAMILIES), the same
+        way discover_schema --match-types compares them.
+    """
+    stored = {name.upper(): (name, data_type) for name, data_type in stored_columns.items()}
+    actual = {name.upper(): (name, data_type) for name, data_type in actual_columns.items()}
+    drift = {}
+    added = [actual[name][0] for name in actual if name not in stored]
+    removed = [stored[name][0] for name in stored if name not in actual]
+    changed = {
+        stored[name][0]: (stored[name][1], actual[name][1])
+        for name in stored
+        if name in actual and type_family(stored[name][1]) != type_family(actual[name][1])
+    }
+    if added:
+        drift["added"] = added
+    if removed:
+        drift["removed"] = removed
+    if changed:
+        drift["changed"] = changed
+    return drift
 
 def load_allowlist(file_path="table_allowlist.json"):
-    """Load the table allowlist from a JSON file"""
+    """Load the table allowlist store (iterates like the list of entries)"""
     try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
+        return open_allowlist(file_path, missing_ok=False)
     except Exception as e:
         print(f"Error loading allowlist: {e}")
-        return []
+        return empty_allowlist(file_path)
         
 def load_schema_repository(file_path="schema_repository.json"):
-    """Load the schema repository from a JSON file"""
+    """Load the schema repository store"""
     try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
+        return open_schema_repository(file_path, missing_ok=False)
     except Exception as e:
         print(f"Error loading schema repository: {e}")
-        return {"verified_tables": []}
+        return empty_schema_repository(file_path)
 
 def table_in_repository(table_info, repository):
     """Check if a table exists in the schema repository"""
-    for repo_table in repository["verified_tables"]:
-        if (repo_table["database"].lower() == table_info["database"].lower() and
-            repo_table["schema"].lower() == table_info["schema"].lower() and
-            repo_table["table"].lower() == table_info["table"].lower()):
-            return True
-    return False
+    if isinstance(repository, dict):
+        repository = SchemaRepositoryStore(repository)
+    return repository.contains_entry(table_info)
 
-def validate_tables():
+def validate_tables(check_columns=True):
     """Validate tables in the allowlist against the database and schema repository"""
     print("Validating tables in the allowlist...")
     
@@ -83,18 +111,34 @@ def validate_tables():
     # Connect to Snowflake
     conn = connect_to_snowflake()
     
+    entries = [
+        (table_info, table_key(table_info.get("database", "EDW"), table_info["schema"], table_info["table"]))
+        for table_info in allowlist
+    ]
+    
+    # Check existence of every table at once
+    existing = check_tables_exist(conn, [key for _, key in entries])
+    
+    # Fetch current columns for the tables that have a stored column map
+    actual_columns = {}
+    if check_columns:
+        with_columns = [key for table_info, key in entries if table_info.get("columns") and key in existing]
+        if with_columns:
+            actual_columns = fetch_columns_bulk(conn, with_columns, fields=("COLUMN_NAME", "DATA_TYPE"))
+    
     valid_tables = []
     invalid_tables = []
     missing_from_repo = []
+    drifted_tables = []
     
     # Check each table in the allowlist
-    for table_info in allowlist:
+    for table_info, key in entries:
         table_name = table_info["table"]
         schema_name = table_info["schema"]
         database_name = table_info.get("database", "EDW")
         
         # Check if the table exists in the database
-        exists_in_db = check_table_exists(conn, database_name, schema_name, table_name)
+        exists_in_db = key in existing
         
         # Check if the table exists in the schema repository
         exists_in_repo = table_in_repository(
@@ -121,6 +165,18 @@ def validate_tables():
                 "schema": schema_name,
                 "table": table_name
             })
+        
+        if key in actual_columns:
+            drift = find_column_drift(
+                table_info["columns"],
+                {row["COLUMN_NAME"]: row["DATA_TYPE"] for row in actual_columns[key]}
+            )
+            if drift:
+                drifted_tables.append(({
+                    "database": database_name,
+                    "schema": schema_name,
+                    "table": table_name
+                }, drift))
     
     # Print results
     print("\nValidation Results:")
@@ -128,6 +184,8 @@ def validate_tables():
     print(f"Valid tables (exist in database): {len(valid_tables)}")
     print(f"Invalid tables (don't exist in database): {len(invalid_tables)}")
     print(f"Tables missing from repository but exist in database: {len(missing_from_repo)}")
+    if check_columns:
+        print(f"Tables with column drift from the allowlist: {len(drifted_tables)}")
     
     if invalid_tables:
         print("\nInvalid tables:")
@@ -139,6 +197,17 @@ def validate_tables():
         for table in missing_from_repo:
             print(f"  {table['database']}.{table['schema']}.{table['table']}")
     
+    if drifted_tables:
+        print("\nColumn drift (run update_table_columns.py to refresh):")
+        for table, drift in drifted_tables:
+            print(f"  {table['database']}.{table['schema']}.{table['table']}")
+            if "added" in drift:
+                print(f"    Added in database: {', '.join(drift['added'])}")
+            if "removed" in drift:
+                print(f"    Missing from database: {', '.join(drift['removed'])}")
+            for column, (stored_type, actual_type) in drift.get("changed", {}).items():
+                print(f"    {column}: {stored_type} -> {actual_type}")
+    
     conn.close()
     
     return valid_tables, invalid_tables, missing_from_repo
@@ -147,9 +216,10 @@ def main():
     """Main function to validate tables"""
     parser = argparse.ArgumentParser(description='Validate tables in the allowlist against the database and schema repository.')
     parser.add_argument('--add-missing', action='store_true', help='Add missing tables to the schema repository')
+    parser.add_argument('--skip-columns', action='store_true', help='Skip the column drift check')
     args = parser.parse_args()
     
-    valid_tables, invalid_tables, missing_from_repo = validate_tables()
+    valid_tables, invalid_tables, missing_from_repo = validate_tables(check_columns=not args.skip_columns)
     
     if args.add_missing and missing_from_repo:
         # Load the current repository
@@ -157,11 +227,10 @@ def main():
         
         # Add missing tables to the repository
         for table in missing_from_repo:
-            repository["verified_tables"].append(table)
+            repository.add(table)
         
         # Update the repository file
-        with open("schema_repository.json", 'w') as f:
-            json.dump(repository, f, indent=2)
+        repository.save(touch=False)
         
         print(f"\nAdded {len(missing_from_repo)} missing tables to the schema repository.")
 
@@ -4,36 +4,31 @@ Script to verify the table_allowlist.json against schema_repository.json.
 This is a simplified version that doesn't require Snowflake credentials.
 """
 
-import json
 import argparse
-from datetime import datetime
+from table_store import (SchemaRepositoryStore, open_allowlist, open_schema_repository,
+                         empty_allowlist, empty_schema_repository)
 
 def load_allowlist(file_path="table_allowlist.json"):
-    """Load the table allowlist from a JSON file"""
+    """Load the table allowlist store (iterates like the list of entries)"""
     try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
+        return open_allowlist(file_path, missing_ok=False)
     except Exception as e:
         print(f"Error loading allowlist: {e}")
-        return []
+        return empty_allowlist(file_path)
         
 def load_schema_repository(file_path="schema_repository.json"):
-    """Load the schema repository from a JSON file"""
+    """Load the schema repository store"""
     try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
+        return open_schema_repository(file_path, missing_ok=False)
     except Exception as e:
         print(f"Error loading schema repository: {e}")
-        return {"verified_tables": []}
+        return empty_schema_repository(file_path)
 
 def table_in_repository(table_info, repository):
     """Check if a table exists in the schema repository"""
-    for repo_table in repository["verified_tables"]:
-        if (repo_table["database"].lower() == table_info["database"].lower() and
-            repo_table["schema"].lower() == table_info["schema"].lower() and
-            repo_table["table"].lower() == table_info["table"].lower()):
-            return True
-    return False
+    if isinstance(repository, dict):
+        repository = SchemaRepositoryStore(repository)
+    return repository.contains_entry(table_info)
 
 def verify_allowlist_against_repository():
     """Verify the tables in the allowlist against the schema repository"""
@@ -99,19 +94,10 @@ def verify_allowlist_against_repository():
             print(f"  Tier {table['tier']} - {table['database']}.{table['schema']}.{table['table']}")
     
     # Find tables in repository that aren't in the allowlist
-    tables_not_in_allowlist = []
-    for repo_table in repository["verified_tables"]:
-        found = False
-        for table_info in allowlist:
-            database_name = table_info.get("database", "EDW")
-            if (repo_table["database"].lower() == database_name.lower() and
-                repo_table["schema"].lower() == table_info["schema"].lower() and
-                repo_table["table"].lower() == table_info["table"].lower()):
-                found = True
-                break
-        
-        if not found:
-            tables_not_in_allowlist.append(repo_table)
+    tables_not_in_allowlist = [
+        repo_table for repo_table in repository
+        if not allowlist.contains_entry(repo_table)
+    ]
     
     print(f"\nTables in repository not in allowlist: {len(tables_not_in_allowlist)}")
     
@@ -122,18 +108,12 @@ def add_tables_to_repository(tables, file_path="schema_repository.json"):
     # Load the current repository
     repository = load_schema_repository(file_path)
     
-    # Add the tables
+    # Add the tables that are not in the repository yet
     for table in tables:
-        # Check if the table already exists in the repository
-        if not table_in_repository(table, repository):
-            repository["verified_tables"].append(table)
-    
-    # Update the last_updated field
-    repository["last_updated"] = datetime.now().strftime("%Y-%m-%d")
+        repository.add(table)
     
-    # Write back to the file
-    with open(file_path, 'w') as f:
-        json.dump(repository, f, indent=2)
+    # Write back to the file (also updates last_updated)
+    repository.save()
     
     print(f"Updated {file_path} with new tables")
 
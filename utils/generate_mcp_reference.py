@@ -10,7 +10,8 @@ import json
 import os
 import argparse
 from snowflake_credentials import get_snowflake_credentials
-import snowflake.connector
+from snowflake_pool import get_connection
+from snowflake_metadata import fetch_columns_bulk, table_key
 
 def connect_to_snowflake():
     """
@@ -18,14 +19,14 @@ def connect_to_snowflake():
     """
     credentials = get_snowflake_credentials()
     
-    conn = snowflake.connector.connect(
-        user=credentials['user'],
-        password=credentials['password'],
-        account=credentials['account'],
-        warehouse=credentials['warehouse'],
-        database=credentials['database'],
-        schema=credentials['schema'],
-    )
+    conn = get_connection({
+        'user': credentials['user'],
+        'password': credentials['password'],
+        'account': credentials['account'],
+        'warehouse': credentials['warehouse'],
+        'database': credentials['database'],
+        'schema': credentials['schema'],
+    })
     return conn
 
 def load_allowlist(file_path='table_allowlist.json'):
@@ -42,58 +43,49 @@ def load_allowlist(file_path='table_allowlist.json'):
 def get_table_metadata(conn, tables):
     """
     Retrieve metadata for the specified tables from Snowflake.
+    Columns for all tables of a database are fetched in a single query.
     """
     metadata = {}
     
+    complete_entries = []
     for table_entry in tables:
-        table_name = table_entry.get('table')
-        schema_name = table_entry.get('schema')
-        database_name = table_entry.get('database')
-        
-        if not all([table_name, schema_name, database_name]):
+        if not all([table_entry.get('table'), table_entry.get('schema'), table_entry.get('database')]):
             print(f"Skipping incomplete table entry: {table_entry}")
             continue
+        complete_entries.append(table_entry)
+    
+    columns_by_table = fetch_columns_bulk(
+        conn,
+        [(entry['database'], entry['schema'], entry['table']) for entry in complete_entries]
+    )
+    
+    for table_entry in complete_entries:
+        table_name = table_entry['table']
+        schema_name = table_entry['schema']
+        database_name = table_entry['database']
         
-        # Get column information
-        query = f"""
-        SELECT 
-            COLUMN_NAME,
-            DATA_TYPE,
-            COMMENT
-        FROM
-            {database_name}.INFORMATION_SCHEMA.COLUMNS
-        WHERE
-            TABLE_SCHEMA = '{schema_name}'
-            AND TABLE_NAME = '{table_name}'
-        ORDER BY ORDINAL_POSITION
-        """
+        rows = columns_by_table.get(table_key(database_name, schema_name, table_name))
+        if rows is None:
+            # The column query for this database failed (already reported)
+            continue
+        
+        columns = [{
+            'name': row['COLUMN_NAME'],
+            'data_type': row['DATA_TYPE'],
+            'description': row['COMMENT'] if row['COMMENT'] else ''
+        } for row in rows]
+        
+        # Add table metadata from allowlist
+        full_table_name = f"{database_name}.{schema_name}.{table_name}"
+        metadata[full_table_name] = {
+            'columns': columns,
+            'description': table_entry.get('description', ''),
+            'notes': table_entry.get('notes', ''),
+            'common_joins': table_entry.get('common_joins', []),
+            'key_columns': table_entry.get('key_columns', [])
+        }
         
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query)
-            columns = []
-            
-            for row in cursor:
-                columns.append({
-                    'name': row[0],
-                    'data_type': row[1],
-                    'description': row[2] if row[2] else ''
-                })
-            
-            # Add table metadata from allowlist
-            full_table_name = f"{database_name}.{schema_name}.{table_name}"
-            metadata[full_table_name] = {
-                'columns': columns,
-                'description': table_entry.get('description', ''),
-                'notes': table_entry.get('notes', ''),
-                'common_joins': table_entry.get('common_joins', []),
-                'key_columns': table_entry.get('key_columns', [])
-            }
-            
-            print(f"Added metadata for {full_table_name}")
-            
-        except Exception as e:
-            print(f"Error retrieving metadata for {database_name}.{schema_name}.{table_name}: {e}")
+        print(f"Added metadata for {full_table_name}")
     
     return metadata
 
@@ -0,0 +1,252 @@
+"""
+Query Result Cache
+
+This module provides a local, persistent cache of query results so repeated
+reads of the same query come from disk instead of re-running on a warehouse.
+
+Results are stored as Parquet files with a JSON index. Entries are keyed by a
+hash of the normalized SQL (comments and whitespace do not matter), the session
+variables used by the query, and the connection identity. Entries expire after
+a TTL, and the least recently used entries are evicted when the cache grows
+past its size limit. snowflake_compat also stores the LAST_ALTERED watermarks
+of each query's source tables (see table_freshness.py) and only reuses an entry
+while they are unchanged. Index updates hold an exclusive lock on index.lock, so
+several processes can share one cache directory.
+
+Usage:
+    from snowflake_compat import get_data
+
+    df = get_data(query, cache="use")        # Read from cache when possible
+    df = get_data(query, cache="refresh")    # Re-run and overwrite the cached result
+
+Settings can be changed with environment variables:
+    SNOWFLAKE_RESULT_CACHE          Default cache mode for get_data: off, use or refresh (default: off)
+    SNOWFLAKE_RESULT_CACHE_DIR      Cache directory (default: ~/.cache/nv_analytics/query_results)
+    SNOWFLAKE_RESULT_CACHE_TTL      Seconds before an entry expires (default: 86400)
+    SNOWFLAKE_RESULT_CACHE_MAX_MB   Max total size of cached results (default: 2048)
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+import pyarrow.parquet as pq
+from sql_lexer import normalize_sql
+
+try:
+    import fcntl
+except ImportError:
+    # Without fcntl (Windows) only threads in this process are serialized
+    fcntl = None
+
+DEFAULT_CACHE_DIR = os.path.expanduser(
+    os.getenv('SNOWFLAKE_RESULT_CACHE_DIR', '~/.cache/nv_analytics/query_results')
+)
+DEFAULT_TTL = float(os.getenv('SNOWFLAKE_RESULT_CACHE_TTL', '86400'))
+DEFAULT_MAX_BYTES = int(float(os.getenv('SNOWFLAKE_RESULT_CACHE_MAX_MB', '2048')) * 1024 * 1024)
+
+class ResultCache:
+    """On-disk cache of query results stored as Parquet files with a JSON index"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.lock_path = os.path.join(cache_dir, 'index.lock')
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        """Serialize index read-modify-writes across threads and processes sharing the directory"""
+        with self._lock:
+            with open(self.lock_path, 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def make_key(query, variables=None, identity=None):
+        """
+        Build the cache key for a query.
+
+        Args:
+            query (str): SQL query
+            variables (dict, optional): Session variables the query depends on
+            identity (tuple, optional): Connection identity (see snowflake_pool.pool_key)
+        """
+        payload = json.dumps({
+            'sql': normalize_sql(query),
+            'variables': {str(k).lower(): str(v) for k, v in sorted((variables or {}).items())},
+            'identity': list(identity or ()),
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key, sources=None):
+        """
+        Return the cached pyarrow.Table for a key, or None if missing or expired.
+
+        Args:
+            key (str): Cache key from make_key()
+            sources (dict, optional): Current source table watermarks. When given,
+                the entry is only returned if it was stored with the same watermarks.
+        """
+        with self._locked():
+            index = self._load_index()
+            entry = index.get(key)
+            if entry is None:
+                return None
+
+            path = os.path.join(self.cache_dir, entry['file'])
+            stale = sources is not None and entry.get('sources') != sources
+            if stale or time.time() - entry['created'] > self.ttl or not os.path.exists(path):
+                self._remove_entry(index, key)
+                self._save_index(index)
+                return None
+
+            try:
+                table = pq.read_table(path)
+            except Exception:
+                self._remove_entry(index, key)
+                self._save_index(index)
+                return None
+
+            entry['last_access'] = time.time()
+            entry['hits'] = entry.get('hits', 0) + 1
+            self._save_index(index)
+            return table
+
+    def get_entry(self, key):
+        """Return the index entry (metadata) for a key, or None"""
+        with self._locked():
+            return self._load_index().get(key)
+
+    def put(self, key, table, query="", **metadata):
+        """Store a pyarrow.Table under a key, evicting old entries if needed"""
+        file_name = f"{key}.parquet"
+        path = os.path.join(self.cache_dir, file_name)
+
+        # Write to a temporary file first so readers never see a partial file. It is moved
+        # into place under the lock, so outside the lock every Parquet file is indexed.
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.parquet.tmp')
+        os.close(fd)
+        try:
+            pq.write_table(table, temp_path, compression='zstd')
+            with self._locked():
+                os.replace(temp_path, path)
+                now = time.time()
+                index = self._load_index()
+                index[key] = {
+                    'file': file_name,
+                    'created': now,
+                    'last_access': now,
+                    'bytes': os.path.getsize(path),
+                    'rows': table.num_rows,
+                    'query': normalize_sql(query)[:200],
+                    'hits': 0,
+                    **metadata,
+                }
+                self._evict(index, keep=key)
+                self._save_index(index)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def invalidate(self, key):
+        """Remove a single entry"""
+        with self._locked():
+            index = self._load_index()
+            if key in index:
+                self._remove_entry(index, key)
+                self._save_index(index)
+
+    def clear(self):
+        """Remove every cached result"""
+        with self._locked():
+            index = self._load_index()
+            for key in list(index):
+                self._remove_entry(index, key)
+            self._save_index(index)
+
+    def stats(self):
+        """Return a summary of the cache contents"""
+        with self._locked():
+            index = self._load_index()
+            return {
+                'entries': len(index),
+                'bytes': sum(entry['bytes'] for entry in index.values()),
+                'max_bytes': self.max_bytes,
+                'cache_dir': self.cache_dir,
+            }
+
+    def _evict(self, index, keep=None):
+        """
+        Drop expired entries, then least recently used entries until under max_bytes.
+        Parquet files without an index entry (e.g. left by a crashed process) are removed too.
+        """
+        indexed = {entry['file'] for entry in index.values()}
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.parquet') and name not in indexed:
+                os.remove(os.path.join(self.cache_dir, name))
+
+        now = time.time()
+        for key in [k for k, entry in index.items() if now - entry['created'] > self.ttl and k != keep]:
+            self._remove_entry(index, key)
+
+        total = sum(entry['bytes'] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]['last_access']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= index[key]['bytes']
+            self._remove_entry(index, key)
+
+    def _remove_entry(self, index, key):
+        entry = index.pop(key)
+        path = os.path.join(self.cache_dir, entry['file'])
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self, index):
+        # Atomic replace so concurrent processes never read a half-written index
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.json.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index, f)
+        os.replace(temp_path, self.index_path)
+
+_cache = None
+
+def get_result_cache():
+    """Return the process-wide result cache"""
+    global _cache
+    if _cache is None:
+        _cache = ResultCache()
+    return _cache
+
+if __name__ == "__main__":
+    import sys
+    cache = get_result_cache()
+    if len(sys.argv) > 1 and sys.argv[1] == "clear":
+        cache.clear()
+        print(f"Cleared result cache in {cache.cache_dir}")
+    else:
+        stats = cache.stats()
+        print(f"Result cache: {stats['cache_dir']}")
+        print(f"  Entries: {stats['entries']}")
+        print(f"  Size: {stats['bytes'] / (1024 * 1024):.1f} MB of {stats['max_bytes'] / (1024 * 1024):.0f} MB")
@@ -5,14 +5,50 @@ Run a SQL File
 This script executes SQL files on Snowflake using credentials from .env file.
 """
 
-import snowflake.connector
 import os
 import sys
 import argparse
 import time
 import re
+import io
+import csv
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from snowflake_credentials import get_snowflake_credentials
+from snowflake_pool import get_connection, get_pool, configure_pool
+from sql_dag import build_dag, print_dag_plan, run_dag, expand_sql_paths
+from sql_lexer import iter_statements, split_statements
+
+class ThreadBufferedStdout:
+    """Stdout proxy that captures output from worker threads into per-thread buffers"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+
+    def start_capture(self):
+        """Start buffering output written by the current thread"""
+        self._local.buffer = io.StringIO()
+
+    def stop_capture(self):
+        """Stop buffering for the current thread and return what was captured"""
+        buffer = getattr(self._local, 'buffer', None)
+        self._local.buffer = None
+        return buffer.getvalue() if buffer else ""
+
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is not None:
+            return buffer.write(text)
+        return self.stream.write(text)
+
+    def flush(self):
+        if getattr(self._local, 'buffer', None) is None:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
 
 def print_progress(current, total, file_name, status="Running"):
     """Print a progress bar and status information"""
@@ -37,8 +73,79 @@ def print_progress(current, total, file_name, status="Running"):
         sys.stdout.write('\n')
         sys.stdout.flush()
 
-def run_sql_file(sql_file, show_statements=True, show_progress=True, stop_on_error=True):
-    """Read SQL from file and run on Snowflake"""
+def write_results_csv(cursor, columns, first_rows, output_path, batch_size=10000):
+    """
+    Stream a result set to a CSV file in batches without holding it in memory.
+    
+    Returns:
+        int: Number of rows written
+    """
+    row_count = 0
+    with open(output_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(first_rows)
+        row_count += len(first_rows)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            writer.writerows(batch)
+            row_count += len(batch)
+    return row_count
+
+def print_results(cursor, preview_rows=20, output_path=None):
+    """
+    Print a preview of the current result set, fetching only the preview rows.
+    
+    The total row count comes from the result metadata (cursor.rowcount) rather than
+    fetching every row. If output_path is given, the full result is streamed to CSV.
+    """
+    columns = [desc[0] for desc in cursor.description]
+    
+    # Fetch one extra row so we know whether there is more without a row count
+    preview = cursor.fetchmany(preview_rows + 1)
+    has_more = len(preview) > preview_rows
+    preview, extra = preview[:preview_rows], preview[preview_rows:]
+    
+    total_rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+    if output_path:
+        written = write_results_csv(cursor, columns, preview + extra, output_path)
+        total_rows = written if total_rows is None else total_rows
+    
+    if not preview:
+        print("Query executed successfully, but no results were returned.")
+        return
+    
+    # Print header
+    header = " | ".join(columns)
+    print("\nColumns:", ", ".join(columns))
+    if total_rows is not None:
+        print(f"Results ({total_rows} rows):")
+    else:
+        print(f"Results ({len(preview)}{'+' if has_more else ''} rows):")
+    print("-" * len(header))
+    print(header)
+    print("-" * len(header))
+    
+    for row in preview:
+        print(" | ".join(str(val) for val in row))
+    
+    if total_rows is not None and total_rows > len(preview):
+        print(f"... and {total_rows - len(preview)} more rows")
+    elif total_rows is None and has_more:
+        print("... and more rows")
+    
+    if output_path:
+        print(f"💾 Full results written to {output_path}")
+
+def run_sql_file(sql_file, show_statements=True, show_progress=True, stop_on_error=True, preview_rows=20, output_dir=None):
+    """
+    Read SQL from file and run on Snowflake.
+    
+    Only the first `preview_rows` rows of each result are fetched for display.
+    If output_dir is given, each full result set is streamed to a CSV file there.
+    """
     start_time = time.time()
     
     # Check if file exists
@@ -64,29 +171,30 @@ def run_sql_file(sql_file, show_statements=True, show_progress=True, stop_on_err
     table_pattern = re.compile(r'create\s+or\s+replace\s+table\s+(\w+\.\w+\.\w+)', re.IGNORECASE)
     tables_created = []
     
+    conn = None
     try:
-        # Connect to Snowflake
-        conn = snowflake.connector.connect(**params)
+        # Get a pooled Snowflake session. Scripts can change session state (SET, ALTER SESSION,
+        # temporary tables), so the session is discarded afterwards instead of being reused.
+        conn = get_connection(params)
         cursor = conn.cursor()
         
-        # Split SQL into statements using regex
-        # This handles semicolons within quotes correctly
-        statements = split_sql_statements(sql_content)
-        valid_statements = [s for s in statements if s.strip()]
+        # Split SQL into statements in a single pass
+        # This handles semicolons within quotes, comments and $$ bodies correctly
+        valid_statements = list(iter_statements(sql_content))
         
         if not valid_statements:
             print(f"⚠️ No valid SQL statements found in {sql_file}")
+            cursor.close()
+            conn.discard()
             return True
             
         print(f"\n🔍 Found {len(valid_statements)} statements to execute")
         
         # Execute each statement
         success_count = 0
-        for i, statement in enumerate(valid_statements):
-            # Skip empty statements
-            if not statement.strip():
-                continue
-                
+        for i, parsed in enumerate(valid_statements):
+            statement = parsed.text
+            
             # Show progress
             if show_progress:
                 print_progress(i+1, len(valid_statements), sql_file)
@@ -98,7 +206,7 @@ def run_sql_file(sql_file, show_statements=True, show_progress=True, stop_on_err
             
             # Show statement if requested
             if show_statements:
-                print(f"\n=== Executing statement {i+1}/{len(valid_statements)} ===")
+                print(f"\n=== Executing statement {i+1}/{len(valid_statements)} (line {parsed.line}) ===")
                 print(statement)
                 print("="*40)
             
@@ -109,31 +217,11 @@ def run_sql_file(sql_file, show_statements=True, show_progress=True, stop_on_err
                 
                 # Process results if the statement returns data
                 if cursor.description:
-                    # Get column names
-                    columns = [desc[0] for desc in cursor.description]
-                    
-                    # Fetch results
-                    results = cursor.fetchall()
-                    
-                    # Print results
-                    if results:
-                        # Print header
-                        header = " | ".join(columns)
-                        print("\nColumns:", ", ".join(columns))
-                        print(f"Results ({len(results)} rows):")
-                        print("-" * len(header))
-                        print(header)
-                        print("-" * len(header))
-                        
-                        # Print up to 20 rows
-                        max_rows = min(20, len(results))
-                        for row in results[:max_rows]:
-                            print(" | ".join(str(val) for val in row))
-                            
-                        if len(results) > 20:
-                            print(f"... and {len(results) - 20} more rows")
-                    else:
-                        print("Query executed successfully, but no results were returned.")
+                    output_path = None
+                    if output_dir:
+                        file_stem = os.path.splitext(os.path.basename(sql_file))[0]
+                        output_path = os.path.join(output_dir, f"{file_stem}_statement_{i+1}.csv")
+                    print_results(cursor, preview_rows, output_path)
                 else:
                     if show_statements:
                         print("Statement executed successfully.")
@@ -144,13 +232,13 @@ def run_sql_file(sql_file, show_statements=True, show_progress=True, stop_on_err
             except Exception as e:
                 if show_progress:
                     print_progress(i+1, len(valid_statements), sql_file, "Failed")
-                print(f"❌ Error executing statement: {e}")
+                print(f"❌ Error executing statement {i+1} (line {parsed.line}): {e}")
                 
                 # Stop execution if stop_on_error is True
                 if stop_on_error:
                     print("❌ Stopping execution due to error.")
                     cursor.close()
-                    conn.close()
+                    conn.discard()
                     total_time = time.time() - start_time
                     print(f"\n⛔ SQL execution stopped: {success_count}/{len(valid_statements)} statements successful in {total_time:.2f} seconds")
                     return False
@@ -159,7 +247,7 @@ def run_sql_file(sql_file, show_statements=True, show_progress=True, stop_on_err
                     print("Continuing with next statement...\n")
         
         cursor.close()
-        conn.close()
+        conn.discard()
         
         # Report on tables created
         if tables_created:
@@ -171,57 +259,21 @@ def run_sql_file(sql_file, show_statements=True, show_progress=True, stop_on_err
         print(f"\n✅ SQL execution completed: {success_count}/{len(valid_statements)} statements successful in {total_time:.2f} seconds")
         return success_count == len(valid_statements)
     except Exception as e:
+        if conn is not None:
+            conn.discard()
         print(f"\n❌ Connection failed: {e}")
         return False
 
 def split_sql_statements(sql_content):
-    """Split SQL content into individual statements correctly handling quoted strings"""
-    # First, replace any commented-out semicolons with a placeholder
-    # Pattern for single-line comments
-    sql_content = re.sub(r'--.*?;', lambda m: m.group(0).replace(';', '@@SEMICOLON@@'), sql_content)
-    
-    # Regex for splitting SQL statements while respecting quotes
-    # This uses a negative lookahead to ensure we don't split on semicolons within quotes
-    statements = []
-    current_statement = []
-    lines = sql_content.split('\n')
-    
-    for line in lines:
-        # Skip empty lines or comments
-        if not line.strip() or line.strip().startswith('--'):
-            current_statement.append(line)
-            continue
-            
-        # Check if the line ends with a semicolon (outside of quotes)
-        if re.search(r';(?=(?:[^\']*\'[^\']*\')*[^\']*$)(?=(?:[^"]*"[^"]*")*[^"]*$)', line):
-            # Split by semicolon outside quotes
-            parts = re.split(r'(;)(?=(?:[^\']*\'[^\']*\')*[^\']*$)(?=(?:[^"]*"[^"]*")*[^"]*$)', line)
-            
-            for i in range(0, len(parts), 2):
-                if i+1 < len(parts):  # If we have a semicolon part
-                    current_statement.append(parts[i] + parts[i+1])  # Add with semicolon
-                    statements.append('\n'.join(current_statement))
-                    current_statement = []
-                else:
-                    current_statement.append(parts[i])
-        else:
-            current_statement.append(line)
-    
-    # Add the last statement if there's any
-    if current_statement:
-        statements.append('\n'.join(current_statement))
-    
-    # If no statements were found, treat the entire content as one statement
-    if not statements:
-        statements = [sql_content]
-    
-    # Restore any placeholders back to semicolons
-    statements = [stmt.replace('@@SEMICOLON@@', ';') for stmt in statements]
-    
-    return statements
+    """Split SQL content into individual statements correctly handling quotes and comments"""
+    return split_statements(sql_content)
 
-def run_multiple_files(file_list, show_statements=False, show_progress=True, stop_on_error=True):
-    """Run multiple SQL files in sequence"""
+def run_multiple_files(file_list, show_statements=False, show_progress=True, stop_on_error=True, jobs=1,
+                       preview_rows=20, output_dir=None):
+    """Run multiple SQL files in sequence, or concurrently when jobs > 1"""
+    if jobs > 1:
+        return run_files_parallel(file_list, show_statements, stop_on_error, jobs, preview_rows, output_dir)
+    
     print(f"\n🚀 Executing {len(file_list)} SQL files")
     
     start_time = time.time()
@@ -230,7 +282,7 @@ def run_multiple_files(file_list, show_statements=False, show_progress=True, sto
     for i, sql_file in enumerate(file_list):
         file_start = time.time()
         print(f"\n[{i+1}/{len(file_list)}] Processing {sql_file}")
-        success = run_sql_file(sql_file, show_statements, show_progress, stop_on_error)
+        success = run_sql_file(sql_file, show_statements, show_progress, stop_on_error, preview_rows, output_dir)
         
         elapsed = time.time() - file_start
         if success:
@@ -248,12 +300,156 @@ def run_multiple_files(file_list, show_statements=False, show_progress=True, sto
     print(f"\n🏁 All SQL files processed: {success_count}/{len(file_list)} files successful in {total_time:.2f} seconds")
     return success_count == len(file_list)
 
+def run_file_buffered(stdout, sql_file, show_statements=False, stop_on_error=True, preview_rows=20, output_dir=None):
+    """
+    Run a single SQL file on a worker thread, buffering its output.
+    
+    Returns:
+        tuple: (success, elapsed seconds, captured output)
+    """
+    stdout.start_capture()
+    file_start = time.time()
+    try:
+        success = run_sql_file(sql_file, show_statements, False, stop_on_error, preview_rows, output_dir)
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        success = False
+    finally:
+        output = stdout.stop_capture()
+    return success, time.time() - file_start, output
+
+def print_file_result(index, total, sql_file, success, elapsed, output):
+    """Print the buffered output and status of a completed file as one block"""
+    print(f"\n[{index}/{total}] Processing {sql_file}")
+    sys.stdout.write(output)
+    if success:
+        print(f"✅ Completed in {elapsed:.2f} seconds")
+    else:
+        print(f"❌ Failed after {elapsed:.2f} seconds")
+    print("-" * 80)
+
+def print_run_summary(file_list, results, total_time):
+    """Print a consolidated summary of a multi-file run"""
+    print("\n📋 Summary:")
+    for sql_file in file_list:
+        status, elapsed = results.get(sql_file, ("Skipped", 0.0))
+        if status == "Success":
+            status_str = "\033[92m[SUCCESS]\033[0m"
+        elif status == "Failed":
+            status_str = "\033[91m[FAILED]\033[0m"
+        else:
+            status_str = "\033[93m[SKIPPED]\033[0m"
+        print(f"  {status_str} {elapsed:8.2f}s  {sql_file}")
+    
+    success_count = sum(1 for status, _ in results.values() if status == "Success")
+    file_time = sum(elapsed for _, elapsed in results.values())
+    print(f"\n🏁 All SQL files processed: {success_count}/{len(file_list)} files successful in {total_time:.2f} seconds "
+          f"({file_time:.2f} seconds of file time)")
+    return success_count == len(file_list)
+
+def run_files_parallel(file_list, show_statements=False, stop_on_error=True, jobs=4, preview_rows=20, output_dir=None):
+    """
+    Run multiple independent SQL files concurrently on a thread pool.
+    
+    Each file runs on its own session. Output from each file is buffered
+    and printed as a single block when the file finishes, followed by a summary.
+    With stop_on_error, files that have not started yet are skipped after a failure.
+    """
+    print(f"\n🚀 Executing {len(file_list)} SQL files with {jobs} parallel jobs")
+    
+    # Make sure the pool can hand out one session per worker
+    configure_pool(max_size=max(jobs, get_pool().max_size))
+    
+    start_time = time.time()
+    results = {}
+    stop_event = threading.Event()
+    stdout = ThreadBufferedStdout(sys.stdout)
+    
+    def run_one(sql_file):
+        if stop_event.is_set():
+            return None
+        result = run_file_buffered(stdout, sql_file, show_statements, stop_on_error, preview_rows, output_dir)
+        if not result[0] and stop_on_error:
+            stop_event.set()
+        return result
+    
+    sys.stdout = stdout
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {executor.submit(run_one, sql_file): sql_file for sql_file in file_list}
+            completed = 0
+            stop_reported = False
+            for future in as_completed(futures):
+                sql_file = futures[future]
+                result = future.result()
+                if result is None:
+                    continue
+                
+                success, elapsed, output = result
+                completed += 1
+                results[sql_file] = ("Success" if success else "Failed", elapsed)
+                print_file_result(completed, len(file_list), sql_file, success, elapsed, output)
+                
+                if not success and stop_on_error and not stop_reported:
+                    print(f"⛔ Skipping files that have not started yet due to error.")
+                    stop_reported = True
+    finally:
+        sys.stdout = stdout.stream
+    
+    return print_run_summary(file_list, results, time.time() - start_time)
+
+def run_files_dag(file_list, show_statements=False, stop_on_error=True, jobs=4, preview_rows=20, output_dir=None):
+    """
+    Run SQL files in dependency order, running independent files concurrently.
+    
+    Dependencies come from the tables each file creates and reads (see sql_dag.py).
+    Files that depend on a failed file are skipped.
+    """
+    try:
+        dag, _ = build_dag(file_list)
+    except ValueError as e:
+        print(f"\n❌ Cannot schedule files: {e}")
+        return False
+    
+    print(f"\n🚀 Executing {len(file_list)} SQL files in dependency order with {jobs} parallel jobs")
+    print_dag_plan(dag)
+    
+    configure_pool(max_size=max(jobs, get_pool().max_size))
+    
+    start_time = time.time()
+    results = {}
+    completed = [0]
+    stdout = ThreadBufferedStdout(sys.stdout)
+    
+    def run_one(sql_file):
+        return run_file_buffered(stdout, sql_file, show_statements, stop_on_error, preview_rows, output_dir)
+    
+    def on_complete(sql_file, result):
+        success, elapsed, output = result
+        completed[0] += 1
+        results[sql_file] = ("Success" if success else "Failed", elapsed)
+        print_file_result(completed[0], len(file_list), sql_file, success, elapsed, output)
+        if not success:
+            print(f"⛔ Skipping files that depend on {os.path.basename(sql_file)}.")
+    
+    sys.stdout = stdout
+    try:
+        run_dag(dag, run_one, jobs, stop_on_error, on_complete)
+    finally:
+        sys.stdout = stdout.stream
+    
+    return print_run_summary(file_list, results, time.time() - start_time)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Execute SQL files on Snowflake")
-    parser.add_argument("files", nargs="+", help="SQL files to execute")
+    parser.add_argument("files", nargs="+", help="SQL files (or directories of SQL files) to execute")
     parser.add_argument("--quiet", action="store_true", help="Don't show individual SQL statements")
     parser.add_argument("--no-progress", action="store_true", help="Don't show progress bars")
     parser.add_argument("--continue-on-error", action="store_true", help="Continue executing statements even if one fails")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Number of files to run concurrently (default: 1)")
+    parser.add_argument("--preview-rows", type=int, default=20, help="Number of result rows to fetch and display per statement (default: 20)")
+    parser.add_argument("--output-dir", help="Stream full result sets to CSV files in this directory")
+    parser.add_argument("--dag", action="store_true", help="Order files by the tables they create and read, running independent files concurrently")
     
     args = parser.parse_args()
     
@@ -262,10 +458,16 @@ if __name__ == "__main__":
     show_statements = not args.quiet
     show_progress = not args.no_progress
     stop_on_error = not args.continue_on_error
+    files = expand_sql_paths(args.files)
+    
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
     
-    if len(args.files) == 1:
-        success = run_sql_file(args.files[0], show_statements, show_progress, stop_on_error)
+    if args.dag:
+        success = run_files_dag(files, show_statements, stop_on_error, max(args.jobs, 1), args.preview_rows, args.output_dir)
+    elif len(files) == 1:
+        success = run_sql_file(files[0], show_statements, show_progress, stop_on_error, args.preview_rows, args.output_dir)
     else:
-        success = run_multiple_files(args.files, show_statements, show_progress, stop_on_error)
+        success = run_multiple_files(files, show_statements, show_progress, stop_on_error, args.jobs, args.preview_rows, args.output_dir)
     
     sys.exit(0 if success else 1) 
\ No newline at end of file
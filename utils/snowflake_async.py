@@ -0,0 +1,206 @@
+"""
+Asyncio Query API
+
+This module runs Snowflake queries from asyncio code using server-side async
+execution: queries are submitted with execute_async and their query ids are
+polled until they finish, so many queries can be in flight over a single pooled
+session instead of using a session per query. The connector calls themselves
+(submitting, polling and fetching) block, so they run in worker threads and a
+large fetch does not hold up the other queries.
+
+Usage:
+    import asyncio
+    from snowflake_async import run, gather
+
+    df = asyncio.run(run("SELECT current_date()"))
+
+    queries = [f"SELECT ... WHERE vertical = '{v}'" for v in verticals]
+    results = asyncio.run(gather(queries, concurrency=20))
+
+Results are pandas DataFrames by default (return_type="pandas"); "arrow" returns
+pyarrow Tables and "rows" returns lists of tuples.
+"""
+
+import asyncio
+import time
+from snowflake_pool import get_connection
+
+RETURN_TYPES = ("pandas", "arrow", "rows")
+DEFAULT_CONCURRENCY = 16
+POLL_INTERVAL = 0.2
+MAX_POLL_INTERVAL = 2.0
+
+class AsyncQueryRunner:
+    """Submits queries asynchronously on one Snowflake connection and awaits their results"""
+
+    def __init__(self, conn, poll_interval=POLL_INTERVAL, max_poll_interval=MAX_POLL_INTERVAL):
+        self.conn = conn
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+
+    async def _in_thread(self, func, *args, on_cancel=None):
+        """
+        Run a blocking connector call in a worker thread. If the caller is cancelled, the
+        call still finishes before the cancellation propagates, so nothing is left using the
+        session, and on_cancel is called with its result.
+        """
+        future = asyncio.ensure_future(asyncio.to_thread(func, *args))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            await asyncio.wait([future])
+            if on_cancel is not None and future.exception() is None:
+                on_cancel(future.result())
+            raise
+
+    def submit(self, query, params=None):
+        """Submit a query for server-side execution and return its query id"""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute_async(query, params)
+            return cursor.sfqid
+        finally:
+            cursor.close()
+
+    async def wait(self, query_id, timeout=None):
+        """
+        Poll a query until it finishes, backing off between polls.
+
+        Raises:
+            ProgrammingError: If the query failed
+            TimeoutError: If the query is still running after `timeout` seconds
+                (the query is cancelled)
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        interval = self.poll_interval
+        while True:
+            status = await self._in_thread(self.conn.get_query_status_throw_if_error, query_id)
+            if not self.conn.is_still_running(status):
+                return status
+            if deadline is not None and time.time() >= deadline:
+                self.cancel(query_id)
+                raise TimeoutError(f"Query {query_id} did not finish within {timeout} seconds")
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, self.max_poll_interval)
+
+    def fetch(self, query_id, return_type="pandas"):
+        """Fetch the results of a finished query (None for statements without a result set, e.g. DDL)"""
+        cursor = self.conn.cursor()
+        try:
+            cursor.get_results_from_sfqid(query_id)
+            if cursor.description is None:
+                return None
+            if return_type == "rows":
+                return cursor.fetchall()
+
+            columns = [desc[0].lower() for desc in cursor.description]
+            if return_type == "arrow":
+                table = cursor.fetch_arrow_all()
+                if table is None:
+                    import pyarrow as pa
+                    # A list keeps duplicate column names (e.g. SELECT a.id, b.id), a dict would drop them
+                    return pa.table([pa.array([]) for _ in columns], names=columns)
+                return table.rename_columns(columns)
+
+            data = cursor.fetch_pandas_all()
+            data.columns = columns
+            return data
+        finally:
+            cursor.close()
+
+    def cancel(self, query_id):
+        """Cancel a running query (errors are ignored)"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT SYSTEM$CANCEL_QUERY(%s)", (query_id,))
+            cursor.close()
+        except Exception:
+            pass
+
+    async def run(self, query, params=None, return_type="pandas", timeout=None):
+        """Run one query and return its results"""
+        if return_type not in RETURN_TYPES:
+            raise ValueError(f"return_type must be one of {', '.join(RETURN_TYPES)}, got '{return_type}'")
+        query_id = await self._in_thread(self.submit, query, params, on_cancel=self.cancel)
+        try:
+            await self.wait(query_id, timeout)
+        except asyncio.CancelledError:
+            # Do not leave the query running on the warehouse
+            self.cancel(query_id)
+            raise
+        return await self._in_thread(self.fetch, query_id, return_type)
+
+    async def gather(self, queries, concurrency=DEFAULT_CONCURRENCY, return_type="pandas",
+                     timeout=None, return_exceptions=False):
+        """
+        Run many queries with at most `concurrency` in flight at once.
+
+        Args:
+            queries (list): SQL strings, or (sql, params) tuples
+            concurrency (int): Maximum number of queries running on the server at once
+            return_type (str): "pandas", "arrow" or "rows"
+            timeout (float, optional): Seconds each query may run before it is cancelled
+            return_exceptions (bool): Return exceptions in place of results instead of
+                raising the first one
+
+        Returns:
+            list: Results in the same order as `queries`
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run_one(item):
+            query, params = item if isinstance(item, tuple) else (item, None)
+            async with semaphore:
+                return await self.run(query, params, return_type, timeout)
+
+        tasks = [asyncio.ensure_future(run_one(item)) for item in queries]
+        if not tasks:
+            return []
+        try:
+            if return_exceptions:
+                return await asyncio.gather(*tasks, return_exceptions=True)
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in tasks:
+                if task in done and task.exception() is not None:
+                    raise task.exception()
+            return [task.result() for task in tasks]
+        finally:
+            # Cancel whatever is still in flight (run() cancels its server-side query) and wait
+            # for it, so no task is still using the session when it goes back to the pool
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+async def run(query, params=None, return_type="pandas", timeout=None, connection_params=None):
+    """
+    Run a query asynchronously on a pooled session.
+
+    Args:
+        query (str): SQL query
+        params (sequence or dict, optional): Bind parameters
+        return_type (str): "pandas", "arrow" or "rows"
+        timeout (float, optional): Seconds the query may run before it is cancelled
+        connection_params (dict, optional): Connection parameters for the pool
+
+    Returns:
+        The query results in the requested form
+    """
+    with get_connection(connection_params) as conn:
+        return await AsyncQueryRunner(conn).run(query, params, return_type, timeout)
+
+async def gather(queries, concurrency=DEFAULT_CONCURRENCY, return_type="pandas", timeout=None,
+                 return_exceptions=False, connection_params=None):
+    """
+    Run many queries concurrently over one pooled session (see AsyncQueryRunner.gather).
+
+    Returns:
+        list: Results in the same order as `queries`
+    """
+    with get_connection(connection_params) as conn:
+        runner = AsyncQueryRunner(conn)
+        return await runner.gather(queries, concurrency, return_type, timeout, return_exceptions)
+
+def run_queries(queries, concurrency=DEFAULT_CONCURRENCY, return_type="pandas", **kwargs):
+    """Blocking wrapper around gather() for scripts that are not already async"""
+    return asyncio.run(gather(queries, concurrency, return_type, **kwargs))
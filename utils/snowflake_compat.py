@@ -15,6 +15,15 @@ Example:
     
     # New code
     from snowflake_compat import get_data
+
+    # Results larger than memory can be processed in chunks or exported
+    from snowflake_compat import get_data_batches, export_query
+    for chunk in get_data_batches(query, batch_rows=500000):
+        ...
+    export_query(query, "fact_nv_notifs.parquet")
+
+    # Repeated reads of the same query can be served from a local cache
+    df = get_data(query, cache="use", variables={"window_start": "2025-01-01"})
 """
 
 import pandas as pd
@@ -23,8 +32,24 @@ import os
 import tempfile
 import subprocess
 import warnings
+import re
 import toml
-import snowflake.connector
+from snowflake_pool import get_connection, pool_key
+from table_freshness import get_source_watermarks
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+    from result_cache import get_result_cache
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+RETURN_TYPES = ("pandas", "arrow", "iterator")
+DEFAULT_BATCH_ROWS = 100000
+CACHE_MODES = ("off", "use", "refresh")
+DEFAULT_CACHE_MODE = os.getenv("SNOWFLAKE_RESULT_CACHE", "off").lower()
 
 # Display deprecation warning
 warnings.warn(
@@ -35,32 +60,269 @@ warnings.warn(
     stacklevel=2
 )
 
-def get_snowflake_connection():
-    """Get Snowflake connection using parameters from connections.toml"""
-    # Load connection parameters from ~/.snowflake/connections.toml
+def get_connection_params():
+    """Load connection parameters for doordash_prod from ~/.snowflake/connections.toml"""
     with open(os.path.expanduser("~/.snowflake/connections.toml"), "r") as f:
         config = toml.load(f)
     
-    # Get parameters for doordash_prod
     params = config["connections"]["doordash_prod"]
-    
-    # Create connection
-    return snowflake.connector.connect(
-        user=params["user"],
-        password=params["password"],
-        account=params["account"],
-        warehouse=params["warehouse"],
-        database=params["database"],
-        schema=params["schema"]
-    )
+    return {
+        "user": params["user"],
+        "password": params["password"],
+        "account": params["account"],
+        "warehouse": params["warehouse"],
+        "database": params["database"],
+        "schema": params["schema"]
+    }
 
-def get_data(query):
+def get_snowflake_connection():
+    """
+    Get a pooled Snowflake connection using parameters from connections.toml.
+    Closing the connection returns the session to the pool.
+    """
+    return get_connection(get_connection_params())
+
+def set_session_variables(cursor, variables, applied=None):
+    """
+    Set session variables (e.g. {"window_start": "2025-01-01"} for $window_start).
+    Each name is appended to `applied` once it is set, so a failure partway through
+    can unset exactly the variables that were set.
+    """
+    for name, value in (variables or {}).items():
+        if not re.match(r'^[A-Za-z_]\w*$', name):
+            raise ValueError(f"Invalid session variable name: '{name}'")
+        cursor.execute(f"SET {name} = %s", (value,))
+        if applied is not None:
+            applied.append(name)
+
+def unset_session_variables(cursor, variables):
+    """Remove session variables so they do not leak into the next use of a pooled session"""
+    if variables:
+        cursor.execute(f"UNSET ({', '.join(variables)})")
+
+def release_session_variables(conn, cursor, variables):
+    """
+    Unset session variables and close the cursor. If the UNSET fails the session is
+    discarded, so it does not go back to the pool still carrying the variables.
+    """
+    try:
+        unset_session_variables(cursor, variables)
+        clean = True
+    except Exception:
+        clean = False
+    cursor.close()
+    if not clean:
+        conn.discard()
+
+def get_data(query, return_type="pandas", zero_copy=False, cache=None, variables=None):
     """
     Fetch data from Snowflake and return as a pandas DataFrame.
     This maintains the same interface as the old get_data function.
+    
+    Results are fetched as Arrow record batches through the connector's Arrow
+    support instead of row by row. Column names are lowercased.
+    
+    Args:
+        query (str): SQL query to run
+        return_type (str): "pandas" for a DataFrame, "arrow" for a pyarrow.Table,
+            or "iterator" for a generator of DataFrames, one per result batch
+        zero_copy (bool): Convert Arrow to pandas without consolidating columns into
+            blocks, releasing Arrow buffers as they are converted (lower peak memory)
+        cache (str, optional): "off" to always query Snowflake, "use" to return a cached
+            result when one exists and none of the query's source tables changed since
+            (see result_cache.py), or "refresh" to re-run the query and overwrite the
+            cached result. Defaults to SNOWFLAKE_RESULT_CACHE (or "off"). Queries that
+            write tables, read views, read no tables or use non-deterministic functions
+            such as CURRENT_DATE are never cached. Ignored for return_type="iterator".
+            Caching needs pyarrow; without it a warning is shown and the query always runs.
+        variables (dict, optional): Session variables to SET before the query runs,
+            e.g. {"window_start": "2025-01-01"} for queries using $window_start
+    """
+    if return_type not in RETURN_TYPES:
+        raise ValueError(f"return_type must be one of {', '.join(RETURN_TYPES)}, got '{return_type}'")
+    cache = DEFAULT_CACHE_MODE if cache is None else cache
+    if cache not in CACHE_MODES:
+        raise ValueError(f"cache must be one of {', '.join(CACHE_MODES)}, got '{cache}'")
+    
+    if not ARROW_AVAILABLE:
+        if return_type != "pandas":
+            raise ImportError("pyarrow is required for return_type='arrow' or 'iterator'. "
+                              "Install snowflake-connector-python[pandas].")
+        if cache != "off":
+            warnings.warn("The result cache needs pyarrow, running the query without it. "
+                          "Install snowflake-connector-python[pandas].", stacklevel=2)
+        return get_data_legacy(query, variables)
+    
+    if return_type == "iterator":
+        return get_data_batches(query, batch_rows=None, variables=variables)
+    
+    params = get_connection_params()
+    table = None
+    watermarks = None
+    if cache != "off":
+        # Watermarks are read before the query runs, so a load that lands while
+        # it runs makes the stored result stale rather than wrongly fresh
+        with get_connection(params) as conn:
+            watermarks = get_source_watermarks(conn, query, params.get("database"), params.get("schema"))
+        if watermarks is not None:
+            result_cache = get_result_cache()
+            cache_key = result_cache.make_key(query, variables, pool_key(params))
+            if cache == "use":
+                table = result_cache.get(cache_key, sources=watermarks)
+    
+    if table is None:
+        table = fetch_arrow_table(query, params, variables)
+        if watermarks is not None:
+            result_cache.put(cache_key, table, query, sources=watermarks)
+    
+    if return_type == "arrow":
+        return table
+    return arrow_to_pandas(table, zero_copy)
+
+def fetch_arrow_table(query, params=None, variables=None):
+    """Run a query and return the full result as a pyarrow.Table with lowercased columns"""
+    with get_connection(params or get_connection_params()) as conn:
+        cursor = conn.cursor()
+        applied = []
+        try:
+            set_session_variables(cursor, variables, applied)
+            cursor.execute(query)
+            table = cursor.fetch_arrow_all()
+            columns = [desc[0].lower() for desc in cursor.description]
+        finally:
+            release_session_variables(conn, cursor, applied)
+    
+    # The connector returns None instead of an empty table when there are no rows
+    if table is None:
+        # A list keeps duplicate column names (e.g. SELECT a.id, b.id), a dict would drop them
+        return pa.table([pa.array([]) for _ in columns], names=columns)
+    return table.rename_columns(columns)
+
+def arrow_to_pandas(table, zero_copy=False):
+    """Convert a pyarrow.Table to a pandas DataFrame"""
+    if zero_copy:
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+    return table.to_pandas()
+
+def get_data_batches(query, batch_rows=DEFAULT_BATCH_ROWS, return_type="pandas", variables=None):
+    """
+    Yield the results of a query in chunks as they arrive from Snowflake, so results
+    larger than memory can be processed or exported.
+    
+    The pooled connection is held until the generator is exhausted or closed.
+    
+    Args:
+        query (str): SQL query to run
+        batch_rows (int): Rows per chunk (positive). None yields the connector's result batches as-is.
+        return_type (str): "pandas" for DataFrame chunks or "arrow" for pyarrow.Table chunks
+        variables (dict, optional): Session variables to SET before the query runs
+    
+    Statements without a result set (e.g. DDL) yield nothing.
     """
+    if return_type not in ("pandas", "arrow"):
+        raise ValueError(f"return_type must be 'pandas' or 'arrow', got '{return_type}'")
+    if batch_rows is not None and batch_rows <= 0:
+        raise ValueError(f"batch_rows must be a positive number of rows or None, got {batch_rows}")
+    if not ARROW_AVAILABLE:
+        raise ImportError("pyarrow is required for batched results. Install snowflake-connector-python[pandas].")
+    
+    def convert(table):
+        return table if return_type == "arrow" else table.to_pandas()
+    
     with get_snowflake_connection() as conn:
-        data = pd.read_sql(query, conn)
+        cursor = conn.cursor()
+        applied = []
+        try:
+            set_session_variables(cursor, variables, applied)
+            cursor.execute(query)
+            if cursor.description is None:
+                return
+            columns = [desc[0].lower() for desc in cursor.description]
+            pending = []
+            pending_rows = 0
+            for table in cursor.fetch_arrow_batches():
+                table = table.rename_columns(columns)
+                if batch_rows is None:
+                    yield convert(table)
+                    continue
+                
+                # Re-chunk the connector's batches to batch_rows (concat/slice do not copy data)
+                pending.append(table)
+                pending_rows += table.num_rows
+                while pending_rows >= batch_rows:
+                    combined = pa.concat_tables(pending)
+                    rest = combined.slice(batch_rows)
+                    yield convert(combined.slice(0, batch_rows))
+                    pending = [rest] if rest.num_rows else []
+                    pending_rows = rest.num_rows
+            
+            if pending_rows:
+                yield convert(pa.concat_tables(pending))
+        finally:
+            release_session_variables(conn, cursor, applied)
+
+def write_batches(batches, output_path, file_format=None, compression="snappy"):
+    """
+    Write DataFrame or Arrow chunks to a Parquet or CSV file incrementally.
+    
+    Args:
+        batches: Iterable of pandas DataFrames or pyarrow Tables (e.g. from get_data_batches)
+        output_path (str): File to write
+        file_format (str, optional): "parquet" or "csv". Defaults to the file extension.
+        compression (str): Parquet compression codec
+    
+    Returns:
+        int: Number of rows written
+    """
+    if not ARROW_AVAILABLE:
+        raise ImportError("pyarrow is required to write batches. Install snowflake-connector-python[pandas].")
+    
+    file_format = (file_format or os.path.splitext(output_path)[1].lstrip(".")).lower()
+    if file_format not in ("parquet", "csv"):
+        raise ValueError(f"Unsupported file format '{file_format}'. Use 'parquet' or 'csv'.")
+    
+    writer = None
+    schema = None
+    row_count = 0
+    try:
+        for batch in batches:
+            table = batch if isinstance(batch, pa.Table) else pa.Table.from_pandas(batch, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                if file_format == "parquet":
+                    writer = pq.ParquetWriter(output_path, table.schema, compression=compression)
+                else:
+                    writer = pa_csv.CSVWriter(output_path, table.schema)
+            elif table.schema != schema:
+                # e.g. a column that was all NULL in the first chunk
+                table = table.cast(schema)
+            writer.write_table(table)
+            row_count += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    return row_count
+
+def export_query(query, output_path, batch_rows=DEFAULT_BATCH_ROWS, file_format=None):
+    """
+    Stream the full result of a query to a Parquet or CSV file without loading it into memory.
+    
+    Returns:
+        int: Number of rows written
+    """
+    return write_batches(get_data_batches(query, batch_rows, "arrow"), output_path, file_format)
+
+def get_data_legacy(query, variables=None):
+    """Fetch data through the DB-API with pd.read_sql (used when pyarrow is not installed)"""
+    with get_snowflake_connection() as conn:
+        cursor = conn.cursor()
+        applied = []
+        try:
+            set_session_variables(cursor, variables, applied)
+            data = pd.read_sql(query, conn)
+        finally:
+            release_session_variables(conn, cursor, applied)
         data.columns = [i.lower() for i in data.columns]
         return data
 
@@ -69,9 +331,17 @@ def execute_query(query):
     Execute a query in Snowflake without returning results.
     This maintains the same interface as the old execute_query function.
     """
-    with get_snowflake_connection() as conn:
+    conn = get_snowflake_connection()
+    try:
         cursor = conn.cursor()
-        cursor.execute(query)
+        try:
+            cursor.execute(query)
+        finally:
+            cursor.close()
+    finally:
+        # The statement may change session state (SET, ALTER SESSION, temporary tables),
+        # so the session is not returned to the pool
+        conn.discard()
 
 def get_data_vscode(query):
     """
@@ -0,0 +1,216 @@
+"""
+Bulk Snowflake Metadata Queries
+
+This module fetches INFORMATION_SCHEMA metadata for many tables at once: tables
+are grouped by database and each database is queried once (per chunk of
+tables) with a (TABLE_SCHEMA, TABLE_NAME) IN (...) filter, and the rows are
+partitioned per table in memory. This replaces one catalog query per table
+with one per database. fetch_columns_bulk_async runs the queries for several
+databases concurrently on one session.
+
+Usage:
+    from snowflake_metadata import fetch_columns_bulk
+
+    columns = fetch_columns_bulk(conn, [("PRODDB", "PUBLIC", "DIMENSION_DELIVERIES")])
+    for row in columns[("PRODDB", "PUBLIC", "DIMENSION_DELIVERIES")]:
+        print(row["COLUMN_NAME"], row["DATA_TYPE"])
+"""
+
+import re
+import asyncio
+from collections import defaultdict
+
+DEFAULT_COLUMN_FIELDS = ("COLUMN_NAME", "DATA_TYPE", "COMMENT")
+DEFAULT_CHUNK_SIZE = 1000
+
+# Group Snowflake data types into families that compare as the same type
+# (e.g. for joins, or when a NUMBER column is reloaded as FLOAT)
+TYPE_FAMILIES = {
+    "NUMBER": "NUMERIC",
+    "FLOAT": "NUMERIC",
+    "DATE": "DATETIME",
+    "TIMESTAMP_NTZ": "DATETIME",
+    "TIMESTAMP_LTZ": "DATETIME",
+    "TIMESTAMP_TZ": "DATETIME",
+}
+
+def type_family(data_type):
+    """Map a DATA_TYPE (e.g. "FLOAT" or "NUMBER(38,0)") to its type family (see TYPE_FAMILIES)"""
+    base_type = str(data_type).split("(")[0].strip().upper()
+    return TYPE_FAMILIES.get(base_type, base_type)
+
+def type_family_sql(column):
+    """Build the SQL expression mapping `column` (e.g. "src.DATA_TYPE") to its type family"""
+    types_by_family = defaultdict(list)
+    for data_type, family in TYPE_FAMILIES.items():
+        types_by_family[family].append(f"'{data_type}'")
+    cases = "\n".join(f"        WHEN {column} IN ({', '.join(types)}) THEN '{family}'"
+                      for family, types in types_by_family.items())
+    return f"CASE\n{cases}\n        ELSE {column}\n    END"
+
+def table_key(database, schema, table):
+    """Build the upper-cased (database, schema, table) key used by the bulk fetches"""
+    return (database.upper(), schema.upper(), table.upper())
+
+def group_by_database(tables):
+    """Group (database, schema, table) tuples into {DATABASE: [(SCHEMA, TABLE), ...]}"""
+    grouped = defaultdict(list)
+    for key in sorted({table_key(*table) for table in tables}):
+        grouped[key[0]].append(key[1:])
+    return grouped
+
+def build_information_schema_queries(view, tables, fields, order_by=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Build the batched INFORMATION_SCHEMA queries for many tables.
+
+    Returns:
+        list: (database, [(schema, table), ...], query, params) for each query, one per
+        database and chunk of tables. Result rows are TABLE_SCHEMA, TABLE_NAME, *fields.
+    """
+    for name in (view, *fields):
+        if not re.match(r'^\w+$', name):
+            raise ValueError(f"Invalid INFORMATION_SCHEMA identifier: '{name}'")
+
+    select_list = ", ".join(["TABLE_SCHEMA", "TABLE_NAME"] + list(fields))
+    order_clause = f"ORDER BY {order_by}" if order_by else ""
+
+    queries = []
+    for database, names in group_by_database(tables).items():
+        quoted_database = '"' + database.replace('"', '""') + '"'
+        for start in range(0, len(names), chunk_size):
+            chunk = names[start:start + chunk_size]
+            placeholders = ", ".join(["(%s, %s)"] * len(chunk))
+            query = f"""
+            SELECT {select_list}
+            FROM {quoted_database}.INFORMATION_SCHEMA.{view}
+            WHERE (TABLE_SCHEMA, TABLE_NAME) IN ({placeholders})
+            {order_clause}
+            """
+            params = [value for pair in chunk for value in pair]
+            queries.append((database, chunk, query, params))
+    return queries
+
+def collect_rows(results, database, chunk, rows, fields):
+    """Partition result rows of one batched query into results, one list per table"""
+    for schema, table in chunk:
+        results.setdefault((database, schema, table), [])
+    for row in rows:
+        results.setdefault((database, row[0], row[1]), []).append(dict(zip(fields, row[2:])))
+
+def drop_database(results, database, view, error):
+    """Report a database whose metadata could not be read and leave its tables out of results"""
+    print(f"Error retrieving {view.lower()} metadata for database {database}: {error}")
+    for key in [key for key in results if key[0] == database]:
+        del results[key]
+
+def fetch_information_schema(conn, view, tables, fields, order_by=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Fetch rows from an INFORMATION_SCHEMA view for many tables.
+
+    Args:
+        conn: Snowflake connection
+        view (str): INFORMATION_SCHEMA view, e.g. "COLUMNS" or "TABLES"
+        tables (iterable): (database, schema, table) tuples
+        fields (sequence): Columns of the view to return
+        order_by (str, optional): ORDER BY clause applied within each query
+        chunk_size (int): Maximum number of tables per query
+
+    Returns:
+        dict: (DATABASE, SCHEMA, TABLE) -> list of {field: value} dicts. Tables that
+        do not exist map to an empty list. Databases that fail are reported and left out.
+    """
+    results = {}
+    failed = set()
+    for database, chunk, query, params in build_information_schema_queries(view, tables, fields, order_by, chunk_size):
+        if database in failed:
+            continue
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            collect_rows(results, database, chunk, cursor, fields)
+        except Exception as e:
+            failed.add(database)
+            drop_database(results, database, view, e)
+        finally:
+            cursor.close()
+
+    return results
+
+async def fetch_information_schema_async(runner, view, tables, fields, order_by=None,
+                                         chunk_size=DEFAULT_CHUNK_SIZE, concurrency=8, on_progress=None):
+    """
+    Like fetch_information_schema, but runs the batched queries concurrently on one
+    session through a snowflake_async.AsyncQueryRunner.
+
+    Args:
+        runner: AsyncQueryRunner for the connection to use
+        concurrency (int): Maximum number of queries in flight at once
+        on_progress (callable, optional): Called with (database, tables in the chunk)
+            as each query finishes
+
+    Returns:
+        dict: Same as fetch_information_schema
+    """
+    queries = build_information_schema_queries(view, tables, fields, order_by, chunk_size)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(database, chunk, query, params):
+        async with semaphore:
+            try:
+                return database, chunk, await runner.run(query, params, return_type="rows"), None
+            except Exception as e:
+                return database, chunk, None, e
+
+    results = {}
+    failed = set()
+    for next_result in asyncio.as_completed([run_one(*query) for query in queries]):
+        database, chunk, rows, error = await next_result
+        if on_progress:
+            on_progress(database, chunk)
+        if database in failed:
+            continue
+        if error is not None:
+            failed.add(database)
+            drop_database(results, database, view, error)
+        else:
+            collect_rows(results, database, chunk, rows, fields)
+    return results
+
+def fetch_columns_bulk(conn, tables, fields=DEFAULT_COLUMN_FIELDS, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Fetch INFORMATION_SCHEMA.COLUMNS rows for many tables, one query per database.
+
+    Returns:
+        dict: (DATABASE, SCHEMA, TABLE) -> list of column dicts in ordinal order
+    """
+    return fetch_information_schema(
+        conn, "COLUMNS", tables, fields,
+        order_by="TABLE_SCHEMA, TABLE_NAME, ORDINAL_POSITION",
+        chunk_size=chunk_size
+    )
+
+def fetch_tables_bulk(conn, tables, fields=("TABLE_TYPE", "ROW_COUNT", "BYTES", "LAST_ALTERED"),
+                      chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Fetch INFORMATION_SCHEMA.TABLES rows for many tables, one query per database.
+
+    Returns:
+        dict: (DATABASE, SCHEMA, TABLE) -> {field: value}, or None for tables that do not exist
+    """
+    rows = fetch_information_schema(conn, "TABLES", tables, fields, chunk_size=chunk_size)
+    return {key: (values[0] if values else None) for key, values in rows.items()}
+
+async def fetch_columns_bulk_async(runner, tables, fields=DEFAULT_COLUMN_FIELDS, chunk_size=DEFAULT_CHUNK_SIZE,
+                                   concurrency=8, on_progress=None):
+    """
+    Fetch INFORMATION_SCHEMA.COLUMNS rows for many tables, with the per-database
+    queries running concurrently (see fetch_information_schema_async).
+
+    Returns:
+        dict: (DATABASE, SCHEMA, TABLE) -> list of column dicts in ordinal order
+    """
+    return await fetch_information_schema_async(
+        runner, "COLUMNS", tables, fields,
+        order_by="TABLE_SCHEMA, TABLE_NAME, ORDINAL_POSITION",
+        chunk_size=chunk_size, concurrency=concurrency, on_progress=on_progress
+    )
@@ -0,0 +1,268 @@
+"""
+Snowflake Connection Pool
+
+This module provides a process-wide pool of Snowflake sessions so that scripts
+running many short queries do not pay the login handshake for each one.
+
+Sessions are pooled per connection identity (account, user, role, warehouse,
+database, schema) and the rest of the connect parameters. Connections handed out by the pool behave like regular
+connector connections, except that close() (or leaving a `with` block) returns
+the session to the pool instead of logging out. Released sessions are reused
+as-is, so code that runs arbitrary SQL (SET, ALTER SESSION, temporary tables)
+should call discard() instead, which logs the session out.
+
+Usage:
+    from snowflake_pool import get_connection
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT current_user()")
+
+Pool behaviour can be tuned with environment variables:
+    SNOWFLAKE_POOL_MAX_SIZE          Max sessions per identity (default: 8)
+    SNOWFLAKE_POOL_IDLE_TIMEOUT      Seconds before an idle session is closed (default: 600)
+    SNOWFLAKE_POOL_HEALTH_CHECK      Seconds of idleness after which a session is
+                                     pinged before reuse (default: 60)
+"""
+
+import os
+import time
+import hashlib
+import atexit
+import threading
+import snowflake.connector
+from snowflake_credentials import get_snowflake_credentials
+
+DEFAULT_MAX_SIZE = int(os.getenv('SNOWFLAKE_POOL_MAX_SIZE', '8'))
+DEFAULT_IDLE_TIMEOUT = float(os.getenv('SNOWFLAKE_POOL_IDLE_TIMEOUT', '600'))
+DEFAULT_HEALTH_CHECK = float(os.getenv('SNOWFLAKE_POOL_HEALTH_CHECK', '60'))
+
+IDENTITY_PARAMS = ('account', 'user', 'role', 'warehouse', 'database', 'schema')
+
+def pool_key(params):
+    """
+    Build the pool key for a set of connection parameters.
+
+    The key is the identity (IDENTITY_PARAMS) followed by a hash of every other
+    connect parameter (password, authenticator, session_parameters, ...), so
+    sessions opened with different settings are never shared. The hash keeps
+    secrets out of the key, which shows up in stats().
+    """
+    identity = tuple(str(params.get(name) or '').upper() for name in IDENTITY_PARAMS)
+    others = sorted((name, repr(value)) for name, value in params.items() if name not in IDENTITY_PARAMS)
+    return identity + (hashlib.sha256(repr(others).encode()).hexdigest()[:16],)
+
+class PooledConnection:
+    """
+    Wrapper around a Snowflake connection that returns it to the pool on close.
+    All other attributes are delegated to the underlying connection.
+    """
+
+    def __init__(self, pool, key, conn):
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    @property
+    def raw_connection(self):
+        """The underlying snowflake.connector connection"""
+        return self._conn
+
+    def close(self):
+        """Return the session to the pool"""
+        if not self._released:
+            self._released = True
+            self._pool.release(self._key, self._conn)
+
+    def discard(self):
+        """Log the session out instead of returning it, so its session state is not reused"""
+        if not self._released:
+            self._released = True
+            self._pool.discard(self._key, self._conn)
+
+    def is_closed(self):
+        return self._released or self._conn.is_closed()
+
+class ConnectionPool:
+    """Thread-safe pool of Snowflake sessions keyed by connection identity"""
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 health_check_after=DEFAULT_HEALTH_CHECK):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self._idle = {}      # key -> list of (connection, last_used)
+        self._in_use = {}    # key -> number of checked out sessions
+        self._lock = threading.Condition()
+
+    def acquire(self, params=None, timeout=None):
+        """
+        Check out a session for the given connection parameters.
+
+        Blocks while `max_size` sessions for this identity are already in use.
+
+        Returns:
+            PooledConnection: A connection that is returned to the pool on close()
+        """
+        if params is None:
+            params = get_snowflake_credentials()
+        key = pool_key(params)
+        deadline = None if timeout is None else time.time() + timeout
+
+        with self._lock:
+            while True:
+                self._evict_idle(key)
+                idle = self._idle.setdefault(key, [])
+                if idle:
+                    conn, last_used = idle.pop()
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    break
+                if self._in_use.get(key, 0) < self.max_size:
+                    conn, last_used = None, None
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    break
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"Timed out waiting for a Snowflake session ({self.max_size} in use)")
+                self._lock.wait(remaining)
+
+        # Connect or health check outside the lock so other threads are not blocked
+        try:
+            if conn is not None and not self._is_healthy(conn, last_used):
+                self._close_quietly(conn)
+                conn = None
+            if conn is None:
+                # Keep-alive stops idle pooled sessions from expiring, unless the caller set it
+                conn = snowflake.connector.connect(
+                    **{**params, "client_session_keep_alive": params.get("client_session_keep_alive", True)}
+                )
+        except Exception:
+            with self._lock:
+                self._in_use[key] -= 1
+                self._lock.notify()
+            raise
+
+        return PooledConnection(self, key, conn)
+
+    def release(self, key, conn):
+        """Return a session to the pool"""
+        reusable = not conn.is_closed() and self._session_matches(key, conn)
+        if not reusable:
+            self._close_quietly(conn)
+
+        with self._lock:
+            self._in_use[key] = max(self._in_use.get(key, 0) - 1, 0)
+            if reusable:
+                self._idle.setdefault(key, []).append((conn, time.time()))
+            self._lock.notify()
+
+    def discard(self, key, conn):
+        """Drop a session without returning it to the pool"""
+        self._close_quietly(conn)
+        with self._lock:
+            self._in_use[key] = max(self._in_use.get(key, 0) - 1, 0)
+            self._lock.notify()
+
+    def close_all(self):
+        """Close every idle session in the pool"""
+        with self._lock:
+            idle = [conn for sessions in self._idle.values() for conn, _ in sessions]
+            self._idle.clear()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        """Return a dict of {key: (idle, in_use)} for reporting"""
+        with self._lock:
+            keys = set(self._idle) | set(self._in_use)
+            return {key: (len(self._idle.get(key, [])), self._in_use.get(key, 0)) for key in keys}
+
+    def _evict_idle(self, key):
+        """Close sessions that have been idle longer than idle_timeout (lock held)"""
+        now = time.time()
+        idle = self._idle.get(key, [])
+        expired = [conn for conn, last_used in idle if now - last_used > self.idle_timeout]
+        if expired:
+            self._idle[key] = [(conn, last_used) for conn, last_used in idle
+                               if now - last_used <= self.idle_timeout]
+            for conn in expired:
+                self._close_quietly(conn)
+
+    def _is_healthy(self, conn, last_used):
+        """Check that a session is still usable, pinging it if it has been idle a while"""
+        if conn.is_closed():
+            return False
+        if time.time() - last_used < self.health_check_after:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _session_matches(key, conn):
+        """Only reuse sessions whose context still matches the pool key (e.g. after a USE statement)"""
+        for position, name in ((2, 'role'), (3, 'warehouse'), (4, 'database'), (5, 'schema')):
+            current = (getattr(conn, name, None) or '').upper()
+            if key[position] and current != key[position]:
+                return False
+        return True
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return the process-wide connection pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+            atexit.register(_pool.close_all)
+        return _pool
+
+def configure_pool(max_size=None, idle_timeout=None, health_check_after=None):
+    """Adjust settings of the process-wide pool (e.g. to match a worker count)"""
+    pool = get_pool()
+    with pool._lock:
+        if max_size is not None:
+            pool.max_size = max_size
+        if idle_timeout is not None:
+            pool.idle_timeout = idle_timeout
+        if health_check_after is not None:
+            pool.health_check_after = health_check_after
+        pool._lock.notify_all()
+    return pool
+
+def get_connection(params=None, timeout=None):
+    """
+    Get a pooled Snowflake connection.
+
+    Args:
+        params (dict, optional): Connection parameters. Defaults to get_snowflake_credentials().
+        timeout (float, optional): Seconds to wait for a free session.
+
+    Returns:
+        PooledConnection: Use as a context manager or call close() to return it.
+    """
+    return get_pool().acquire(params, timeout=timeout)
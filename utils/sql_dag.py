@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+"""
+SQL File Dependency Scheduler
+
+This module builds a dependency graph (DAG) across SQL files based on the tables
+each file creates or writes and the tables it reads, and executes the files with
+as much parallelism as the dependencies allow.
+
+A file depends on another file when it reads a table the other file creates
+or writes to. Temporary tables are session-scoped and therefore never create
+cross-file dependencies. When several files write the same table they are run
+in the order they were given.
+
+Usage:
+    python utils/sql_dag.py sql_queries/consumer/nv_growth/notifications   # Show the execution plan
+    python utils/run_sql_file.py --dag --jobs 4 <files or directories>      # Run with the scheduler
+"""
+
+import os
+import re
+import sys
+import argparse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+IDENTIFIER = r'((?:"[^"]+"|[\w$]+)(?:\s*\.\s*(?:"[^"]+"|[\w$]+)){0,2})'
+
+# Statements that produce a table other files can read
+CREATE_PATTERN = re.compile(
+    r'\bcreate\s+(?:or\s+replace\s+)?(?:(?:local|global)\s+)?(?:(temp|temporary|volatile)\s+|transient\s+)?'
+    r'(?:table|view|materialized\s+view|secure\s+view|dynamic\s+table)\s+(?:if\s+not\s+exists\s+)?' + IDENTIFIER,
+    re.IGNORECASE
+)
+WRITE_PATTERN = re.compile(
+    r'\b(?:insert\s+(?:overwrite\s+)?into|merge\s+into|delete\s+from|truncate\s+(?:table\s+)?(?:if\s+exists\s+)?)\s*' + IDENTIFIER,
+    re.IGNORECASE
+)
+READ_PATTERN = re.compile(r'\b(?:from|join|using)\s+' + IDENTIFIER, re.IGNORECASE)
+CTE_PATTERN = re.compile(r'(?:\bwith|,)\s+(\w+)\s+as\s*\(', re.IGNORECASE)
+
+# Comments and string literals are blanked out before scanning
+NOISE_PATTERN = re.compile(r"'(?:[^'\\]|\\.|'')*'|--[^\n]*|//[^\n]*|/\*.*?\*/|\$\$.*?\$\$", re.DOTALL)
+
+# Words that can follow FROM/JOIN/USING without naming a table
+NOT_TABLES = {'SELECT', 'LATERAL', 'TABLE', 'VALUES', 'UNNEST', 'FLATTEN', 'DUAL'}
+
+def normalize_table_name(name):
+    """Normalize an identifier like proddb.public."My_Table" to PRODDB.PUBLIC.My_Table"""
+    parts = []
+    for part in re.split(r'\s*\.\s*', name.strip()):
+        if part.startswith('"') and part.endswith('"'):
+            parts.append(part[1:-1])
+        else:
+            parts.append(part.upper())
+    return '.'.join(parts)
+
+def strip_sql_noise(sql_content):
+    """Replace comments and string literals with whitespace so they are not scanned"""
+    return NOISE_PATTERN.sub(' ', sql_content)
+
+def find_table_references(sql_content):
+    """
+    Find the tables a piece of SQL produces and consumes.
+
+    Returns:
+        tuple: (created, read) sets of normalized table names. Temporary tables
+        and CTE names are excluded.
+    """
+    sql = strip_sql_noise(sql_content)
+
+    created = set()
+    for match in CREATE_PATTERN.finditer(sql):
+        if match.group(1):  # temporary tables do not outlive the session
+            continue
+        created.add(normalize_table_name(match.group(2)))
+    for match in WRITE_PATTERN.finditer(sql):
+        created.add(normalize_table_name(match.group(1)))
+
+    cte_names = {name.upper() for name in CTE_PATTERN.findall(sql)}
+    read = set()
+    for match in READ_PATTERN.finditer(sql):
+        name = normalize_table_name(match.group(1))
+        if name.upper() in NOT_TABLES or name.upper() in cte_names:
+            continue
+        read.add(name)
+
+    return created, read
+
+def tables_match(first, second):
+    """Check if two normalized names refer to the same table, allowing partially qualified names"""
+    if first == second:
+        return True
+    first_parts, second_parts = first.split('.'), second.split('.')
+    shorter, longer = sorted((first_parts, second_parts), key=len)
+    return len(shorter) >= 2 and longer[-len(shorter):] == shorter
+
+def parse_sql_file(sql_file):
+    """Read a SQL file and return the (created, read) tables it references"""
+    with open(sql_file, 'r') as f:
+        return find_table_references(f.read())
+
+def expand_sql_paths(paths):
+    """Expand directories into the .sql files they contain (recursively, sorted)"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend(os.path.join(root, name) for name in sorted(names) if name.lower().endswith('.sql'))
+        else:
+            files.append(path)
+    return files
+
+def build_dag(file_list):
+    """
+    Build the dependency graph for a list of SQL files.
+
+    Returns:
+        tuple: (dag, tables) where dag maps each file to the set of files it
+        depends on, and tables maps each file to its (created, read) tables.
+    """
+    tables = {sql_file: parse_sql_file(sql_file) for sql_file in file_list}
+    dag = {sql_file: set() for sql_file in file_list}
+
+    for i, sql_file in enumerate(file_list):
+        created, read = tables[sql_file]
+        for j, other_file in enumerate(file_list):
+            if other_file == sql_file:
+                continue
+            other_created, _ = tables[other_file]
+            # Readers wait for every file that produces a table they read
+            if any(tables_match(r, c) for r in read - created for c in other_created):
+                dag[sql_file].add(other_file)
+            # Files producing the same table run in the order given
+            elif j < i and any(tables_match(c, o) for c in created for o in other_created):
+                dag[sql_file].add(other_file)
+
+    return dag, tables
+
+def topological_order(dag):
+    """
+    Order files so that every file comes after its dependencies.
+    Ties are broken by the original file order.
+
+    Raises:
+        ValueError: If the dependencies contain a cycle
+    """
+    remaining = {node: set(deps) for node, deps in dag.items()}
+    order = []
+    while remaining:
+        ready = [node for node, deps in remaining.items() if not deps]
+        if not ready:
+            cycle = ", ".join(os.path.basename(node) for node in remaining)
+            raise ValueError(f"Circular dependency between SQL files: {cycle}")
+        for node in ready:
+            order.append(node)
+            del remaining[node]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return order
+
+def dag_stages(dag):
+    """Group files into stages; every file in a stage only depends on earlier stages"""
+    stage_of = {}
+    for node in topological_order(dag):
+        stage_of[node] = max((stage_of[dep] + 1 for dep in dag[node]), default=0)
+    stages = defaultdict(list)
+    for node, stage in stage_of.items():
+        stages[stage].append(node)
+    return [stages[i] for i in sorted(stages)]
+
+def print_dag_plan(dag):
+    """Print the execution plan for a DAG"""
+    stages = dag_stages(dag)
+    print(f"\n🗺️ Execution plan: {len(dag)} files in {len(stages)} stages")
+    for i, stage in enumerate(stages):
+        print(f"  Stage {i+1}:")
+        for node in stage:
+            deps = ", ".join(sorted(os.path.basename(dep) for dep in dag[node]))
+            suffix = f"  (after {deps})" if deps else ""
+            print(f"    - {node}{suffix}")
+
+def descendants(dag, node):
+    """Return every file that directly or indirectly depends on the given file"""
+    dependents = defaultdict(set)
+    for child, deps in dag.items():
+        for dep in deps:
+            dependents[dep].add(child)
+    found = set()
+    stack = [node]
+    while stack:
+        for child in dependents[stack.pop()]:
+            if child not in found:
+                found.add(child)
+                stack.append(child)
+    return found
+
+def run_dag(dag, run_file, jobs=4, stop_on_error=True, on_complete=None):
+    """
+    Execute the files of a DAG on a thread pool in dependency order.
+
+    Args:
+        dag (dict): File -> set of files it depends on
+        run_file (callable): Runs one file and returns a tuple whose first item is success
+        jobs (int): Maximum number of files running at once
+        stop_on_error (bool): Stop starting new files after any failure
+        on_complete (callable, optional): Called with (file, result) as files finish
+
+    Returns:
+        dict: File -> result for every file that ran. Files that depend on a
+        failed file (or were not started after a failure) are left out.
+    """
+    order = topological_order(dag)
+    waiting = {node: set(deps) for node, deps in dag.items()}
+    results = {}
+    blocked = set()
+    started = set()
+    stopped = False
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        running = {}
+
+        def submit_ready():
+            for node in order:
+                if node not in started and node not in blocked and not waiting[node]:
+                    started.add(node)
+                    running[executor.submit(run_file, node)] = node
+
+        submit_ready()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                result = future.result()
+                results[node] = result
+                if on_complete:
+                    on_complete(node, result)
+
+                if result[0]:
+                    for deps in waiting.values():
+                        deps.discard(node)
+                else:
+                    blocked.update(descendants(dag, node))
+                    if stop_on_error:
+                        stopped = True
+
+            if not stopped:
+                submit_ready()
+
+    return results
+
+def main():
+    """Print the dependency plan for a set of SQL files or directories"""
+    parser = argparse.ArgumentParser(description="Show the dependency-ordered execution plan for SQL files")
+    parser.add_argument("paths", nargs="+", help="SQL files or directories")
+    parser.add_argument("--tables", action="store_true", help="Also list the tables each file creates and reads")
+    args = parser.parse_args()
+
+    file_list = expand_sql_paths(args.paths)
+    try:
+        dag, tables = build_dag(file_list)
+        print_dag_plan(dag)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    if args.tables:
+        for sql_file in file_list:
+            created, read = tables[sql_file]
+            print(f"\n{sql_file}")
+            print(f"  creates: {', '.join(sorted(created)) or '-'}")
+            print(f"  reads:   {', '.join(sorted(read)) or '-'}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+SQL Statement Lexer
+
+This module splits SQL scripts into statements in a single pass, following
+Snowflake's quoting and comment rules:
+
+- 'single quoted' strings, with '' and backslash escapes
+- "double quoted" identifiers, with "" escapes
+- $$dollar quoted$$ strings (procedure and function bodies)
+- -- and // line comments, and /* block */ comments
+
+Semicolons inside any of these do not end a statement. The lexer works line by
+line with its state carried across lines, so it can stream statements from a
+file object without reading the whole file into memory, and the cost is linear
+in the size of the input.
+
+Usage:
+    from sql_lexer import iter_statements
+
+    with open("queries.sql") as f:
+        for statement in iter_statements(f):
+            print(statement.line, statement.text)
+"""
+
+import re
+import sys
+from collections import namedtuple
+
+# A statement's text (including its terminating semicolon, if any) and the
+# 1-based lines where its first code appears and where it ends
+Statement = namedtuple('Statement', ['text', 'line', 'end_line'])
+
+NORMAL, SINGLE_QUOTE, DOUBLE_QUOTE, BLOCK_COMMENT, DOLLAR_QUOTE = range(5)
+
+SPECIAL_PATTERN = re.compile(r"""['";]|--|//|/\*|\$\$""")
+SINGLE_QUOTE_END = re.compile(r"\\.|''|'", re.DOTALL)
+DOUBLE_QUOTE_END = re.compile(r'""|"')
+
+def iter_statements(source):
+    """
+    Yield the statements in a SQL script.
+
+    Args:
+        source: SQL text, or any iterable of lines (e.g. an open file)
+
+    Yields:
+        Statement: Statements containing code. Comment-only or empty
+        fragments (e.g. text after the last semicolon) are skipped.
+    """
+    if isinstance(source, str):
+        source = source.splitlines(keepends=True)
+
+    state = NORMAL
+    parts = []
+    first_line = None
+    line_number = 0
+
+    for line_number, line in enumerate(source, 1):
+        pos = 0
+        segment_start = 0
+        length = len(line)
+
+        while pos < length:
+            if state == NORMAL:
+                match = SPECIAL_PATTERN.search(line, pos)
+                end = match.start() if match else length
+                if first_line is None and line[pos:end].strip():
+                    first_line = line_number
+                if not match:
+                    break
+
+                token = match.group()
+                pos = match.end()
+                if token == ';':
+                    parts.append(line[segment_start:pos])
+                    if first_line is not None:
+                        yield Statement(''.join(parts), first_line, line_number)
+                    parts = []
+                    first_line = None
+                    segment_start = pos
+                elif token in ('--', '//'):
+                    break
+                else:
+                    if token == "'":
+                        state = SINGLE_QUOTE
+                    elif token == '"':
+                        state = DOUBLE_QUOTE
+                    elif token == '/*':
+                        state = BLOCK_COMMENT
+                    else:
+                        state = DOLLAR_QUOTE
+                    if state != BLOCK_COMMENT and first_line is None:
+                        first_line = line_number
+
+            elif state == SINGLE_QUOTE:
+                pos = _find_quote_end(SINGLE_QUOTE_END, "'", line, pos)
+                if pos < 0:
+                    break
+                state = NORMAL
+
+            elif state == DOUBLE_QUOTE:
+                pos = _find_quote_end(DOUBLE_QUOTE_END, '"', line, pos)
+                if pos < 0:
+                    break
+                state = NORMAL
+
+            else:
+                closing = '*/' if state == BLOCK_COMMENT else '$$'
+                found = line.find(closing, pos)
+                if found < 0:
+                    break
+                pos = found + 2
+                state = NORMAL
+
+        parts.append(line[segment_start:])
+
+    if first_line is not None:
+        yield Statement(''.join(parts), first_line, line_number)
+
+def _find_quote_end(pattern, quote, line, pos):
+    """Return the position just past the closing quote on this line, or -1"""
+    while True:
+        match = pattern.search(line, pos)
+        if not match:
+            return -1
+        pos = match.end()
+        if match.group() == quote:
+            return pos
+
+NORMALIZE_PATTERN = re.compile(
+    r"""(?P<literal>'(?:[^'\\]|\\.|'')*'|"(?:[^"]|"")*"|\$\$.*?\$\$)"""
+    r"""|(?P<space>(?:\s|--[^\n]*|//[^\n]*|/\*.*?\*/)+)"""
+    r"""|(?P<code>[^'"$/\-\s]+|.)""",
+    re.DOTALL
+)
+
+def normalize_sql(sql_content):
+    """
+    Normalize SQL text for comparison or hashing: comments are removed, runs of
+    whitespace collapse to one space, code outside quotes is lowercased, and a
+    trailing semicolon is dropped. String literals and quoted identifiers are kept as-is.
+    """
+    parts = []
+    for match in NORMALIZE_PATTERN.finditer(sql_content):
+        if match.lastgroup == 'literal':
+            parts.append(match.group())
+        elif match.lastgroup == 'space':
+            parts.append(' ')
+        else:
+            parts.append(match.group().lower())
+    return ''.join(parts).strip().rstrip(';').rstrip()
+
+def split_statements(sql_content):
+    """Split SQL text into a list of statement strings"""
+    return [statement.text for statement in iter_statements(sql_content)]
+
+if __name__ == "__main__":
+    # Print the statements found in a file with their line numbers
+    if len(sys.argv) != 2:
+        print("Usage: python sql_lexer.py <sql_file>")
+        sys.exit(1)
+    with open(sys.argv[1], 'r') as f:
+        for i, statement in enumerate(iter_statements(f), 1):
+            print(f"--- Statement {i} (lines {statement.line}-{statement.end_line}) ---")
+            print(statement.text.strip())
@@ -0,0 +1,145 @@
+"""
+Source Table Freshness
+
+This module works out which tables a query reads and when each of them last
+changed, so cached results can be reused only while their sources are unchanged.
+
+LAST_ALTERED for every referenced table is fetched in a single metadata query
+(one INFORMATION_SCHEMA.TABLES lookup per database, combined with UNION ALL).
+A query only gets watermarks when it reads at least one table and every source
+resolves to a base table: views, missing tables, table functions, stage reads,
+queries that write tables, queries without source tables and queries using
+non-deterministic functions (CURRENT_DATE, RANDOM(), ...) return None, which
+callers treat as "do not reuse".
+
+Usage:
+    from table_freshness import get_source_watermarks
+
+    with get_connection() as conn:
+        watermarks = get_source_watermarks(conn, query, "PRODDB", "PUBLIC")
+"""
+
+import re
+from collections import defaultdict
+from sql_dag import find_table_references
+
+# Only base tables have a LAST_ALTERED that tracks their data. A view's
+# LAST_ALTERED only changes with its definition, not with the tables under it.
+TRACKED_TABLE_TYPES = {'BASE TABLE'}
+
+# Functions whose value changes between runs of the same query text, so unchanged
+# sources do not prove the result is unchanged. Matches inside comments or string
+# literals only make a query uncacheable, which is safe.
+VOLATILE_KEYWORDS = r'CURRENT_DATE|CURRENT_TIME|CURRENT_TIMESTAMP|LOCALTIME|LOCALTIMESTAMP|(?:TABLE)?SAMPLE'
+VOLATILE_FUNCTIONS = r'SYSDATE|SYSTIMESTAMP|GETDATE|RANDOM|RANDSTR|UUID_STRING|UNIFORM|NORMAL|ZIPF|SEQ[1248]'
+VOLATILE_PATTERN = re.compile(rf'\b(?:{VOLATILE_KEYWORDS})\b|\b(?:{VOLATILE_FUNCTIONS})\s*\(', re.IGNORECASE)
+
+# Sources that are not tables with a LAST_ALTERED of their own: table functions such as
+# FROM TABLE(RESULT_SCAN(...)) or TABLE(FLATTEN(...)), and files read from a stage
+# (FROM @stage/path). Like VOLATILE_PATTERN, matches inside comments are harmless.
+UNRESOLVABLE_SOURCE_PATTERN = re.compile(r"\bTABLE\s*\(|\b(?:FROM|JOIN)\s+'?@|,\s*'?@\w", re.IGNORECASE)
+
+def is_deterministic(query):
+    """Check that a query uses no functions whose value changes between runs (see VOLATILE_PATTERN)"""
+    return VOLATILE_PATTERN.search(query) is None
+
+def resolve_table_names(names, default_database, default_schema):
+    """
+    Fully qualify normalized table names (see sql_dag.normalize_table_name).
+
+    Returns:
+        set: (database, schema, table) tuples
+    """
+    resolved = set()
+    for name in names:
+        parts = name.split('.')
+        if len(parts) == 1:
+            parts = [default_database, default_schema] + parts
+        elif len(parts) == 2:
+            parts = [default_database] + parts
+        resolved.add(tuple(parts))
+    return resolved
+
+def query_source_tables(query, default_database, default_schema):
+    """
+    Return the fully qualified tables a query reads, or None if the query
+    writes to any table or reads a source that is not a table (a table function
+    or a stage, see UNRESOLVABLE_SOURCE_PATTERN); its result should never be cached.
+    """
+    if UNRESOLVABLE_SOURCE_PATTERN.search(query):
+        return None
+    created, read = find_table_references(query)
+    if created:
+        return None
+    return resolve_table_names(read, (default_database or '').upper(), (default_schema or '').upper())
+
+def get_last_altered(conn, tables):
+    """
+    Look up LAST_ALTERED for many tables in one query.
+
+    Args:
+        conn: Snowflake connection
+        tables (iterable): (database, schema, table) tuples
+
+    Returns:
+        dict: (database, schema, table) -> (table_type, last_altered) for tables that exist
+    """
+    by_database = defaultdict(list)
+    for database, schema, table in sorted(set(tables)):
+        by_database[database].append((schema, table))
+    if not by_database:
+        return {}
+
+    selects = []
+    params = []
+    for database, names in by_database.items():
+        quoted_database = '"' + database.replace('"', '""') + '"'
+        placeholders = ", ".join(["(%s, %s)"] * len(names))
+        selects.append(f"""
+        SELECT TABLE_CATALOG, TABLE_SCHEMA, TABLE_NAME, TABLE_TYPE, LAST_ALTERED
+        FROM {quoted_database}.INFORMATION_SCHEMA.TABLES
+        WHERE (TABLE_SCHEMA, TABLE_NAME) IN ({placeholders})
+        """)
+        for schema, table in names:
+            params.extend([schema, table])
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("\nUNION ALL\n".join(selects), params)
+        return {
+            (row[0], row[1], row[2]): (row[3], row[4])
+            for row in cursor.fetchall()
+        }
+    finally:
+        cursor.close()
+
+def get_source_watermarks(conn, query, default_database, default_schema):
+    """
+    Get the LAST_ALTERED watermark of every table a query reads.
+
+    Returns:
+        dict or None: {"DB.SCHEMA.TABLE": "<last altered>"} when the query is deterministic
+        and every source is a base table, otherwise None (the result cannot be safely reused)
+    """
+    if not is_deterministic(query):
+        return None
+    tables = query_source_tables(query, default_database, default_schema)
+    # Without source tables there is nothing to prove the result is still fresh
+    if not tables:
+        return None
+
+    try:
+        found = get_last_altered(conn, tables)
+    except Exception:
+        # Databases we cannot read metadata for are treated as unresolved
+        return None
+
+    watermarks = {}
+    for table in tables:
+        if table not in found:
+            return None
+        table_type, last_altered = found[table]
+        if table_type not in TRACKED_TABLE_TYPES or last_altered is None:
+            return None
+        watermarks['.'.join(table)] = str(last_altered)
+    return watermarks